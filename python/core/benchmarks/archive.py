@@ -0,0 +1,39 @@
+"""
+Time loading a dump tree of synthetic days with different numbers of worker processes.
+
+Run with: ``uv run python benchmarks/archive.py``
+"""
+
+import os
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from corpus import generate
+
+from diary.archive import load_archive
+
+YEARS = 30
+
+
+def main() -> None:
+    periods = generate(YEARS)
+    with TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        for period in periods:
+            day_path = path / f'{period.start:%Y/%m/%d}.txt'
+            day_path.parent.mkdir(parents=True, exist_ok=True)
+            day_path.write_text(str(period))
+        print(f'{len(periods)} day files, {os.cpu_count()} cpus')
+        baseline = None
+        for workers in sorted({1, 2, 4, 8, os.cpu_count() or 1}):
+            started = time.perf_counter()
+            loaded = list(load_archive(path, workers=workers))
+            elapsed = time.perf_counter() - started
+            assert loaded == periods
+            baseline = baseline or elapsed
+            print(f'{workers:>3} workers: {elapsed:6.2f}s, {baseline / elapsed:4.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Seeded synthetic diary generator used by the benchmarks.
+"""
+
+import random
+from datetime import date, timedelta
+
+from diary.objects import Period, Stuff, Type
+
+WORDS = (
+    'walked dog cooked dinner read book called mum fixed bike wrote code went swimming '
+    'met friends for coffee cleaned house paid bills visited the dentist again :-)'
+).split()
+TAGS = 'work home health family money travel'.split()
+
+# summaries modified before this have no action words, see Client.add_stuff:
+LEGACY = date(2002, 10, 4)
+# chance of a period covering several days:
+RANGE = 0.02
+
+
+def stuff(rng: random.Random) -> Stuff:
+    title = ' '.join(rng.choices(WORDS, k=rng.randint(2, 8)))
+    body = None
+    if rng.random() < 0.1:
+        body = '\n'.join(
+            ' '.join(rng.choices(WORDS, k=rng.randint(3, 12))) for _ in range(rng.randint(1, 5))
+        )
+    tags = None
+    if rng.random() < 0.2:
+        tags = rng.sample(TAGS, rng.randint(1, 2))
+    return Stuff(rng.choice(list(Type)), title, body, tags)
+
+
+def generate(years: int, seed: int = 0, start: date = date(2000, 1, 1)) -> list[Period]:
+    rng = random.Random(seed)
+    end = start.replace(year=start.year + years)
+    periods = []
+    current = start
+    while current < end:
+        period_end = None
+        if rng.random() < RANGE:
+            period_end = current + timedelta(days=rng.randint(1, 4))
+        periods.append(Period(current, [stuff(rng) for _ in range(rng.randint(0, 6))], period_end))
+        current = (period_end or current) + timedelta(days=1)
+    return periods
+
+
+def text(periods: list[Period]) -> str:
+    return '\n'.join(str(period) for period in periods)
+
+
+def ordinal(day: int) -> str:
+    suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10 if day // 10 != 1 else 0, 'th')
+    return f'{day}{suffix}'
+
+
+def date_text(rng: random.Random, period: Period) -> str:
+    start, end = period.start, period.end
+    if end is not None:
+        return f'{start:%A} {ordinal(start.day)} - {end:%a} {ordinal(end.day)}'
+    if start >= LEGACY:
+        return period.title_date()
+    return rng.choice(
+        [
+            f'{start:%A} {ordinal(start.day)}',
+            f'{start:%a} {ordinal(start.day)} {start:%b}',
+            f'{start:%A} {ordinal(start.day)} {start:%B} {start:%Y}',
+            f'{start:%A}',
+        ]
+    )
+
+
+def listing(periods: list[Period], seed: int = 0) -> list[tuple[str, date | None]]:
+    """
+    The date text for each period as found on the listing pages, newest first,
+    along with the start of the period that was listed before it.
+    """
+    rng = random.Random(seed)
+    entries: list[tuple[str, date | None]] = []
+    previous = None
+    for period in reversed(periods):
+        entries.append(
+            (period.title_date() if previous is None else date_text(rng, period), previous)
+        )
+        previous = period.start
+    return entries
+
+
+def manage_pages(periods: list[Period], seed: int = 0) -> list[tuple[Period, str, str, date]]:
+    """
+    The period, summary, body and modified date for each non-empty period as found
+    on its manage page, ready to be passed to :meth:`~diary.zope.Client.add_stuff`.
+    """
+    rng = random.Random(seed)
+    pages = []
+    for period in periods:
+        if not period.stuff:
+            continue
+        modified = (period.end or period.start) + timedelta(days=rng.randint(0, 3))
+        if modified < LEGACY:
+            summary = '\n'.join(s.title for s in period.stuff)
+        else:
+            summary = period.summary().replace("DIDN'T ", "didn't ") + ' \n\n'
+        body = rng.choice(['', '-', '\n'])
+        if rng.random() < 0.1:
+            body = ' '.join(rng.choices(WORDS, k=rng.randint(3, 30)))
+        pages.append((Period(period.start, end=period.end), summary, body, modified))
+    return pages
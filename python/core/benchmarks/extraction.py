@@ -0,0 +1,55 @@
+"""
+Time extracting what the client needs from the listing and manage pages recorded in a
+response cache with each of the html backends, checking they all match BeautifulSoup.
+
+Run with: ``uv run python benchmarks/extraction.py [CACHE_PATH]`` after exporting with
+the response cache on, which is where the pages are read from by default.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from diary.cache import ResponseCache, cache_root
+from diary.config import RESPONSE_CACHE
+from diary.extract import EXTRACTORS
+
+
+def recorded(path: Path) -> dict[str, list[str]]:
+    pages: dict[str, list[str]] = {'listing': [], 'form': []}
+    for entry in ResponseCache(path, max_size=0):
+        if entry.url.endswith('/vm_now'):
+            continue
+        kind = 'form' if entry.url.endswith('/manage') else 'listing'
+        pages[kind].append(entry.response().text)
+    return pages
+
+
+def timed(extract, pages: list[str]) -> tuple[list, float]:
+    started = time.perf_counter()
+    results = [extract(page) for page in pages]
+    return results, time.perf_counter() - started
+
+
+def main() -> None:
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else cache_root() / RESPONSE_CACHE
+    pages = recorded(path)
+    if not any(pages.values()):
+        sys.exit(f'No pages recorded in {path}')
+    for kind, html in pages.items():
+        if not html:
+            continue
+        size = sum(len(page) for page in html)
+        print(f'{kind}: {len(html)} pages, {size / 2**20:.1f}MB')
+        expected: list | None = None
+        baseline = 0.0
+        for name, extractor in EXTRACTORS.items():
+            results, seconds = timed(getattr(extractor(), kind), html)
+            if expected is None:
+                expected, baseline = results, seconds
+            assert results == expected, f'{name} does not match soup'
+            print(f'{name:>8}: {seconds * 1000:8.1f}ms {baseline / seconds:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
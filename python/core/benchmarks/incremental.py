@@ -0,0 +1,35 @@
+"""
+Cost of reparsing a large diary after editing one day, with and without the block cache.
+
+Run with: ``uv run python benchmarks/incremental.py``
+"""
+
+import time
+
+from corpus import generate, text
+
+from diary.parse import BlockCache, parse
+
+YEARS = 20
+
+
+def timed(label: str, source: str, cache: BlockCache | None) -> None:
+    started = time.perf_counter()
+    parse(source, cache)
+    print(f'{label:>12}: {time.perf_counter() - started:6.3f}s')
+
+
+def main() -> None:
+    periods = generate(YEARS)
+    source = text(periods)
+    cache = BlockCache()
+    print(f'{YEARS} years, {len(periods)} days')
+    timed('no cache', source, None)
+    timed('cold', source, cache)
+    timed('warm', source, cache)
+    edited = source.replace(str(periods[-1]), str(periods[-1]) + 'DID edit this day\n')
+    timed('one edit', edited, cache)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Time ``Client.infer_date`` over the date texts on 20 years of synthetic listing pages,
+half of them from before the canonical ``(%Y-%m-%d) %A`` form was used, both with
+nothing memoised and when the same entries are seen again, as when a listing is
+walked after being sought through. The original inference, which tried ``strptime``
+on every entry and checked candidate days with ``strftime``, is timed in the same run
+as the baseline.
+
+Run with: ``uv run python benchmarks/inference.py``
+"""
+
+import calendar
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from corpus import LEGACY, generate, listing
+
+from diary.zope import DATE_FORMAT, DAY_RANGE_PATTERN, MONTH_ALIASES, Client, LookBackFailed
+
+YEARS = 20
+REPEAT = 5
+
+Infer = Callable[[str, date | None], tuple[date, date | None]]
+
+
+def strftime_lookback(
+    start: date,
+    text: str,
+    day_name: str,
+    day_number_text: str,
+    month_name: str | None,
+    year_text: str | None,
+    *,
+    max_days: int,
+) -> date:
+    day_number = int(day_number_text)
+    for i in range(max_days):
+        possible = start - timedelta(days=i)
+        if possible.day == day_number:
+            break
+    else:
+        raise LookBackFailed(possible, text) from None
+    if day_name:
+        possible_day_names = possible.strftime('%A'), possible.strftime('%a')
+        if day_name not in possible_day_names:
+            raise AssertionError(
+                f'{possible} was a {possible_day_names[0]}, but entry had {day_name}'
+            )
+    if month_name:
+        month_name = MONTH_ALIASES.get(month_name, month_name)
+        possible_month_names = possible.strftime('%B'), possible.strftime('%b')
+        if month_name not in possible_month_names:
+            raise AssertionError(
+                f'{possible} was in {possible_month_names[0]}, but entry had {month_name}'
+            )
+    if year_text:
+        possible_year = possible.strftime('%Y')
+        if year_text != possible_year:
+            raise AssertionError(f'{possible} was in {possible_year}, but entry had {year_text}')
+    return possible
+
+
+def strptime_infer_date(text: str, previous: date | None = None) -> tuple[date, date | None]:
+    text = text.strip()
+    try:
+        inferred = datetime.strptime(text, DATE_FORMAT).date()
+    except ValueError:
+        match = DAY_RANGE_PATTERN.match(text)
+        if not match:
+            if text in calendar.day_name and previous is not None:
+                for i in range(1, 5):
+                    possible = previous - timedelta(days=i)
+                    if possible.strftime('%A') == text:
+                        return possible, None
+            raise ValueError(f'Bad format: {text!r}')
+        name, day, month, year, end_name, end_day, end_month, end_year = match.groups()
+        if end_day and previous is not None:
+            end = strftime_lookback(
+                previous, text, end_name, end_day, end_month, end_year, max_days=5
+            )
+            if day and month and year:
+                start = datetime.strptime(f'{day} {month} {year}', '%d %b %Y').date()
+            else:
+                start = strftime_lookback(end, text, name, day, month, year, max_days=25)
+            return start, end
+        if previous is None:
+            raise ValueError(f'Need previous date for: {text!r}')
+        inferred = strftime_lookback(previous, text, name, day, month, year, max_days=5)
+    else:
+        formatted = inferred.strftime(DATE_FORMAT)
+        assert formatted == text, f'{inferred:%d %b %y} was a {inferred:%A}, got: {text}'
+    return inferred, None
+
+
+def timed(infer: Infer, entries: list[tuple[str, date | None]], clear: bool) -> tuple[list, float]:
+    seconds = float('inf')
+    for _ in range(REPEAT):
+        if clear:
+            Client.infer_date.cache_clear()
+        started = time.perf_counter()
+        results = [infer(text, previous) for text, previous in entries]
+        seconds = min(seconds, time.perf_counter() - started)
+    return results, seconds
+
+
+def main() -> None:
+    entries = listing(generate(YEARS, start=LEGACY.replace(year=LEGACY.year - YEARS // 2)))
+    kinds = {
+        'canonical': [entry for entry in entries if entry[0].startswith('(')],
+        'relative': [entry for entry in entries if not entry[0].startswith('(')],
+        'all': entries,
+    }
+    for kind, subset in kinds.items():
+        baseline, baseline_seconds = timed(strptime_infer_date, subset, clear=False)
+        cold, cold_seconds = timed(Client.infer_date, subset, clear=True)
+        warm, warm_seconds = timed(Client.infer_date, subset, clear=False)
+        assert cold == warm == baseline
+        per_entry = [
+            seconds / len(subset) * 1e6
+            for seconds in (baseline_seconds, cold_seconds, warm_seconds)
+        ]
+        print(
+            f'{kind:>10}: {len(subset):6} entries, '
+            f'{per_entry[0]:5.2f}µs each with strptime, '
+            f'{per_entry[1]:5.2f}µs each ({baseline_seconds / cold_seconds:4.1f}x), '
+            f'{per_entry[2]:5.2f}µs seen before ({baseline_seconds / warm_seconds:4.1f}x)'
+        )
+
+
+if __name__ == '__main__':
+    main()
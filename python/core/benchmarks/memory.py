@@ -0,0 +1,98 @@
+"""
+Memory held by 20 years of parsed synthetic diary, using the slotted, interned
+:class:`~diary.objects.Period` and :class:`~diary.objects.Stuff` versus equivalent
+plain dataclasses where every title and tag list is a separate object, both straight
+after parsing and once every period has been rendered, as when an archive is dumped.
+Most of what's held is the text of titles and bodies, which neither layout changes.
+
+Run with: ``uv run python benchmarks/memory.py``
+"""
+
+import gc
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from multiprocessing import get_context
+from typing import cast
+
+from corpus import generate, text
+
+import diary.objects
+from diary.objects import Period, Type, format_dates
+from diary.parse import day_name_of, parse, to_date
+
+YEARS = 20
+
+
+@dataclass
+class PlainStuff:
+    type: Type
+    title: str
+    body: str | None = None
+    tags: list[str] | None = None
+
+
+@dataclass
+class PlainPeriod:
+    start: date
+    stuff: list[PlainStuff] = field(default_factory=list)
+    end: date | None = None
+    zope_id: str | None = None
+    start_url: str | None = None
+    start_date: date | None = None
+    modified: date | None = None
+
+
+def plain(periods: list[Period]) -> list[PlainPeriod]:
+    return [
+        PlainPeriod(
+            period.start,
+            [
+                PlainStuff(s.type, s.title, s.body, None if s.tags is None else list(s.tags))
+                for s in period.stuff
+            ],
+            period.end,
+        )
+        for period in periods
+    ]
+
+
+def held(source: str, slotted: bool, rendered: bool = False) -> int:
+    if not slotted:
+        # every title and tag string was a separate object before interning:
+        diary.objects.intern = lambda text: text
+    gc.collect()
+    tracemalloc.start()
+    result: object = parse(source, cache=None)
+    if not slotted:
+        result = plain(cast(list[Period], result))
+    if rendered:
+        for period in cast(list[Period], result):
+            str(period)
+    # only count what the periods hold:
+    to_date.cache_clear()
+    day_name_of.cache_clear()
+    format_dates.cache_clear()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def main() -> None:
+    source = text(generate(YEARS))
+    print(f'{YEARS} years, {len(source) / 1024 / 1024:.1f}MB of text')
+    for rendered in False, True:
+        # each run needs a fresh interpreter so nothing is already interned or cached:
+        with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+            before = executor.submit(held, source, False, rendered).result()
+        with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+            after = executor.submit(held, source, True, rendered).result()
+        print('rendered:' if rendered else 'parsed:')
+        print(f'   plain: {before / 1024 / 1024:6.1f}MB')
+        print(f' slotted: {after / 1024 / 1024:6.1f}MB ({after / before:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Compare the fast-path scanner with the full Lark parser on multi-year inputs.
+
+Run with: ``uv run python benchmarks/parsing.py``
+"""
+
+import time
+from typing import Callable
+
+from corpus import generate, text
+
+from diary.objects import Period
+from diary.parse import lark_parse, scan
+
+
+def timed(parse: Callable[[str], list[Period] | None], source: str) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = parse(source)
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    for years in 1, 10, 50:
+        source = text(generate(years))
+        lark_time, lark_result = timed(lark_parse, source)
+        scan_time, scan_result = timed(scan, source)
+        assert scan_result == lark_result
+        print(
+            f'{years:>2} years, {len(source) / 1024 / 1024:5.1f}MB: '
+            f'lark {lark_time:6.2f}s, scan {scan_time:6.2f}s, '
+            f'{lark_time / scan_time:5.1f}x faster'
+        )
+
+
+if __name__ == '__main__':
+    main()
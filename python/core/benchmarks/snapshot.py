@@ -0,0 +1,55 @@
+"""
+Size and load time of a 20-year synthetic diary as a binary snapshot, compared with
+the text and a dump tree of one file per day.
+
+Run with: ``uv run python benchmarks/snapshot.py``
+"""
+
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from corpus import generate, text
+
+from diary.parse import parse
+from diary.snapshot import Snapshot, load, save
+
+YEARS = 20
+
+
+def disk_usage(path: Path) -> int:
+    return sum(p.stat().st_blocks * 512 for p in path.rglob('*') if p.is_file())
+
+
+def timed(label: str, f, *args):
+    started = time.perf_counter()
+    result = f(*args)
+    print(f'{label:>14}: {(time.perf_counter() - started) * 1000:8.1f}ms')
+    return result
+
+
+def main() -> None:
+    source = text(generate(YEARS))
+    periods = timed('parse', parse, source, None)
+    with TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        dump = root / 'dump'
+        for period in periods:
+            day_path = dump / f'{period.start:%Y/%m/%d}.txt'
+            day_path.parent.mkdir(parents=True, exist_ok=True)
+            day_path.write_text(str(period))
+        path = root / 'diary.snapshot'
+        timed('save', save, periods, path)
+        assert timed('load', load, path) == periods
+        snapshot = timed('open', Snapshot, path)
+        timed('one day', snapshot.__getitem__, len(periods) // 2)
+        timed('find a day', snapshot.find, periods[-100].start)
+        snapshot.close()
+        print(f'{len(periods)} periods')
+        print(f'{"text":>14}: {len(source.encode()) / 1024:8.0f}KB')
+        print(f'{"dump tree":>14}: {disk_usage(dump) / 1024:8.0f}KB on disk')
+        print(f'{"snapshot":>14}: {path.stat().st_blocks * 512 / 1024:8.0f}KB on disk')
+
+
+if __name__ == '__main__':
+    main()
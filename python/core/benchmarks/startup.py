@@ -0,0 +1,43 @@
+"""
+Cold and warm import cost of ``diary.parse``.
+
+Cold means no compiled grammar cache is present so the LALR tables are built from
+``diary.lark``, warm means they are loaded from the on-disk cache.
+
+Run with: ``uv run python benchmarks/startup.py``
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+SRC = Path(__file__).parent.parent / 'src'
+RUNS = 10
+
+
+def import_time(env: dict[str, str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import diary.parse'], env=env, check=True)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    with TemporaryDirectory() as cache_home:
+        env = dict(os.environ, XDG_CACHE_HOME=cache_home, PYTHONPATH=str(SRC))
+        cache = Path(cache_home) / 'diary'
+        cold = []
+        for _ in range(RUNS):
+            for path in cache.glob('*'):
+                path.unlink()
+            cold.append(import_time(env))
+        warm = [import_time(env) for _ in range(RUNS)]
+    for label, timings in ('cold', cold), ('warm', warm):
+        print(f'{label}: median {statistics.median(timings) * 1000:.1f}ms over {RUNS} runs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Time the hot paths over 1, 10 and 50 years of synthetic diary, recording wall-clock
+time, throughput and peak memory, and report the results as JSON.
+
+Run with: ``uv run python benchmarks/suite.py --output results.json``
+"""
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import click
+from corpus import generate, listing, manage_pages, text
+
+from diary.objects import Period
+from diary.parse import block_cache, lark_parse, parse
+from diary.zope import Client
+
+YEARS = (1, 10, 50)
+
+
+@dataclass
+class Result:
+    benchmark: str
+    years: int
+    items: int
+    bytes: int
+    seconds: float
+    items_per_second: float
+    bytes_per_second: float
+    peak_memory: int
+
+
+@dataclass
+class Benchmark:
+    name: str
+    run: Callable[[], object]
+    items: int
+    bytes: int = 0
+
+
+def benchmarks(years: int, seed: int) -> list[Benchmark]:
+    periods = generate(years, seed)
+    source = text(periods)
+    entries = listing(periods, seed)
+    pages = manage_pages(periods, seed)
+
+    def render() -> list[str]:
+        return [str(period) for period in periods]
+
+    def summary() -> list[str]:
+        return [period.summary() for period in periods]
+
+    def add_stuff() -> list[Period]:
+        block_cache.periods.clear()
+        return [Client.add_stuff(*page) for page in pages]
+
+    def infer_date() -> list[tuple]:
+        Client.infer_date.cache_clear()
+        return [Client.infer_date(*entry) for entry in entries]
+
+    size = len(source.encode())
+    return [
+        Benchmark('parse', lambda: parse(source, cache=None), len(periods), size),
+        Benchmark('parse_lark', lambda: lark_parse(source), len(periods), size),
+        Benchmark('render', render, len(periods), size),
+        Benchmark('summary', summary, len(periods)),
+        Benchmark('add_stuff', add_stuff, len(pages)),
+        Benchmark('infer_date', infer_date, len(entries)),
+    ]
+
+
+def measure(benchmark: Benchmark, years: int, repeat: int) -> Result:
+    seconds = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        benchmark.run()
+        seconds = min(seconds, time.perf_counter() - started)
+    # memory is measured on a separate run as tracing slows everything down:
+    tracemalloc.start()
+    benchmark.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Result(
+        benchmark=benchmark.name,
+        years=years,
+        items=benchmark.items,
+        bytes=benchmark.bytes,
+        seconds=seconds,
+        items_per_second=benchmark.items / seconds,
+        bytes_per_second=benchmark.bytes / seconds,
+        peak_memory=peak,
+    )
+
+
+@click.command()
+@click.option('--years', 'sizes', type=int, multiple=True, default=YEARS)
+@click.option('--only', multiple=True, help='Only run benchmarks with these names.')
+@click.option('--seed', default=0)
+@click.option('--repeat', default=3, help='Report the best of this many runs.')
+@click.option('--output', type=click.Path(path_type=Path))
+def main(sizes: tuple[int], only: tuple[str], seed: int, repeat: int, output: Path | None):
+    results = []
+    for years in sizes:
+        for benchmark in benchmarks(years, seed):
+            if only and benchmark.name not in only:
+                continue
+            result = measure(benchmark, years, repeat)
+            print(
+                f'{result.benchmark:>12} {years:>3} years: {result.seconds:8.3f}s '
+                f'{result.items_per_second:10.0f} items/s '
+                f'{result.peak_memory / 1024 / 1024:8.1f}MB peak',
+                file=sys.stderr,
+            )
+            results.append(asdict(result))
+    report = json.dumps(
+        {
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+            'results': results,
+        },
+        indent=2,
+    )
+    if output:
+        output.write_text(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Peak memory and wall-clock time of the Lark parser on a 20-year synthetic diary,
+building a tree and then transforming it versus applying the callbacks while parsing.
+
+Run with: ``uv run python benchmarks/transform.py``
+"""
+
+import time
+import tracemalloc
+from typing import Callable
+
+from corpus import generate, text
+
+from diary.parse import Diary, make_parser, parser, to_date, day_name_of
+
+YEARS = 20
+
+tree_parser = make_parser()
+
+
+def tree(source: str) -> object:
+    return Diary().transform(tree_parser.parse(source))
+
+
+def inline(source: str) -> object:
+    return parser.parse(source)
+
+
+def measure(parse: Callable[[str], object], source: str) -> tuple[float, int, object]:
+    # timed separately as tracing memory allocations slows everything down:
+    to_date.cache_clear()
+    day_name_of.cache_clear()
+    started = time.perf_counter()
+    result = parse(source)
+    elapsed = time.perf_counter() - started
+    to_date.cache_clear()
+    day_name_of.cache_clear()
+    tracemalloc.start()
+    parse(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main() -> None:
+    source = text(generate(YEARS))
+    print(f'{YEARS} years, {len(source) / 1024 / 1024:.1f}MB of text')
+    results = []
+    for label, parse in ('tree then transform', tree), ('inline', inline):
+        elapsed, peak, result = measure(parse, source)
+        results.append(result)
+        print(f'{label:>20}: {elapsed:6.2f}s, peak {peak / 1024 / 1024:7.1f}MB')
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from diary.objects import Period
+from diary.parse import parse
+
+
+def report_error(path: Path, error: str) -> None:
+    print(f'{path}: {error}')
+
+
+def day_files(
+    path: Path,
+    start: date | None = None,
+    end: date | None = None,
+    handle_error: Callable[[Path, str], None] = report_error,
+) -> list[Path]:
+    """
+    The ``YYYY/MM/DD.txt`` files written by :func:`~diary.dump.dump` for days between
+    ``start`` and ``end``, inclusive, in date order.
+    """
+    files = []
+    for day_path in path.glob('[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9].txt'):
+        try:
+            day = date(
+                int(day_path.parent.parent.name), int(day_path.parent.name), int(day_path.stem)
+            )
+        except ValueError as e:
+            handle_error(day_path, f'{type(e).__qualname__}: {e}')
+            continue
+        if (start is None or day >= start) and (end is None or day <= end):
+            files.append((day, day_path))
+    return [day_path for _, day_path in sorted(files)]
+
+
+def load_day(path: Path) -> list[Period] | str:
+    # errors are returned as text as not all parser exceptions can be pickled:
+    try:
+        return parse(path.read_text(), cache=None)
+    except Exception as e:
+        return f'{type(e).__qualname__}: {e}'
+
+
+def load_archive(
+    path: Path,
+    start: date | None = None,
+    end: date | None = None,
+    workers: int | None = None,
+    handle_error: Callable[[Path, str], None] = report_error,
+) -> Iterator[Period]:
+    """
+    Load the periods dumped to ``path`` for days between ``start`` and ``end``, in
+    date order, parsing the files in parallel using ``workers`` processes.
+    Files that can't be parsed are passed to ``handle_error`` and skipped.
+    """
+    paths = day_files(path, start, end, handle_error)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        yield from handle_results(paths, map(load_day, paths), handle_error)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        # big chunks keep the overhead per file down, while still being small
+        # enough to spread the work evenly:
+        chunksize = max(1, len(paths) // (workers * 8))
+        results = executor.map(load_day, paths, chunksize=chunksize)
+        yield from handle_results(paths, results, handle_error)
+
+
+def handle_results(
+    paths: list[Path],
+    results: Iterable[list[Period] | str],
+    handle_error: Callable[[Path, str], None],
+) -> Iterator[Period]:
+    for day_path, result in zip(paths, results):
+        if isinstance(result, str):
+            handle_error(day_path, result)
+        else:
+            yield from result
@@ -0,0 +1,170 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from hashlib import sha256
+from pathlib import Path
+from stat import S_ISREG
+from tempfile import NamedTemporaryFile
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# when the cache grows beyond its maximum size, the least recently used entries
+# are evicted until it is back under this fraction of it:
+LOW_WATER = 0.8
+
+# so only entries are ever evicted, whatever else is in the directory:
+SUFFIX = '.response'
+
+
+def cache_root() -> Path:
+    """
+    The directory under which everything diary caches is kept.
+    """
+    return Path(os.environ.get('XDG_CACHE_HOME') or '~/.cache').expanduser() / 'diary'
+
+
+@dataclass
+class Entry:
+    url: str
+    etag: str | None
+    last_modified: str | None
+    fetched: datetime
+    content: bytes
+
+    def validators(self) -> dict[str, str]:
+        """
+        Headers making a request conditional on the content having changed since this
+        entry was fetched.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def response(self) -> 'Response':
+        from requests import Response
+
+        response = Response()
+        response.url = self.url
+        response.status_code = 200
+        response._content = self.content
+        return response
+
+
+class ResponseCache:
+    """
+    Responses stored in a directory, one file per url, with the least recently used
+    evicted once they take up more than ``max_size`` bytes. Entries that can't be read
+    are treated as missing and removed.
+    """
+
+    def __init__(self, path: Path, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self.size: int | None = None
+
+    def file(self, url: str) -> Path:
+        return self.path / (sha256(url.encode()).hexdigest() + SUFFIX)
+
+    def files(self) -> list[tuple[float, int, Path]]:
+        """
+        The modification time, size and path of each entry's file.
+        """
+        entries = []
+        for path in self.path.glob('*' + SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # removed by another thread or process since being listed:
+                continue
+            if S_ISREG(stat.st_mode):
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def get(self, url: str) -> Entry | None:
+        return self.load(self.file(url), used=True)
+
+    def __iter__(self) -> Iterator[Entry]:
+        """
+        Every entry that can be read, such as for replaying pages that have been fetched.
+        """
+        for _, _, path in self.files():
+            entry = self.load(path, used=False)
+            if entry is not None:
+                yield entry
+
+    def load(self, path: Path, used: bool) -> Entry | None:
+        try:
+            data = path.read_bytes()
+            if used:
+                # the modification time is when the entry was last used:
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        try:
+            header, content = data.split(b'\n', 1)
+            meta = json.loads(header)
+            return Entry(
+                meta['url'],
+                meta['etag'],
+                meta['last_modified'],
+                datetime.fromisoformat(meta['fetched']),
+                content,
+            )
+        except (KeyError, TypeError, ValueError):
+            path.unlink(missing_ok=True)
+            # found again when next needed:
+            self.size = None
+            return None
+
+    def put(self, url: str, response: 'Response') -> Entry:
+        entry = Entry(
+            url,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            datetime.now(timezone.utc),
+            response.content,
+        )
+        header = json.dumps(
+            {
+                'url': entry.url,
+                'etag': entry.etag,
+                'last_modified': entry.last_modified,
+                'fetched': entry.fetched.isoformat(),
+            }
+        )
+        data = header.encode() + b'\n' + entry.content
+        self.path.mkdir(parents=True, exist_ok=True)
+        # written and then renamed, so other threads and processes never see half an entry:
+        with NamedTemporaryFile(dir=self.path, suffix='.tmp', delete=False) as temp:
+            temp.write(data)
+        os.replace(temp.name, self.file(url))
+        if self.size is None:
+            self.evict()
+        else:
+            self.size += len(data)
+            if self.size > self.max_size:
+                self.evict()
+        return entry
+
+    def evict(self) -> None:
+        files = self.files()
+        size = sum(size for _, size, _ in files)
+        if size > self.max_size:
+            for _, file_size, path in sorted(files):
+                path.unlink(missing_ok=True)
+                size -= file_size
+                if size <= self.max_size * LOW_WATER:
+                    break
+        self.size = size
+
+    def clear(self) -> None:
+        if self.path.exists():
+            for _, _, path in self.files():
+                path.unlink(missing_ok=True)
+        self.size = 0
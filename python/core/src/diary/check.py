@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from typing import Iterable, cast
+
+from lark import Lark, Token
+from lark.exceptions import UnexpectedInput, UnexpectedToken, VisitError
+
+from diary.objects import Period, text_to_type, Stuff
+from diary.parse import Diary, cache_path, day_blocks, day_name_of, make_parser, scan
+
+
+@dataclass(order=True)
+class Problem:
+    line: int
+    message: str
+
+    def __str__(self):
+        return f'line {self.line}: {self.message}'
+
+
+class Checker(Diary):
+    """
+    The :class:`~diary.parse.Diary` callbacks, but recording problems that don't stop
+    the rest of a day from being checked rather than raising an exception.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.problems: list[Problem] = []
+
+    def date_pair(self, children):
+        date, token, day_name = children
+        date_day_name = day_name_of(date)
+        if date_day_name != day_name:
+            self.problems.append(
+                Problem(token.line, f'{date} is a {date_day_name}, but day given as {day_name}')
+            )
+        return date
+
+    def stuff(self, children):
+        action, tags, _, title, body = children
+        try:
+            type_ = text_to_type(action.value)
+        except ValueError as e:
+            self.problems.append(Problem(action.line, str(e)))
+            return None
+        return Stuff(type_, title.value, None if isinstance(body, Token) else body, tags or None)
+
+    def day(self, children):
+        (start, end), underline, stuff, *_ = children
+        if end is not None and start > end:
+            self.problems.append(Problem(underline.line - 1, f'{start} > {end}'))
+            end = None
+        return Period(start, [s for s in stuff if s is not None], end=end)
+
+
+def expected(e: UnexpectedInput) -> str:
+    names = sorted(getattr(e, 'expected', None) or getattr(e, 'allowed', None) or ())
+    return names[0] if len(names) == 1 else f'one of: {", ".join(names)}'
+
+
+def check_block(
+    parser: Lark, checker: Checker, offset: int, text: str
+) -> tuple[list[Period], list[Problem]]:
+    """
+    Check the text for one day, dropping each line that has a syntax error and trying
+    again so that every bad line is reported.
+    """
+    periods = scan(text)
+    if periods is not None:
+        return periods, []
+    problems = []
+    if not text.endswith('\n'):
+        problems.append(Problem(offset + text.count('\n') + 1, 'no newline at end of file'))
+        text += '\n'
+    lines = text.split('\n')
+    kept = list(range(len(lines)))
+    while True:
+        checker.problems = []
+        try:
+            parsed = cast(list[Period], parser.parse('\n'.join(lines[i] for i in kept)))
+        except UnexpectedInput as e:
+            if isinstance(e, UnexpectedToken) and e.token.type == '$END':
+                # dropping lines won't help, so report against the last line of the day:
+                end = offset + [i for i in kept if lines[i]][-1] + 1
+                problems.append(Problem(end, f'unexpected end of day, expected {expected(e)}'))
+                return [], problems
+            line, message = (
+                e.line or 1,
+                f'unexpected input at column {e.column}, expected {expected(e)}',
+            )
+        except VisitError as e:
+            # only an invalid date is still raised, and that can only be in the header:
+            line, message = 1, str(e.orig_exc)
+        else:
+            for problem in checker.problems:
+                problem.line = offset + kept[problem.line - 1] + 1
+            return parsed, problems + checker.problems
+        problems.append(Problem(offset + kept[line - 1] + 1, message))
+        # without a usable header and underline, the rest of the day can't be checked:
+        if line <= 2:
+            return [], problems
+        del kept[line - 1]
+
+
+def check(lines: Iterable[str]) -> list[Problem]:
+    """
+    Check an open diary file, or any other source of lines, returning every syntax,
+    day name and contiguity problem found.
+    """
+    checker = Checker()
+    parser = make_parser(cache_path(), checker)
+    problems = []
+    previous: Period | None = None
+    for offset, text in day_blocks(lines):
+        periods, block_problems = check_block(parser, checker, offset, text)
+        problems.extend(block_problems)
+        for period in periods:
+            if previous is not None:
+                gap = (period.start - (previous.end or previous.start)).days
+                if gap != 1:
+                    problems.append(
+                        Problem(
+                            offset + 1,
+                            f'{previous.human_date()} to {period.human_date()} '
+                            f'was {gap} days, not 1!',
+                        )
+                    )
+            previous = period
+    return sorted(problems)
@@ -1,12 +1,23 @@
 from datetime import date
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
 
-from diary.config import read_config
 from diary.dates import parse_date
-from diary.export import export
-from diary.ingest import ingest
+
+if TYPE_CHECKING:
+    from configurator import Config
+
+
+def configure() -> 'Config':
+    from diary.config import read_config
+    from diary.objects import use_type_resolver
+
+    config = read_config()
+    # only the command being run should parse with the configured resolver:
+    use_type_resolver(config.type_resolver)
+    return config
 
 
 @click.group()
@@ -19,26 +30,96 @@ def main(ctx: click.Context) -> None:
 @main.command(name='export')
 @click.option('--start-url', default='')
 @click.option('--start-date', default=date.max, type=parse_date)
+@click.option(
+    '--from', 'earliest', default=date.min, type=parse_date, help='Earliest date to export.'
+)
+@click.option('--to', 'latest', default=date.max, type=parse_date, help='Latest date to export.')
 @click.option('--dump', type=click.Path(path_type=Path))
 @click.option('--dry-run', is_flag=True)
 @click.option('--quiet', is_flag=True)
+@click.option('--prefetch', default=0, help='Manage pages to fetch ahead, 0 for none.')
+@click.option('--listing-prefetch', default=2, help='Listing pages to fetch ahead, 0 for none.')
+@click.option('--no-cache', 'cache', is_flag=True, default=True, flag_value=False)
+@click.option(
+    '--trust-modified', is_flag=True, help='Use cached pages for entries not changed since.'
+)
 @click.pass_context
 def click_export(
     ctx: click.Context,
     start_url: str,
     start_date: date,
+    earliest: date,
+    latest: date,
     dump: Path | None,
     dry_run: bool,
     quiet: bool,
+    prefetch: int,
+    listing_prefetch: int,
+    cache: bool,
+    trust_modified: bool,
 ) -> None:
-    config = read_config()
-    export(config, start_url, start_date, dump, dry_run, quiet)
+    from diary.export import export
+
+    config = configure()
+    if not cache:
+        config.zope.cache_path = None
+    config.zope.trust_modified |= trust_modified
+    export(
+        config,
+        start_url,
+        start_date,
+        dump,
+        dry_run,
+        quiet,
+        prefetch,
+        listing_prefetch,
+        earliest,
+        latest,
+    )
 
 
 @main.command(name='ingest')
 @click.option('--no-trim', 'trim', is_flag=True, default=True, flag_value=False)
 @click.option('--target', type=parse_date)
+@click.option('--uploads', default=4, help='Days to upload at once.')
+@click.option('--force', is_flag=True, help='Upload days even if unchanged since last sent.')
+@click.option('--resync', is_flag=True, help='Rebuild the sync index from the listing.')
+@click.option('--no-cache', 'cache', is_flag=True, default=True, flag_value=False)
 @click.pass_context
-def click_ingest(ctx: click.Context, trim: bool, target: date | None) -> None:
-    config = read_config()
-    ingest(config, trim, target)
+def click_ingest(
+    ctx: click.Context,
+    trim: bool,
+    target: date | None,
+    uploads: int,
+    force: bool,
+    resync: bool,
+    cache: bool,
+) -> None:
+    from diary.ingest import ingest
+
+    config = configure()
+    if not cache:
+        config.zope.cache_path = None
+    ingest(
+        config,
+        trim,
+        target,
+        uploads,
+        force,
+        resync,
+    )
+
+
+@main.command(name='check')
+@click.argument('path', required=False, type=click.Path(exists=True, path_type=Path))
+def click_check(path: Path | None) -> None:
+    from diary.check import check
+
+    if path is None:
+        path = configure().diary_path
+    with path.open() as source:
+        problems = check(source)
+    for problem in problems:
+        print(problem)
+    if problems:
+        raise SystemExit(1)
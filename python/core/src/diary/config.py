@@ -2,12 +2,31 @@ from pathlib import Path
 
 from configurator import Config
 
-from diary.zope import Client
+from diary.cache import cache_root
+from diary.objects import TYPO_CONFIDENCE, TypeResolver
+
+# where responses are cached, in a directory of their own under cache_root():
+RESPONSE_CACHE = 'responses'
+# kept next to the config file unless it says otherwise:
+SYNC_INDEX = 'sync.sqlite'
+UPLOAD_MANIFEST = 'uploads.json'
 
 
 def read_config(path: str = 'config.yaml') -> Config:
     config = Config.from_path(path)
     config.diary_path = Path(config.diary_path).expanduser()
+    config.sync_index = Path(
+        config.get('sync_index') or Path(path).parent / SYNC_INDEX
+    ).expanduser()
+    config.upload_manifest = Path(
+        config.get('upload_manifest') or Path(path).parent / UPLOAD_MANIFEST
+    ).expanduser()
+    # installed by the command being run, see diary.objects.use_type_resolver():
+    confidence = config.get('typo_confidence')
+    config.type_resolver = TypeResolver(TYPO_CONFIDENCE if confidence is None else confidence)
     if config.get('zope'):
-        config.zope = Client(**config.zope.data)
+        from diary.zope import Client
+
+        cache_path = str(cache_root() / RESPONSE_CACHE)
+        config.zope = Client(**{'cache_path': cache_path, **config.zope.data})
     return config
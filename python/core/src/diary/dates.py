@@ -3,6 +3,11 @@ from datetime import timedelta, date, datetime
 SUNDAY = 6
 DAY = timedelta(days=1)
 
+# The size of each cache of parsed, formatted or inferred dates. Dates repeat across
+# reparses, renders and listing walks, and this is enough for every day in a long
+# diary, in every form used:
+DATE_CACHE_SIZE = 2**16
+
 
 def previous_sunday() -> date:
     current = date.today()
@@ -12,5 +17,8 @@ def previous_sunday() -> date:
     return current
 
 
-def parse_date(text) -> date:
+def parse_date(text: str | date) -> date:
+    # click passes defaults through as they are:
+    if isinstance(text, date):
+        return text
     return datetime.strptime(text, '%Y-%m-%d').date()
@@ -1,7 +1,5 @@
 from pathlib import Path
 
-from testfixtures import diff
-
 from diary.objects import Period
 
 
@@ -17,6 +15,8 @@ def dump(path: Path, period: Period, dry_run: bool):
         if existing == content:
             print(f'EXISTS: {day_path}')
         else:
+            from testfixtures import diff
+
             print(f'UPDATE: {day_path}')
             print(diff(existing, content, x_label='existing', y_label='new'))
     else:
@@ -1,13 +1,17 @@
 import html
+from collections import deque
+from concurrent.futures import Future
+from contextlib import closing
 from datetime import date
 from functools import partial
 from pathlib import Path
-from typing import Union
+from typing import Callable, Iterable, Iterator, Union
 
 from diary.config import Config
 from diary.dump import dump
+from diary.extract import Form
 from diary.objects import Period
-from diary.zope import Client, LookBackFailed
+from diary.zope import Client, ClientPool, LookBackFailed
 
 
 def handle_error(e: Union[Exception, str], url: str, modified: date) -> bool:
@@ -17,6 +21,88 @@ def handle_error(e: Union[Exception, str], url: str, modified: date) -> bool:
     return not isinstance(e, LookBackFailed)
 
 
+def check(zope: Client, period: Period, previous: date | None, quiet: bool) -> bool:
+    latest = period.end or period.start
+    to_previous = previous and (previous - latest).days or None
+    assert period.modified is not None
+    to_modified = (period.modified - latest).days
+
+    if not quiet:
+        print(
+            f'{period.human_date()} {period.start.year} ',
+            f'prev: {to_previous} days',
+            f'pub: {to_modified} days',
+            f'python export.py --start-url {period.start_url} --start-date {period.start_date}',
+        )
+
+    error = partial(handle_error, url=f'{zope.url}/{period.zope_id}', modified=period.modified)
+
+    if to_modified < -18:
+        error(f'{to_modified} days to modified, gap too big!')
+        return False
+    if not (to_previous is None or 1 <= to_previous <= 4):
+        error(f'{to_previous} days to previous!')
+        return False
+
+    if not quiet:
+        print(edit_url(zope, period))
+        print()
+    return True
+
+
+def edit_url(zope: Client, period: Period) -> str:
+    return f'{zope.url}/{period.zope_id}/manage'
+
+
+def normalise(period: Period, form: Form) -> Period:
+    assert period.modified is not None
+    return Client.add_stuff(period, html.unescape(form.summary), form.body, period.modified)
+
+
+def fetch(zope: Client, period: Period) -> Period:
+    form = zope.get_form(edit_url(zope, period), absolute=True, modified=period.modified)
+    return normalise(period, form)
+
+
+def output(period: Period, dump_path: Path | None, dry_run: bool, quiet: bool) -> None:
+    if not quiet:
+        print(period)
+
+    if dump_path:
+        dump(dump_path.expanduser(), period, dry_run)
+
+
+def prefetched(
+    periods: Iterable[Period], pool: ClientPool, depth: int
+) -> Iterator[tuple[Period, Callable[[], Period]]]:
+    """
+    Yield each period along with a function returning its normalised version, keeping
+    the manage pages of up to ``depth`` of the periods that follow it being fetched by
+    the ``pool``. With no ``depth``, each page is only fetched when it's asked for.
+    """
+    if not depth:
+        for period in periods:
+            yield period, partial(fetch, pool.prototype, period)
+        return
+    pending: deque[tuple[Period, Future[Period]]] = deque()
+    error = None
+    try:
+        for period in periods:
+            pending.append((period, pool.submit(fetch, period)))
+            if len(pending) > depth:
+                period, normalised = pending.popleft()
+                yield period, normalised.result
+    except Exception as e:
+        # the periods listed before the error are still handled first, as they were
+        # when the listing and exporting happened in lock step:
+        error = e
+    while pending:
+        period, normalised = pending.popleft()
+        yield period, normalised.result
+    if error is not None:
+        raise error
+
+
 def export(
     config: Config,
     start_url: str = '',
@@ -24,49 +110,26 @@ def export(
     dump_path: Path | None = None,
     dry_run: bool = False,
     quiet: bool = False,
+    prefetch: int = 0,
+    listing_prefetch: int = 2,
+    earliest: date = date.min,
+    latest: date = date.max,
 ) -> None:
+    """
+    Check, normalise and output the periods in the listing, newest first. The manage
+    pages of up to ``prefetch`` periods ahead are fetched and normalised in a pool,
+    while the checks, which need the previous period, and the output happen here,
+    in order.
+    """
     zope: Client = config.zope
-
+    periods = zope.list(earliest, handle_error, start_url, start_date, listing_prefetch, latest)
     previous = None
-    for period in zope.list(date.min, handle_error, start_url, start_date):
-        latest = period.end or period.start
-        to_previous = previous and (previous - latest).days or None
-        assert period.modified is not None
-        to_modified = (period.modified - latest).days
-
-        if not quiet:
-            print(
-                f'{period.human_date()} {period.start.year} ',
-                f'prev: {to_previous} days',
-                f'pub: {to_modified} days',
-                f'python export.py --start-url {period.start_url} --start-date {period.start_date}',
-            )
-
-        error = partial(handle_error, url=f'{zope.url}/{period.zope_id}', modified=period.modified)
-
-        if to_modified < -18:
-            error(f'{to_modified} days to modified, gap too big!')
-            break
-        if not (to_previous is None or 1 <= to_previous <= 4):
-            error(f'{to_previous} days to previous!')
-            break
-
-        edit_url = f'{zope.url}/{period.zope_id}/manage'
-        if not quiet:
-            print(edit_url)
-            print()
-        soup = zope.get_soup(edit_url, absolute=True)
-        (summary_tag,) = soup.find_all('textarea', attrs={'name': 'summary'})
-        (body_tag,) = soup.find_all('textarea', attrs={'name': 'body'})
-
-        period = zope.add_stuff(
-            period, html.unescape(summary_tag.text), body_tag.text, period.modified
-        )
-
-        if not quiet:
-            print(period)
-
-        if dump_path:
-            dump(dump_path.expanduser(), period, dry_run)
-
-        previous = period.start
+    # closed here, rather than when an error's traceback lets go of it, so any listing
+    # pages being fetched ahead are stopped:
+    with closing(periods), ClientPool(zope, max(prefetch, 1)) as pool:
+        for period, normalised in prefetched(periods, pool, prefetch):
+            if not check(zope, period, previous, quiet):
+                break
+            period = normalised()
+            output(period, dump_path, dry_run, quiet)
+            previous = period.start
@@ -0,0 +1,302 @@
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Protocol
+
+# bs4 closes these as soon as they're opened and ignores any end tags for them:
+VOID = frozenset(
+    'area base basefont bgsound br col command embed frame hr image img input isindex '
+    'keygen link menuitem meta nextid param source spacer track wbr'.split()
+)
+# bs4 gives text inside these its own string types, which get_text() leaves out:
+STRING_CONTAINERS = frozenset('rp rt script style template'.split())
+# and only keeps whitespace-only text as it is inside these:
+PRESERVE_WHITESPACE = frozenset({'pre', 'textarea'})
+ASCII_SPACES = ' \n\t\x0c\r'
+
+
+@dataclass(slots=True)
+class ListingEntry:
+    # the name of an anchor, which is when the entry was last modified:
+    modified: str
+    # the text of the first <strong> after the anchor and the href of the first
+    # a.read after that, if they were found:
+    date: str | None
+    read_url: str | None
+
+
+@dataclass(slots=True)
+class Listing:
+    entries: list[ListingEntry]
+    next_url: str | None
+
+
+@dataclass(slots=True)
+class Form:
+    summary: str
+    body: str
+
+
+class Extractor(Protocol):
+    def listing(self, content: str) -> Listing:
+        """
+        The entries on a listing page, along with the url of the next page.
+        """
+
+    def form(self, content: str) -> Form:
+        """
+        The summary and body from the form on an entry's manage page.
+        """
+
+
+def classes(value: str | None) -> list[str]:
+    return re.findall(r'\S+', value or '')
+
+
+def numeric_reference(number: int) -> str:
+    # as bs4 resolves them, which is most of what the HTML spec says to do:
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return '\ufffd'
+    if 0x80 <= number <= 0x9F:
+        try:
+            return bytes([number]).decode('cp1252')
+        except UnicodeDecodeError:
+            pass
+    return chr(number)
+
+
+def only(texts: list[str], name: str) -> str:
+    if len(texts) != 1:
+        raise ValueError(f'Expected one {name} textarea, found {len(texts)}')
+    return texts[0]
+
+
+class SoupExtractor:
+    """
+    Extraction from a full :class:`~bs4.BeautifulSoup` tree, which the other
+    extractors must match.
+    """
+
+    def listing(self, content: str) -> Listing:
+        from bs4 import BeautifulSoup, Tag
+
+        soup = BeautifulSoup(content, features='html.parser')
+        entries = []
+        for tag in soup.find_all('a', attrs={'name': True}):
+            date_tag = tag.find_next('strong')
+            read = date_tag and date_tag.find_next('a', attrs={'class': 'read'})
+            href = read and read.get('href')
+            entries.append(
+                ListingEntry(
+                    str(tag['name']),
+                    None if date_tag is None else date_tag.text,
+                    None if href is None else str(href),
+                )
+            )
+        next_link = soup.html.find_next('a', attrs={'class': 'next'}) if soup.html else None
+        href = next_link.get('href') if isinstance(next_link, Tag) else None
+        return Listing(entries, None if href is None else str(href))
+
+    def form(self, content: str) -> Form:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, features='html.parser')
+        return Form(
+            *(
+                only([tag.text for tag in soup.find_all('textarea', attrs={'name': name})], name)
+                for name in ('summary', 'body')
+            )
+        )
+
+
+class TreeParser(HTMLParser):
+    """
+    An :class:`~html.parser.HTMLParser` that tracks which elements are open, and splits
+    and decodes text, in the same way as bs4's ``html.parser`` tree builder, without
+    building the tree. Subclasses collect the text of an element by passing a list to
+    :meth:`collect` from :meth:`start`.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.open: list[str] = []
+        self.closed_void: list[str] = []
+        self.containers = 0
+        self.preserving = 0
+        self.data: list[str] = []
+        # the depth of each element whose text is being collected, and that text:
+        self.collecting: list[tuple[int, list[str]]] = []
+
+    def start(self, tag: str, attrs: dict[str, str]) -> None:
+        pass
+
+    def collect(self, texts: list[str]) -> None:
+        self.collecting.append((len(self.open), texts))
+
+    def flush(self, cdata: bool = False) -> None:
+        # bs4 makes a string from the data between each tag, comment and so on:
+        if not self.data:
+            return
+        text = ''.join(self.data)
+        self.data = []
+        if not self.preserving and not text.strip(ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+        if cdata or not self.containers:
+            for _, texts in self.collecting:
+                texts.append(text)
+
+    def push(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.flush()
+        self.open.append(tag)
+        self.containers += tag in STRING_CONTAINERS
+        self.preserving += tag in PRESERVE_WHITESPACE
+        self.start(tag, {key: value or '' for key, value in attrs})
+
+    def pop_to(self, tag: str) -> None:
+        self.flush()
+        if tag not in self.open:
+            return
+        depth = len(self.open) - 1 - self.open[::-1].index(tag)
+        for popped in self.open[depth:]:
+            self.containers -= popped in STRING_CONTAINERS
+            self.preserving -= popped in PRESERVE_WHITESPACE
+        del self.open[depth:]
+        while self.collecting and self.collecting[-1][0] > depth:
+            self.collecting.pop()
+
+    def handle_starttag(self, tag, attrs):
+        self.push(tag, attrs)
+        if tag in VOID:
+            self.pop_to(tag)
+            self.closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.push(tag, attrs)
+        self.pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_void:
+            self.closed_void.remove(tag)
+        else:
+            self.pop_to(tag)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_charref(self, name):
+        # html.parser only passes on references made of valid digits:
+        number = int(name[1:], 16) if name[:1] in 'xX' else int(name)
+        self.handle_data(numeric_reference(number))
+
+    def handle_entityref(self, name):
+        from bs4.dammit import EntitySubstitution
+
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(f'&{name}' if character is None else character)
+
+    # comments, declarations and so on aren't text, but do end the current string:
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_decl(self, decl):
+        self.flush()
+
+    def handle_pi(self, data):
+        self.flush()
+
+    def unknown_decl(self, data):
+        self.flush()
+        if data.upper().startswith('CDATA['):
+            self.handle_data(data[len('CDATA[') :])
+            self.flush(cdata=True)
+
+    def parse(self, content: str) -> None:
+        self.feed(content)
+        self.close()
+        self.flush()
+
+
+class ListingParser(TreeParser):
+    def __init__(self):
+        super().__init__()
+        self.entries: list[tuple[str, list[str] | None, str | None]] = []
+        # entries waiting for their <strong>, then for their a.read:
+        self.need_date: list[int] = []
+        self.need_read: list[int] = []
+        self.seen_html = False
+        self.next_link: dict[str, str] | None = None
+
+    def start(self, tag, attrs):
+        if tag == 'html':
+            self.seen_html = True
+        elif tag == 'strong' and self.need_date:
+            texts: list[str] = []
+            self.collect(texts)
+            for index in self.need_date:
+                modified, _, _ = self.entries[index]
+                self.entries[index] = modified, texts, None
+            self.need_read.extend(self.need_date)
+            self.need_date = []
+        elif tag == 'a':
+            if 'read' in classes(attrs.get('class')) and self.need_read:
+                for index in self.need_read:
+                    modified, date, _ = self.entries[index]
+                    self.entries[index] = modified, date, attrs.get('href')
+                self.need_read = []
+            if 'name' in attrs:
+                self.need_date.append(len(self.entries))
+                self.entries.append((attrs['name'], None, None))
+            if self.seen_html and self.next_link is None and 'next' in classes(attrs.get('class')):
+                self.next_link = attrs
+
+    def listing(self) -> Listing:
+        return Listing(
+            [
+                ListingEntry(modified, None if texts is None else ''.join(texts), read_url)
+                for modified, texts, read_url in self.entries
+            ],
+            None if self.next_link is None else self.next_link.get('href'),
+        )
+
+
+class FormParser(TreeParser):
+    def __init__(self):
+        super().__init__()
+        self.textareas: dict[str, list[list[str]]] = {'summary': [], 'body': []}
+
+    def start(self, tag, attrs):
+        if tag == 'textarea':
+            texts = self.textareas.get(attrs.get('name', ''))
+            if texts is not None:
+                texts.append([])
+                self.collect(texts[-1])
+
+    def form(self) -> Form:
+        return Form(
+            *(
+                only([''.join(t) for t in self.textareas[name]], name)
+                for name in ('summary', 'body')
+            )
+        )
+
+
+class StreamExtractor:
+    """
+    Extraction in a single pass over the page, without building a tree.
+    """
+
+    def listing(self, content: str) -> Listing:
+        parser = ListingParser()
+        parser.parse(content)
+        return parser.listing()
+
+    def form(self, content: str) -> Form:
+        parser = FormParser()
+        parser.parse(content)
+        return parser.form()
+
+
+EXTRACTORS: dict[str, type[Extractor]] = {
+    'soup': SoupExtractor,
+    'stream': StreamExtractor,
+}
@@ -0,0 +1,69 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+
+
+def distance(a: str, b: str) -> int:
+    """
+    The Levenshtein edit distance between two strings.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            )
+        previous = current
+    return previous[-1]
+
+
+@dataclass(slots=True)
+class Node:
+    word: str
+    children: dict[int, 'Node'] = field(default_factory=dict)
+
+
+class BKTree:
+    """
+    A Burkhard-Keller tree of words, for finding those within an edit distance of a
+    given word without comparing it to all of them.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.root: Node | None = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        if self.root is None:
+            self.root = Node(word)
+            return
+        node = self.root
+        while True:
+            d = distance(word, node.word)
+            if d == 0:
+                return
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = Node(word)
+                return
+            node = child
+
+    def search(self, word: str, radius: int) -> list[tuple[int, str]]:
+        """
+        The words within ``radius`` edits of ``word``, closest first.
+        """
+        found = []
+        nodes = [self.root] if self.root is not None else []
+        while nodes:
+            node = nodes.pop()
+            d = distance(word, node.word)
+            if d <= radius:
+                found.append((d, node.word))
+            # the triangle inequality means only these children can be close enough:
+            nodes.extend(
+                child for key, child in node.children.items() if d - radius <= key <= d + radius
+            )
+        return sorted(found)
@@ -0,0 +1,131 @@
+import sqlite3
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from diary.zope import Client
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS days (
+    date TEXT PRIMARY KEY,
+    zope_id TEXT,
+    modified TEXT,
+    start_url TEXT
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+class SyncIndex:
+    """
+    What's on the server for each day, as last seen in the listing or sent to it,
+    stored in a SQLite database at ``path`` so that only the listing pages changed
+    since need to be read.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def ids(self) -> dict[date, str | None]:
+        return {
+            date.fromisoformat(day): zope_id
+            for day, zope_id in self.connection.execute('SELECT date, zope_id FROM days')
+        }
+
+    def record(
+        self, day: date, zope_id: str | None, modified: date, start_url: str | None = None
+    ) -> None:
+        # the id of a day that has just been added and where a day's listing page
+        # starts aren't known until it's next seen in the listing:
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO days VALUES (?, ?, ?, ?) ON CONFLICT(date) DO UPDATE SET '
+                'zope_id = coalesce(excluded.zope_id, zope_id), '
+                'modified = excluded.modified, '
+                'start_url = coalesce(excluded.start_url, start_url)',
+                (day.isoformat(), zope_id, modified.isoformat(), start_url),
+            )
+
+    def state(self, key: str) -> date | None:
+        row = self.connection.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return None if row is None else date.fromisoformat(row[0])
+
+    def set_state(self, key: str, value: date) -> None:
+        self.connection.execute(
+            'INSERT OR REPLACE INTO state VALUES (?, ?)', (key, value.isoformat())
+        )
+
+    @property
+    def watermark(self) -> date | None:
+        """
+        The latest modification seen in the listing when it was last reconciled.
+        """
+        return self.state('watermark')
+
+    @property
+    def earliest(self) -> date | None:
+        """
+        How far back the listing has been read in full.
+        """
+        return self.state('earliest')
+
+    def reconcile(self, client: 'Client', earliest: date) -> int:
+        """
+        Record the periods in the listing, newest first, back to ``earliest``, and
+        remove any days it no longer has, returning how many were recorded.
+        If the listing has been read back that far before, the walk stops at the first
+        period not modified since the :attr:`watermark`, as those after it were posted
+        before then. No pages are fetched ahead, as the walk usually ends on the first.
+        """
+        read_back_to = self.earliest
+        watermark = (
+            self.watermark if read_back_to is not None and read_back_to <= earliest else None
+        )
+        latest = self.watermark
+        recorded = 0
+        listed = set()
+        # the days the walk has passed, so any not listed have been removed:
+        passed = earliest
+        with closing(client.list(earliest)) as periods:
+            for period in periods:
+                assert period.modified is not None
+                listed.add(period.start.isoformat())
+                if watermark is not None and period.modified < watermark:
+                    passed = period.start
+                    break
+                self.record(period.start, period.zope_id, period.modified, period.start_url)
+                recorded += 1
+                if latest is None or period.modified > latest:
+                    latest = period.modified
+        with self.connection:
+            self.connection.executemany(
+                'DELETE FROM days WHERE date = ?',
+                [
+                    row
+                    for row in self.connection.execute(
+                        'SELECT date FROM days WHERE date >= ?', (passed.isoformat(),)
+                    )
+                    if row[0] not in listed
+                ],
+            )
+            if watermark is None:
+                self.set_state('earliest', min(earliest, read_back_to or earliest))
+            if latest is not None:
+                self.set_state('watermark', latest)
+        return recorded
+
+    def clear(self) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM days')
+            self.connection.execute('DELETE FROM state')
+
+    def close(self) -> None:
+        self.connection.close()
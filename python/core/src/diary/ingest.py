@@ -1,12 +1,30 @@
+from concurrent.futures import Future
+from contextlib import closing
 from datetime import datetime, timedelta, date
 from pathlib import Path
+from typing import Callable, Iterator
 
 from diary.config import Config
 from diary.dates import previous_sunday
 from diary.dump import dump
+from diary.index import SyncIndex
+from diary.manifest import UploadManifest
 from diary.objects import Period
-from diary.parse import parse
-from diary.zope import Client
+from diary.parse import iter_parse, block_cache, BlockCache
+from diary.zope import Client, ClientPool
+
+
+class AddSkipped(Exception):
+    """
+    A day that wasn't added because adding an earlier one failed, and the days must be
+    added in order.
+    """
+
+    def __init__(self, earlier: Period):
+        self.earlier = earlier
+
+    def __str__(self):
+        return f'not added as adding {self.earlier.human_date()} failed'
 
 
 def check_vm_time(client: Client):
@@ -19,36 +37,38 @@ def check_vm_time(client: Client):
         )
 
 
-def ingest(config: Config, trim: bool = True, target: date | None = None) -> None:
+def ingest(
+    config: Config,
+    trim: bool = True,
+    target: date | None = None,
+    uploads: int = 4,
+    force: bool = False,
+    resync: bool = False,
+) -> None:
     client = config.zope
 
     check_vm_time(client)
 
-    days: list[Period] = parse(config.diary_path.read_text())
+    cache = block_cache
+    if config.get('parse_cache'):
+        cache = BlockCache(path=Path(config.parse_cache).expanduser())
+    with config.diary_path.open() as source:
+        days: list[Period] = list(iter_parse(source, cache))
 
     for d, d1 in zip(days, days[1:]):
         diff = (d1.date - d.date).days
         assert diff == 1, f"{d.human_date()} to {d1.human_date()} was {diff} days, not 1!"
 
-    already_uploaded = {
-        day.date: day.zope_id for day in client.list(days[0].date - timedelta(days=3))
-    }
-
     dump_path = Path(config.dump).expanduser()
-
-    for day in days:
-        dump(dump_path, day, dry_run=False)
-        if not day.summary().strip():
-            print(f'Skipping {day.human_date()} as empty')
-            continue
-        zope_id = already_uploaded.get(day.date)
-        if zope_id:
-            print(f'Updating {day.human_date()}')
-            day.zope_id = zope_id
-            client.update(day)
-        else:
-            print(f'Uploading {day.human_date()}')
-            client.add(day)
+    manifest = UploadManifest(config.upload_manifest)
+    with closing(SyncIndex(config.sync_index)) as index:
+        if resync:
+            index.clear()
+        index.reconcile(client, days[0].date - timedelta(days=3))
+        try:
+            upload(client, days, dump_path, index, manifest, uploads, force)
+        finally:
+            manifest.save()
 
     target_date = target or date.today() + timedelta(days=6)
     current = days[-1].date
@@ -60,3 +80,146 @@ def ingest(config: Config, trim: bool = True, target: date | None = None) -> Non
         cutoff = previous_sunday()
         days = [day for day in days if day.date > cutoff]
     config.diary_path.write_text('\n'.join(str(day) for day in days))
+
+
+def changes(
+    days: list[Period],
+    already_uploaded: dict[date, str | None],
+    dump_path: Path,
+    unchanged: Callable[[Period], bool] = lambda day: False,
+) -> Iterator[Period]:
+    """
+    Dump each day and yield those that need to be sent, setting the ``zope_id`` of
+    any that have already been uploaded. Those that are sent are reported on once
+    they have been.
+    """
+    for day in days:
+        dump(dump_path, day, dry_run=False)
+        if not day.stuff:
+            print(f'Skipping {day.human_date()} as empty')
+            continue
+        zope_id = already_uploaded.get(day.date)
+        if zope_id:
+            day.zope_id = zope_id
+        if unchanged(day):
+            print(f'Skipping {day.human_date()} as unchanged')
+        else:
+            yield day
+
+
+class PostData:
+    """
+    What's posted for each day, rendered once and kept for checking whether the day
+    has changed, sending it and recording what was sent.
+    """
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.data: dict[date, dict[str, str]] = {}
+
+    def __call__(self, day: Period) -> dict[str, str]:
+        data = self.data.get(day.date)
+        if data is None:
+            data = self.data[day.date] = self.client.post_data(day)
+        return data
+
+    def hash(self, day: Period) -> str:
+        return Client.payload_hash(self(day))
+
+
+def already_sent(
+    manifest: UploadManifest, post_data: PostData, force: bool
+) -> Callable[[Period], bool]:
+    """
+    A check for whether a day is on the server as it was last sent, unless ``force``
+    means everything should be sent.
+    """
+
+    def check(day: Period) -> bool:
+        if force:
+            return False
+        try:
+            payload = post_data.hash(day)
+        except Exception:
+            # this is reported when the day is sent:
+            return False
+        return manifest.unchanged(day.date, day.zope_id, payload)
+
+    return check
+
+
+def record(day: Period, index: SyncIndex, manifest: UploadManifest, post_data: PostData) -> None:
+    # the index is corrected from the listing, such as with the ids of added days, when
+    # it's next reconciled:
+    index.record(day.date, day.zope_id, date.today())
+    manifest.record(day.date, day.zope_id, post_data.hash(day))
+
+
+DONE = {'add': 'Added', 'update': 'Updated'}
+
+
+def add_in_order(
+    client: Client, days: list[Period], post_data: PostData
+) -> dict[date, BaseException | None]:
+    """
+    Add ``days`` one at a time, in order, as the listing is in the order postings
+    were added, so once one fails the rest are skipped.
+    """
+    errors: dict[date, BaseException | None] = {}
+    failed = None
+    for day in days:
+        if failed is not None:
+            errors[day.date] = AddSkipped(failed)
+            continue
+        try:
+            client.add(day, post_data(day))
+        except Exception as e:
+            errors[day.date] = e
+            failed = day
+        else:
+            errors[day.date] = None
+    return errors
+
+
+def upload(
+    client: Client,
+    days: list[Period],
+    dump_path: Path,
+    index: SyncIndex,
+    manifest: UploadManifest,
+    uploads: int = 1,
+    force: bool = False,
+) -> None:
+    """
+    Send the days that need it, updating up to ``uploads`` at once in a pool while
+    later days are dumped and new days are added here, then report on each in date
+    order, recording those sent in the ``index`` and ``manifest``.
+    """
+    sent: list[tuple[Period, str]] = []
+    updates: dict[date, Future[None]] = {}
+    post_data = PostData(client)
+    skip = already_sent(manifest, post_data, force)
+    with ClientPool(client, uploads) as pool:
+        for day in changes(days, index.ids(), dump_path, skip):
+            if day.zope_id:
+                sent.append((day, 'update'))
+                # rendered in the pool, as it won't have been already if forced:
+                updates[day.date] = pool.submit(
+                    lambda client, day: client.update(day, post_data(day)), day
+                )
+            else:
+                sent.append((day, 'add'))
+        errors = add_in_order(client, [day for day, action in sent if action == 'add'], post_data)
+        for day_date, future in updates.items():
+            errors[day_date] = future.exception()
+    failed = 0
+    for day, action in sent:
+        error = errors[day.date]
+        if error is None:
+            print(f'{DONE[action]} {day.human_date()}')
+            record(day, index, manifest, post_data)
+        else:
+            failed += 1
+            print(f'Failed to {action} {day.human_date()}: {error}')
+    if failed:
+        raise RuntimeError(f'{failed} of {len(sent)} days failed to upload')
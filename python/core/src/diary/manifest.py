@@ -0,0 +1,71 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+
+@dataclass
+class Upload:
+    zope_id: str | None
+    payload: str
+    uploaded: datetime
+
+
+class UploadManifest:
+    """
+    What was last sent for each day, stored as JSON at ``path``, so days that haven't
+    changed since don't need to be sent again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.uploads: dict[date, Upload] = {}
+        try:
+            data = json.loads(path.read_text())
+            uploads = {
+                date.fromisoformat(key): Upload(
+                    upload['zope_id'], upload['payload'], datetime.fromisoformat(upload['uploaded'])
+                )
+                for key, upload in data.items()
+            }
+        except FileNotFoundError:
+            return
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # a manifest that can't be read, such as one that's been truncated, just
+            # means every day is sent again:
+            return
+        self.uploads = uploads
+
+    def unchanged(self, day: date, zope_id: str | None, payload: str) -> bool:
+        """
+        Whether ``payload`` is what was last sent for ``day``, and it's still on the
+        server as ``zope_id``. Days that were added are recorded without an id, as it
+        isn't known until the day is next seen in the listing, so any id will do for
+        those.
+        """
+        upload = self.uploads.get(day)
+        if zope_id is None or upload is None or upload.payload != payload:
+            return False
+        if upload.zope_id is None:
+            return True
+        return upload.zope_id == zope_id
+
+    def record(self, day: date, zope_id: str | None, payload: str) -> None:
+        self.uploads[day] = Upload(zope_id, payload, datetime.now(timezone.utc))
+
+    def save(self) -> None:
+        data = {
+            key.isoformat(): {
+                'zope_id': upload.zope_id,
+                'payload': upload.payload,
+                'uploaded': upload.uploaded.isoformat(),
+            }
+            for key, upload in sorted(self.uploads.items())
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # written and then renamed, so an interrupted save never loses the manifest:
+        with NamedTemporaryFile('w', dir=self.path.parent, suffix='.tmp', delete=False) as temp:
+            json.dump(data, temp, indent=1)
+        os.replace(temp.name, self.path)
@@ -1,6 +1,15 @@
+import logging
 from dataclasses import dataclass, field
 from datetime import date
 from enum import StrEnum
+from functools import lru_cache
+from sys import intern
+from typing import Sequence
+
+from diary.dates import DATE_CACHE_SIZE
+from diary.fuzzy import BKTree
+
+logger = logging.getLogger(__name__)
 
 
 class Type(StrEnum):
@@ -38,22 +47,86 @@ TYPE_SYNONYMS = {
 }
 
 
-def text_to_type(text: str) -> Type:
-    try:
-        return Type(text)
-    except ValueError:
-        type_ = TYPE_SYNONYMS.get(text)
+# how similar a misspelling must be to a known action, from 0 to 1, to be resolved:
+TYPO_CONFIDENCE = 0.8
+
+
+class TypeResolver:
+    """
+    Resolves action text to a :class:`Type`, including known synonyms and, with at least
+    the given confidence, misspellings of either.
+    """
+
+    def __init__(self, confidence: float = TYPO_CONFIDENCE):
+        self.confidence = confidence
+        self.known: dict[str, Type] = {type_.value: type_ for type_ in Type} | TYPE_SYNONYMS
+        self.index = BKTree(self.known)
+        # misspellings repeat across an import, so remember how each was resolved:
+        self.resolved: dict[str, Type | None] = {}
+        # how many times text that isn't known has been resolved:
+        self.fuzzy = 0
+
+    def __call__(self, text: str) -> Type:
+        type_ = self.known.get(text)
         if type_ is None:
-            raise
+            self.fuzzy += 1
+            if text in self.resolved:
+                type_ = self.resolved[text]
+            else:
+                type_ = self.resolved[text] = self.resolve(text)
+            if type_ is None:
+                raise ValueError(f'{text!r} is not a valid Type')
+        return type_
+
+    def resolve(self, text: str) -> Type | None:
+        # confidence is 1 - edits / length of the longer word, so no match can be further away:
+        radius = int((1 - self.confidence) * len(text) / self.confidence + 1e-9)
+        matches: dict[float, set[Type]] = {}
+        for edits, word in self.index.search(text, radius):
+            confidence = 1 - edits / max(len(text), len(word))
+            if confidence >= self.confidence:
+                matches.setdefault(confidence, set()).add(self.known[word])
+        if not matches:
+            return None
+        confidence = max(matches)
+        types = matches[confidence]
+        if len(types) > 1:
+            logger.warning(
+                '%r is equally close to %s', text, ', '.join(sorted(type_.value for type_ in types))
+            )
+            return None
+        (type_,) = types
+        logger.warning('%r resolved to %s with confidence %.2f', text, type_.value, confidence)
         return type_
 
 
-@dataclass
+type_resolver = TypeResolver()
+
+
+def use_type_resolver(resolver: TypeResolver) -> None:
+    """
+    Resolve actions using ``resolver`` in everything parsed from now on.
+    """
+    global type_resolver
+    type_resolver = resolver
+
+
+def text_to_type(text: str) -> Type:
+    return type_resolver(text)
+
+
+@dataclass(frozen=True, slots=True)
 class Stuff:
     type: Type
     title: str
     body: str | None = None
-    tags: list[str] | None = None
+    tags: Sequence[str] | None = None
+
+    def __post_init__(self):
+        # titles and tags repeat a lot over the years, so share one copy of each:
+        object.__setattr__(self, 'title', intern(self.title))
+        if self.tags is not None:
+            object.__setattr__(self, 'tags', tuple(intern(tag) for tag in self.tags))
 
     def __str__(self):
         tags = ''.join(f':{tag}' for tag in (self.tags or ()))
@@ -64,7 +137,15 @@ class Stuff:
         return text
 
 
-@dataclass
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_dates(start: date, end: date | None, format: str) -> str:
+    text = start.strftime(format)
+    if end:
+        text += end.strftime(' to ' + format)
+    return text
+
+
+@dataclass(slots=True)
 class Period:
     start: date
     stuff: list[Stuff] = field(default_factory=list)
@@ -85,17 +166,11 @@ class Period:
         assert self.end is None, str(self.end)
         return self.start
 
-    def _date(self, format):
-        text = self.start.strftime(format)
-        if self.end:
-            text += self.end.strftime(' to ' + format)
-        return text
-
     def human_date(self):
-        return self._date('%a %d %b')
+        return format_dates(self.start, self.end, '%a %d %b')
 
     def title_date(self):
-        return self._date('(%Y-%m-%d) %A')
+        return format_dates(self.start, self.end, '(%Y-%m-%d) %A')
 
     def summary(self):
         return '\n'.join(str(s) for s in self.stuff)
@@ -1,21 +1,78 @@
-from datetime import datetime
+import hashlib
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import date, datetime
+from functools import lru_cache
 from importlib.resources import files
+from pathlib import Path
+from typing import Iterable, Iterator, cast
 
-from lark import Lark, Transformer, Token
+from lark import Lark, Transformer, Token, Tree, __version__ as lark_version, v_args
+from lark.exceptions import LarkError, VisitError
 
-from diary.objects import Period, Stuff, text_to_type
+from diary.cache import LOW_WATER, cache_root
+from diary.dates import DATE_CACHE_SIZE
+import diary.objects
+from diary.objects import TYPE_SYNONYMS, Period, Stuff, text_to_type
 
 grammar = files('diary').joinpath('diary.lark').read_text()
-parser = Lark(grammar, parser='lalr')
 
 
+def cache_path() -> Path:
+    return cache_root() / f'grammar-lark-{lark_version}.cache'
+
+
+def make_parser(path: Path | None = None, transformer: Transformer | None = None) -> Lark:
+    # Lark stores a hash of the grammar and its own version in the cache file
+    # and rebuilds the tables if either has changed:
+    if path is None:
+        return Lark(grammar, parser='lalr', transformer=transformer)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return Lark(grammar, parser='lalr', transformer=transformer)
+    return Lark(grammar, parser='lalr', transformer=transformer, cache=str(path))
+
+
+# Dates repeat across reparses of the same text, so cache both directions:
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def to_date(text: str) -> date:
+    return datetime.strptime(text, '%Y-%m-%d').date()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def day_name_of(date_: date) -> str:
+    return date_.strftime('%A')
+
+
+def visit_error(f, data, children, meta):
+    # Lark doesn't wrap errors from callbacks applied while parsing, so do that here
+    # to keep them the same as when transforming a finished tree:
+    try:
+        return f(children)
+    except Exception as e:
+        raise VisitError(data, Tree(data, children), e)
+
+
+@v_args(wrapper=visit_error)
 class Diary(Transformer):
+    def transform(self, tree):
+        # the callbacks have already wrapped the error, so don't show Lark's wrapping too:
+        try:
+            return super().transform(tree)
+        except VisitError as e:
+            raise e.orig_exc from None
+
     def start(self, days):
         return days
 
     def date(self, children):
         (date_,) = children
-        return datetime.strptime(date_.value, '%Y-%m-%d').date()
+        return to_date(date_.value)
 
     def day_name(self, children):
         (day_name_,) = children
@@ -23,7 +80,7 @@ class Diary(Transformer):
 
     def date_pair(self, children):
         date, token, day_name = children
-        date_day_name = date.strftime('%A')
+        date_day_name = day_name_of(date)
         if date_day_name != day_name:
             raise AssertionError(
                 f'line {token.line}: {date} is a {date_day_name}, but day given as {day_name}'
@@ -43,6 +100,9 @@ class Diary(Transformer):
         _, *lines, _ = children
         return ''.join(lines).strip()
 
+    def tags(self, children):
+        return [tag.value[1:] for tag in children]
+
     def stuff(self, children):
         action, tags, _, title, body = children
         if isinstance(body, Token):
@@ -51,15 +111,292 @@ class Diary(Transformer):
             text_to_type(action.value),
             title.value,
             body,
-            tags=[tag.value[1:] for tag in tags.children] or None,
+            tags=tags or None,
         )
 
+    def all_stuff(self, children):
+        return children
+
     def day(self, children):
         date_, _, stuff, *_ = children
         start, end = date_
-        return Period(start, stuff.children, end=end)
+        return Period(start, stuff, end=end)
+
+
+# Apply the Diary callbacks while parsing, rather than building a tree and then
+# transforming it:
+parser = make_parser(cache_path(), Diary())
+
+
+def lark_parse(text: str) -> list[Period]:
+    return cast(list[Period], parser.parse(text))
+
+
+DATE_PAIR = r'\(([0-9]{4}-[0-9]{2}-[0-9]{2})\)[ \t]+([A-Za-z]+)'
+HEADER = re.compile(rf'{DATE_PAIR}(?:[ \t]+to[ \t]+{DATE_PAIR})?')
+UNDERLINE = re.compile('=+')
+# possessive quantifiers so this matches the way the lexer tokenizes:
+STUFF = re.compile(
+    r"([A-Z']++)((?::[A-Za-z_][A-Za-z0-9_]*+)*+)(:?)[ \t]++(.+[^:])(:*)",
+)
+BODY_MARKERS = '--', '---'
+
+
+class Unscannable(Exception):
+    pass
+
+
+def scan_date(text: str, day_name: str) -> date:
+    date_ = to_date(text)
+    if day_name_of(date_) != day_name:
+        raise Unscannable()
+    return date_
+
+
+def scan(text: str) -> list[Period] | None:
+    """
+    Fast path for the well-formed text produced by :meth:`Period.__str__`.
+    Returns ``None`` for anything it can't handle, which should then be passed to the
+    full parser.
+    """
+    lines = text.split('\n')
+    if lines.pop() != '':
+        return None
+    lines.reverse()
+    periods = []
+    try:
+        while lines:
+            header = HEADER.fullmatch(lines.pop())
+            if header is None or not UNDERLINE.fullmatch(lines.pop()):
+                return None
+            start_text, start_name, end_text, end_name = header.groups()
+            start = scan_date(start_text, start_name)
+            end = None if end_text is None else scan_date(end_text, end_name)
+            stuff = []
+            while lines and lines[-1] and not lines[-1].startswith('('):
+                stuff.append(scan_stuff(lines))
+            while lines and not lines[-1]:
+                lines.pop()
+            periods.append(Period(start, stuff, end=end))
+    except (Unscannable, ValueError, AssertionError, IndexError):
+        return None
+    return periods or None
+
+
+def scan_stuff(lines: list[str]) -> Stuff:
+    match = STUFF.fullmatch(lines.pop())
+    if match is None:
+        raise Unscannable()
+    action, tags, _, title, trailing = match.groups()
+    body = None
+    if trailing == ':' or (not trailing and lines and lines[-1] in BODY_MARKERS):
+        if lines.pop() not in BODY_MARKERS:
+            raise Unscannable()
+        body_lines = [lines.pop()]
+        while (line := lines.pop()) not in BODY_MARKERS:
+            body_lines.append(line)
+        body = '\n'.join(body_lines).strip()
+    elif trailing:
+        raise Unscannable()
+    return Stuff(
+        text_to_type(action),
+        title,
+        body,
+        tags=tags.split(':')[1:] or None,
+    )
+
+
+# A valid day that's parsed ahead of a block so line numbers in errors match the
+# position of the block in the whole stream:
+PADDING = '(2000-01-01) Saturday\n=\n'
+
+
+def split_lines(text: str) -> Iterator[str]:
+    # str.splitlines() also splits on characters the grammar treats as text:
+    lines = text.split('\n')
+    last = lines.pop()
+    for line in lines:
+        yield line + '\n'
+    if last:
+        yield last
+
+
+def day_blocks(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """
+    Split lines into the text for each day, along with the number of lines that came
+    before it.
+    """
+    block: list[str] = []
+    offset = 0
+    title = False
+    body: int | None = None
+    for line in lines:
+        content = line.rstrip('\n')
+        if body is not None:
+            if body and content in BODY_MARKERS:
+                body = None
+            else:
+                body += 1
+            title = False
+        elif title and content in BODY_MARKERS:
+            body = 0
+            title = False
+        else:
+            if content.startswith('(') and block:
+                yield offset, ''.join(block)
+                offset += len(block)
+                block = []
+            title = bool(content) and not content.startswith(('(', '='))
+        block.append(line)
+    if block:
+        yield offset, ''.join(block)
+
+
+def parse_block(offset: int, text: str) -> list[Period]:
+    periods = scan(text)
+    if periods is None:
+        if offset:
+            text = PADDING + '\n' * (offset - 2) + text
+        periods = lark_parse(text)[1 if offset else 0 :]
+    return periods
+
+
+def copy_period(period: Period) -> Period:
+    # Stuff is immutable, so can be shared:
+    return replace(period, stuff=list(period.stuff))
+
+
+# Bump this when a change means previously parsed blocks are no longer correct:
+BLOCK_CACHE_VERSION = 5
+
+
+class BlockCache:
+    """
+    Parsed periods for each day block, keyed by a hash of the block's text, so
+    that only the days that have changed need to be parsed again.
+    An LRU of blocks is kept in memory and, if a ``path`` is given, parsed blocks are
+    also stored there, with the least recently used removed once there are more than
+    ``size`` of them. It can be used from several threads at once, such as
+    those normalising pages during an export.
+    Blocks with actions that needed fuzzy resolution aren't kept, since how they
+    resolve depends on the confidence in use and they should be warned about each time.
+    """
+
+    def __init__(self, size: int = 10_000, path: Path | None = None):
+        self.size = size
+        self.path = path
+        self.periods: OrderedDict[str, list[Period]] = OrderedDict()
+        self.lock = threading.Lock()
+        # the number of blocks stored in the path, found when first needed:
+        self.stored: int | None = None
+        synonyms = sorted((text, type_.value) for text, type_ in TYPE_SYNONYMS.items())
+        salt = f'{BLOCK_CACHE_VERSION}:{lark_version}:{grammar}:{synonyms}'
+        self.hash = hashlib.sha256(salt.encode())
+
+    def key(self, text: str) -> str:
+        hash = self.hash.copy()
+        hash.update(text.encode())
+        return hash.hexdigest()
+
+    def load(self, key: str) -> list[Period] | None:
+        if self.path is None:
+            return None
+        path = self.path / f'{key}.pickle'
+        try:
+            periods = pickle.loads(path.read_bytes())
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        try:
+            # the modification time is when the block was last used:
+            os.utime(path)
+        except OSError:
+            pass
+        return periods
+
+    def save(self, key: str, periods: list[Period]) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            (self.path / f'{key}.pickle').write_bytes(pickle.dumps(periods))
+        except OSError:
+            return
+        if self.stored is None:
+            self.prune()
+        else:
+            self.stored += 1
+            if self.stored > self.size:
+                self.prune()
+
+    def prune(self) -> None:
+        assert self.path is not None
+        files = []
+        for path in self.path.glob('*.pickle'):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                # removed by another thread or process since being listed:
+                continue
+        stored = len(files)
+        if stored > self.size:
+            for _, path in sorted(files)[: stored - int(self.size * LOW_WATER)]:
+                path.unlink(missing_ok=True)
+                stored -= 1
+        self.stored = stored
+
+    def parse(self, offset: int, text: str) -> list[Period]:
+        key = self.key(text)
+        with self.lock:
+            periods = self.periods.get(key)
+            if periods is not None:
+                self.periods.move_to_end(key)
+        if periods is None:
+            # parsed without the lock, so a block may be parsed by two threads at once,
+            # but both will get the same result:
+            periods = self.load(key)
+            if periods is None:
+                resolver = diary.objects.type_resolver
+                fuzzy = resolver.fuzzy
+                periods = parse_block(offset, text)
+                if resolver.fuzzy != fuzzy:
+                    return periods
+                self.save(key, periods)
+            with self.lock:
+                self.periods[key] = periods
+                if len(self.periods) > self.size:
+                    self.periods.popitem(last=False)
+        # callers are free to modify what they're given:
+        return [copy_period(period) for period in periods]
+
+
+block_cache = BlockCache()
+
+
+def iter_parse(lines: Iterable[str], cache: BlockCache | None = block_cache) -> Iterator[Period]:
+    """
+    Parse an open file, or any other source of lines, yielding each :class:`Period`
+    as soon as its day has been read.
+    """
+    blocks = day_blocks(lines)
+    for offset, text in blocks:
+        try:
+            periods = parse_block(offset, text) if cache is None else cache.parse(offset, text)
+        except LarkError:
+            # what's wrong may only show up in what follows, such as a title with no
+            # underline, so parse the next day along with it to get the error the full
+            # parser would give:
+            following = next(blocks, None)
+            if following is None:
+                raise
+            periods = parse_block(offset, text + following[1])
+        yield from periods
 
 
-def parse(text: str) -> list[Period]:
-    tree = parser.parse(text)
-    return Diary().transform(tree)
+def parse(text: str, cache: BlockCache | None = block_cache) -> list[Period]:
+    try:
+        periods = list(iter_parse(split_lines(text), cache))
+    except LarkError:
+        # days are parsed on their own, so give the error for the text as a whole:
+        periods = []
+    # empty text has no blocks, but the full parser will give the right error:
+    return periods or lark_parse(text)
@@ -0,0 +1,261 @@
+import mmap
+import struct
+from bisect import bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from diary.objects import Period, Stuff, Type
+
+MAGIC = b'DIARYSNP'
+VERSION = 1
+# magic, version, number of periods, number of strings, then the offsets of the bodies,
+# the strings, the string offsets, the period offsets and the period starts:
+HEADER = struct.Struct('<8sHIIQQQQQ')
+
+TYPES = tuple(Type)
+TYPE_CODES = {type_: code for code, type_ in enumerate(TYPES)}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: mmap.mmap | bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def read_varints(data: bytes) -> list[int]:
+    values = []
+    value = shift = 0
+    for byte in data:
+        if byte < 0x80:
+            values.append(value | byte << shift)
+            value = shift = 0
+        else:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+    return values
+
+
+class Strings:
+    def __init__(self):
+        self.indexes: dict[str, int] = {}
+
+    def __call__(self, text: str | None) -> int:
+        # zero is used for None:
+        if text is None:
+            return 0
+        index = self.indexes.get(text)
+        if index is None:
+            index = self.indexes[text] = len(self.indexes) + 1
+        return index
+
+
+def ordinal(value: date | None) -> int:
+    return 0 if value is None else value.toordinal()
+
+
+def save(periods: Iterable[Period], path: Path) -> None:
+    """
+    Write the periods, which must be in date order, to a snapshot file at ``path``.
+    """
+    strings = Strings()
+    # records are entirely varints, so can be decoded in bulk:
+    records = bytearray()
+    bodies = bytearray()
+    offsets = []
+    starts = []
+    for period in periods:
+        offsets.append(HEADER.size + len(records))
+        start = period.start.toordinal()
+        starts.append(start)
+        # the start is in the index, so isn't repeated here:
+        for value in (
+            # periods are short, so store the end relative to the start:
+            0 if period.end is None else period.end.toordinal() - start,
+            strings(period.zope_id),
+            strings(period.start_url),
+            ordinal(period.start_date),
+            ordinal(period.modified),
+            len(period.stuff),
+        ):
+            write_varint(records, value)
+        for stuff in period.stuff:
+            write_varint(records, TYPE_CODES[stuff.type])
+            write_varint(records, strings(stuff.title))
+            write_varint(records, len(stuff.tags or ()))
+            for tag in stuff.tags or ():
+                write_varint(records, strings(tag))
+            if stuff.body is None:
+                write_varint(records, 0)
+            else:
+                write_varint(records, len(bodies) + 1)
+                body = stuff.body.encode()
+                write_varint(bodies, len(body))
+                bodies += body
+    bodies_start = HEADER.size + len(records)
+    strings_start = bodies_start + len(bodies)
+    table = bytearray()
+    string_offsets = []
+    for text in strings.indexes:
+        string_offsets.append(strings_start + len(table))
+        table += text.encode()
+    string_index = strings_start + len(table)
+    # the end of the last string is the start of the index:
+    string_offsets.append(string_index)
+    period_index = string_index + 8 * len(string_offsets)
+    start_index = period_index + 8 * len(offsets)
+    with path.open('wb') as target:
+        target.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(offsets),
+                len(strings.indexes),
+                bodies_start,
+                strings_start,
+                string_index,
+                period_index,
+                start_index,
+            )
+        )
+        target.write(records)
+        target.write(bodies)
+        target.write(table)
+        target.write(struct.pack(f'<{len(string_offsets)}Q', *string_offsets))
+        target.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        target.write(struct.pack(f'<{len(starts)}I', *starts))
+
+
+class Snapshot:
+    """
+    A memory-mapped snapshot file, where each period and string is only decoded when
+    it is needed.
+    """
+
+    def __init__(self, path: Path):
+        with path.open('rb') as source:
+            try:
+                self.data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f'{path} is empty')
+        try:
+            (
+                magic,
+                version,
+                self.count,
+                strings,
+                self.bodies_start,
+                self.strings_start,
+                string_index,
+                self.period_index,
+                start_index,
+            ) = HEADER.unpack_from(self.data)
+        except struct.error:
+            self.close()
+            raise SnapshotError(f'{path} is too short to be a snapshot')
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise SnapshotError(f'{path} is not a version {VERSION} snapshot')
+        self.string_offsets = struct.unpack_from(f'<{strings + 1}Q', self.data, string_index)
+        self.starts = struct.unpack_from(f'<{self.count}I', self.data, start_index)
+        self.strings: dict[int, str] = {}
+
+    def close(self) -> None:
+        self.data.close()
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def string(self, index: int) -> str:
+        text = self.strings.get(index)
+        if text is None:
+            start, end = self.string_offsets[index - 1 : index + 1]
+            text = self.strings[index] = str(self.data[start:end], 'utf-8')
+        return text
+
+    def body(self, index: int) -> str | None:
+        if not index:
+            return None
+        length, offset = read_varint(self.data, self.bodies_start + index - 1)
+        return str(self.data[offset : offset + length], 'utf-8')
+
+    def __getitem__(self, index: int) -> Period:
+        if not -self.count <= index < self.count:
+            raise IndexError(index)
+        (offset,) = struct.unpack_from(
+            '<Q', self.data, self.period_index + 8 * (index % self.count)
+        )
+
+        def values() -> Iterator[int]:
+            nonlocal offset
+            while True:
+                value, offset = read_varint(self.data, offset)
+                yield value
+
+        return self.decode(self.starts[index], values(), self.string)
+
+    def __iter__(self) -> Iterator[Period]:
+        # everything is being decoded, so do the strings and varints in bulk:
+        data = self.data
+        offsets = self.string_offsets
+        strings = [''] + [str(data[start:end], 'utf-8') for start, end in zip(offsets, offsets[1:])]
+        values = iter(read_varints(data[HEADER.size : self.bodies_start]))
+        for start in self.starts:
+            yield self.decode(start, values, strings.__getitem__)
+
+    def decode(self, start: int, values: Iterator[int], string: Callable[[int], str]) -> Period:
+        end, zope_id, start_url, start_date, modified, count = (next(values) for _ in range(6))
+        stuff = []
+        for _ in range(count):
+            type_ = TYPES[next(values)]
+            title = string(next(values))
+            tags = [string(next(values)) for _ in range(next(values))]
+            stuff.append(Stuff(type_, title, self.body(next(values)), tags or None))
+        return Period(
+            date.fromordinal(start),
+            stuff,
+            date.fromordinal(start + end) if end else None,
+            string(zope_id) if zope_id else None,
+            string(start_url) if start_url else None,
+            date.fromordinal(start_date) if start_date else None,
+            date.fromordinal(modified) if modified else None,
+        )
+
+    def find(self, day: date) -> Period | None:
+        """
+        The period covering the given day, if there is one.
+        """
+        index = bisect_right(self.starts, day.toordinal()) - 1
+        if index < 0:
+            return None
+        period = self[index]
+        if day != period.start and (period.end is None or day > period.end):
+            return None
+        return period
+
+
+def load(path: Path) -> list[Period]:
+    with Snapshot(path) as snapshot:
+        return list(snapshot)
@@ -0,0 +1,219 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Literal
+
+import numpy as np
+
+from diary.objects import Period, Stuff, Type
+
+TYPES = tuple(Type)
+TYPE_CODES = {type_: code for code, type_ in enumerate(TYPES)}
+STRING = np.dtypes.StringDType(na_object=None)
+# datetime64 days count from 1970-01-01, date ordinals from 0001-01-01:
+EPOCH = date(1970, 1, 1).toordinal()
+
+Unit = Literal['D', 'M', 'Y']
+
+
+def ordinals(dates: Iterable[date | None]) -> np.ndarray:
+    # no date has an ordinal of zero, so that's used for None:
+    return np.array([0 if d is None else d.toordinal() for d in dates], dtype=np.int32)
+
+
+def to_date(ordinal: int) -> date | None:
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def offsets(lengths: Iterable[int] | np.ndarray) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum(np.fromiter(lengths, dtype=np.int64))))
+
+
+@dataclass
+class PeriodTable:
+    """
+    A columnar version of a list of :class:`~diary.objects.Period` objects, with
+    one row per period and one row per :class:`~diary.objects.Stuff`.
+    Dates are stored as ordinals, with zero meaning :any:`None`.
+    The stuff for period ``i`` is in rows ``stuff_offsets[i]:stuff_offsets[i+1]`` and
+    the tags for stuff ``j`` are ``tags[tag_ids[tag_offsets[j]:tag_offsets[j+1]]]``.
+    """
+
+    # one row per period:
+    start: np.ndarray
+    end: np.ndarray
+    zope_id: np.ndarray
+    start_url: np.ndarray
+    start_date: np.ndarray
+    modified: np.ndarray
+    stuff_offsets: np.ndarray
+    # one row per stuff:
+    period: np.ndarray
+    type: np.ndarray
+    title: np.ndarray
+    body: np.ndarray
+    tag_offsets: np.ndarray
+    tag_ids: np.ndarray
+    # sorted tag vocabulary:
+    tags: np.ndarray
+
+    @classmethod
+    def from_periods(cls, periods: list[Period]) -> 'PeriodTable':
+        stuff = [s for period in periods for s in period.stuff]
+        tags = sorted({tag for s in stuff for tag in (s.tags or ())})
+        tag_codes = {tag: code for code, tag in enumerate(tags)}
+        stuff_offsets = offsets(len(period.stuff) for period in periods)
+        return cls(
+            start=ordinals(period.start for period in periods),
+            end=ordinals(period.end for period in periods),
+            zope_id=np.array([period.zope_id for period in periods], dtype=STRING),
+            start_url=np.array([period.start_url for period in periods], dtype=STRING),
+            start_date=ordinals(period.start_date for period in periods),
+            modified=ordinals(period.modified for period in periods),
+            stuff_offsets=stuff_offsets,
+            period=np.repeat(np.arange(len(periods)), np.diff(stuff_offsets)),
+            type=np.array([TYPE_CODES[s.type] for s in stuff], dtype=np.uint8),
+            title=np.array([s.title for s in stuff], dtype=STRING),
+            body=np.array([s.body for s in stuff], dtype=STRING),
+            tag_offsets=offsets(len(s.tags or ()) for s in stuff),
+            tag_ids=np.array(
+                [tag_codes[tag] for s in stuff for tag in (s.tags or ())], dtype=np.int32
+            ),
+            tags=np.array(tags, dtype=STRING),
+        )
+
+    def to_periods(self) -> list[Period]:
+        """
+        The periods in this table. Stuff without tags has ``tags=None``, as when parsed.
+        """
+        tags = self.tags.tolist()
+        tag_ids = self.tag_ids.tolist()
+        tag_offsets = self.tag_offsets.tolist()
+        stuff = [
+            Stuff(
+                TYPES[code],
+                title,
+                body,
+                tuple(tags[i] for i in tag_ids[tag_offsets[j] : tag_offsets[j + 1]]) or None,
+            )
+            for j, (code, title, body) in enumerate(
+                zip(self.type.tolist(), self.title.tolist(), self.body.tolist())
+            )
+        ]
+        stuff_offsets = self.stuff_offsets.tolist()
+        return [
+            Period(
+                date.fromordinal(start),
+                stuff[stuff_offsets[i] : stuff_offsets[i + 1]],
+                to_date(end),
+                zope_id,
+                start_url,
+                to_date(start_date),
+                to_date(modified),
+            )
+            for i, (start, end, zope_id, start_url, start_date, modified) in enumerate(
+                zip(
+                    self.start.tolist(),
+                    self.end.tolist(),
+                    self.zope_id.tolist(),
+                    self.start_url.tolist(),
+                    self.start_date.tolist(),
+                    self.modified.tolist(),
+                )
+            )
+        ]
+
+    def day(self) -> np.ndarray:
+        """
+        The start date of the period containing each stuff, as ``datetime64[D]``.
+        """
+        return (self.start[self.period] - EPOCH).astype('datetime64[D]')
+
+    def tagged(self, tag: str) -> np.ndarray:
+        mask = np.zeros(len(self.type), dtype=bool)
+        code = np.searchsorted(self.tags, tag)
+        if code < len(self.tags) and self.tags[code] == tag:
+            rows = np.repeat(np.arange(len(self.type)), np.diff(self.tag_offsets))
+            mask[rows[self.tag_ids == code]] = True
+        return mask
+
+    def where(
+        self,
+        types: Iterable[Type] | None = None,
+        tag: str | None = None,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> np.ndarray:
+        """
+        A mask selecting the stuff of the given types, with the given tag, in periods
+        starting between ``start`` and ``end``, inclusive.
+        """
+        mask = np.ones(len(self.type), dtype=bool)
+        if types is not None:
+            mask &= np.isin(self.type, [TYPE_CODES[type_] for type_ in types])
+        if tag is not None:
+            mask &= self.tagged(tag)
+        if start is not None:
+            mask &= self.start[self.period] >= start.toordinal()
+        if end is not None:
+            mask &= self.start[self.period] <= end.toordinal()
+        return mask
+
+    def select(self, mask: np.ndarray) -> 'PeriodTable':
+        """
+        A table containing every period, but only the stuff selected by ``mask``.
+        """
+        tag_lengths = np.diff(self.tag_offsets)
+        tag_rows = np.repeat(np.arange(len(self.type)), tag_lengths)
+        return PeriodTable(
+            start=self.start,
+            end=self.end,
+            zope_id=self.zope_id,
+            start_url=self.start_url,
+            start_date=self.start_date,
+            modified=self.modified,
+            stuff_offsets=offsets(np.bincount(self.period[mask], minlength=len(self.start))),
+            period=self.period[mask],
+            type=self.type[mask],
+            title=self.title[mask],
+            body=self.body[mask],
+            tag_offsets=offsets(tag_lengths[mask]),
+            tag_ids=self.tag_ids[mask[tag_rows]],
+            tags=self.tags,
+        )
+
+    def count(
+        self, buckets: np.ndarray, columns: np.ndarray, width: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        keys, index = np.unique(buckets, return_inverse=True)
+        counts = np.bincount(index * width + columns, minlength=len(keys) * width)
+        return keys, counts.reshape(len(keys), width)
+
+    def type_counts(
+        self, unit: Unit = 'M', mask: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The number of each :class:`~diary.objects.Type` of stuff in each day, month or
+        year, returned as the ``datetime64`` buckets along with a count for each bucket
+        and type, in the order the types are defined.
+        """
+        buckets = self.day().astype(f'datetime64[{unit}]')
+        types = self.type.astype(np.int64)
+        if mask is not None:
+            buckets, types = buckets[mask], types[mask]
+        return self.count(buckets, types, len(TYPES))
+
+    def tag_counts(
+        self, unit: Unit = 'Y', mask: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The number of uses of each tag in each day, month or year, returned as the
+        ``datetime64`` buckets along with a count for each bucket and entry in
+        :attr:`tags`.
+        """
+        rows = np.repeat(np.arange(len(self.type)), np.diff(self.tag_offsets))
+        tag_ids = self.tag_ids.astype(np.int64)
+        if mask is not None:
+            keep = mask[rows]
+            rows, tag_ids = rows[keep], tag_ids[keep]
+        buckets = self.day().astype(f'datetime64[{unit}]')[rows]
+        return self.count(buckets, tag_ids, len(self.tags))
@@ -1,15 +1,29 @@
 import calendar
+import logging
 import re
-from dataclasses import dataclass
+import threading
+from contextlib import closing
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import date, datetime, timedelta
-from typing import Iterable, Callable
-
-from bs4 import BeautifulSoup
-from requests import Session, Response
+from functools import cached_property, lru_cache
+from hashlib import sha256
+from pathlib import Path
+from queue import Queue
+from random import uniform
+from time import monotonic, sleep
+from typing import Callable, Generator, Self, TypeVar, TYPE_CHECKING
 
+from diary.cache import ResponseCache
+from diary.dates import DATE_CACHE_SIZE
+from diary.extract import EXTRACTORS, Extractor, Form, Listing
 from diary.objects import Period
 from diary.parse import parse
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from requests import Session, Response
+
 DATE_FORMAT = '(%Y-%m-%d) %A'
 
 DAY_PATTERN = r'(?:(\w+)\s+)?(\d{1,2})?(?:rd|th|st|nd)?(?: (\w+))?(?: (\d+))?'
@@ -17,6 +31,47 @@ DAY_RANGE_PATTERN = re.compile(rf'^{DAY_PATTERN}(?:\s*(?:-|to)\s*{DAY_PATTERN})?
 
 MONTH_ALIASES = {'Sept': 'September'}
 
+# full and abbreviated names, indexed by date.weekday() and date.month, so entries can
+# be checked without formatting dates:
+DAY_NAMES = tuple(zip(calendar.day_name, calendar.day_abbr))
+MONTH_NAMES = tuple(zip(calendar.month_name, calendar.month_abbr))
+WEEKDAYS = {name: weekday for weekday, (name, _) in enumerate(DAY_NAMES)}
+
+# DATE_FORMAT, as written for every entry since it was introduced:
+CANONICAL_DATE = re.compile(r'\(([0-9]{4})-([0-9]{2})-([0-9]{2})\) (\w+)')
+
+# the query parameter in a listing's next link giving the offset of that page's batch:
+BATCH_START = re.compile(r'[?&][^=&]*start[^=&]*=(\d+)')
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+
+def retryable(e: Exception) -> bool:
+    from requests import ConnectionError, HTTPError, Timeout
+
+    if isinstance(e, HTTPError):
+        return e.response is not None and (
+            e.response.status_code == 429 or e.response.status_code >= 500
+        )
+    return isinstance(e, (ConnectionError, Timeout))
+
+
+def days_back(start: date, day_number: int) -> int | None:
+    """
+    How many days before ``start`` the nearest date on ``day_number`` of its month is,
+    or ``None`` if no month has that day.
+    """
+    if not 1 <= day_number <= 31:
+        return None
+    offset = 0
+    while day_number > start.day:
+        # back to the last day of the previous month:
+        offset += start.day
+        start -= timedelta(days=start.day)
+    return offset + start.day - day_number
+
 
 class LookBackFailed(ValueError):
     def __init__(self, possible: date, text: str):
@@ -32,29 +87,130 @@ class Client:
     url: str
     username: str
     password: str
+    # connections to keep open to the server:
+    pool_size: int = 10
+    # seconds to wait for a connection and then for each read from it:
+    connect_timeout: float = 10
+    read_timeout: float = 60
+    # seconds a single GET or POST may take, including any retries; each request made
+    # while reading a listing or exporting gets its own deadline:
+    deadline: float | None = None
+    # GETs are retried after a connection error, timeout or server error, waiting a
+    # random time up to backoff seconds, doubling on each retry up to max_backoff:
+    retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 30
+    # directory in which to cache GET responses and the most bytes it may hold:
+    cache_path: str | None = None
+    cache_size: int = 100 * 2**20
+    # use cached pages changed before they were cached without asking the server:
+    trust_modified: bool = False
+    # how to extract what's needed from pages, one of EXTRACTORS:
+    html_backend: str = 'stream'
+
+    @cached_property
+    def extractor(self) -> Extractor:
+        return EXTRACTORS[self.html_backend]()
 
-    def __post_init__(self):
-        self.session: Session = Session()
-        self.session.auth = (self.username, self.password)
+    @cached_property
+    def cache(self) -> ResponseCache | None:
+        if self.cache_path is None:
+            return None
+        return ResponseCache(Path(self.cache_path).expanduser(), self.cache_size)
+
+    @cached_property
+    def session(self) -> 'Session':
+        from requests import Session
+        from requests.adapters import HTTPAdapter
+
+        session = Session()
+        session.auth = (self.username, self.password)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
 
     def request(self, method: str, uri: str, absolute=False, **kw):
         if not absolute:
             uri = self.url + uri
-        result = getattr(self.session, method)(uri, **kw)
-        result.raise_for_status()
-        return result
+        # only GETs are safe to repeat, a POST that timed out may still have been made:
+        retries = self.retries if method == 'get' else 0
+        deadline = None if self.deadline is None else monotonic() + self.deadline
+        error = None
+        for attempt in range(retries + 1):
+            connect_timeout, read_timeout = self.connect_timeout, self.read_timeout
+            if deadline is not None:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    from requests import Timeout
 
-    def get(self, uri: str, absolute: bool = False) -> Response:
-        return self.request('get', uri, absolute)
+                    raise Timeout(
+                        f'{method.upper()} {uri} not done within {self.deadline}s'
+                    ) from error
+                connect_timeout = min(connect_timeout, remaining)
+                read_timeout = min(read_timeout, remaining)
+            try:
+                result = getattr(self.session, method)(
+                    uri, timeout=(connect_timeout, read_timeout), **kw
+                )
+                result.raise_for_status()
+                return result
+            except Exception as e:
+                if attempt == retries or not retryable(e):
+                    raise
+                error = e
+                delay = uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+                if deadline is not None and monotonic() + delay >= deadline:
+                    raise
+                logger.warning('Retrying %s %s in %.1fs after %s', method.upper(), uri, delay, e)
+                sleep(delay)
 
-    def get_soup(self, uri: str, absolute: bool = False) -> BeautifulSoup:
-        content = self.get(uri, absolute).content.decode('latin-1')
-        return BeautifulSoup(content, features="html.parser")
+    def get(self, uri: str, absolute: bool = False, modified: date | None = None) -> 'Response':
+        """
+        Get a page, using a cached copy if the server says it hasn't changed.
+        With :attr:`trust_modified`, a copy cached after ``modified``, the date the page
+        last changed, is used without asking.
+        """
+        if self.cache is None:
+            return self.request('get', uri, absolute)
+        url = uri if absolute else self.url + uri
+        entry = self.cache.get(url)
+        if entry is None:
+            headers = {}
+        elif self.trust_modified and modified is not None and entry.fetched.date() > modified:
+            return entry.response()
+        else:
+            headers = entry.validators()
+        response = self.request('get', url, True, headers=headers)
+        if entry is not None and response.status_code == 304:
+            return entry.response()
+        self.cache.put(url, response)
+        return response
 
-    def post(self, uri: str, data: dict[str, str]) -> Response:
+    def get_text(self, uri: str, absolute: bool = False, modified: date | None = None) -> str:
+        return self.get(uri, absolute, modified).content.decode('latin-1')
+
+    def get_soup(
+        self, uri: str, absolute: bool = False, modified: date | None = None
+    ) -> 'BeautifulSoup':
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(self.get_text(uri, absolute, modified), features="html.parser")
+
+    def get_listing(self, uri: str) -> Listing:
+        return self.extractor.listing(self.get_text(uri))
+
+    def get_form(self, uri: str, absolute: bool = False, modified: date | None = None) -> Form:
+        return self.extractor.form(self.get_text(uri, absolute, modified))
+
+    def post(self, uri: str, data: dict[str, str]) -> 'Response':
         return self.request('post', uri, data=data)
 
-    def _post_data(self, day) -> dict[str, str]:
+    def post_data(self, day: Period) -> dict[str, str]:
+        """
+        What's posted for ``day``. Rendering a day isn't cached, so callers that need
+        this more than once should keep it.
+        """
         try:
             summary = day.summary().encode('latin-1')
         except UnicodeEncodeError as e:
@@ -67,14 +223,22 @@ class Client:
             'addPosting:method': ' Add ',
         }
 
-    def add(self, day: Period):
-        data = self._post_data(day)
+    @staticmethod
+    def payload_hash(data: dict[str, str]) -> str:
+        """
+        A hash of the ``data`` posted for a day, to tell whether it has changed since
+        it was last sent.
+        """
+        return sha256(repr(sorted(data.items())).encode()).hexdigest()
+
+    def add(self, day: Period, data: dict[str, str] | None = None):
+        data = dict(data or self.post_data(day))
         data['addPosting:method'] = ' Add '
         self.post('', data=data)
 
-    def update(self, day: Period):
+    def update(self, day: Period, data: dict[str, str] | None = None):
         assert day.zope_id
-        data = self._post_data(day)
+        data = dict(data or self.post_data(day))
         data['edit:method'] = 'Change'
         self.post(f'/{day.zope_id}', data=data)
 
@@ -90,65 +254,78 @@ class Client:
         max_days: int,
     ):
         day_number = int(day_number_text)
-        for i in range(max_days):
-            possible = start - timedelta(days=i)
-            if possible.day == day_number:
-                break
-        else:
-            raise LookBackFailed(possible, text) from None
+        offset = days_back(start, day_number)
+        if offset is None or offset >= max_days:
+            raise LookBackFailed(start - timedelta(days=max_days - 1), text)
+        possible = start - timedelta(days=offset)
         if day_name:
-            possible_day_names = possible.strftime('%A'), possible.strftime('%a')
+            possible_day_names = DAY_NAMES[possible.weekday()]
             if day_name not in possible_day_names:
                 raise AssertionError(
                     f'{possible} was a {possible_day_names[0]}, but entry had {day_name}'
                 )
         if month_name:
             month_name = MONTH_ALIASES.get(month_name, month_name)
-            possible_month_names = possible.strftime('%B'), possible.strftime('%b')
+            possible_month_names = MONTH_NAMES[possible.month]
             if month_name not in possible_month_names:
                 raise AssertionError(
                     f'{possible} was in {possible_month_names[0]}, but entry had {month_name}'
                 )
         if year_text:
-            possible_year = possible.strftime('%Y')
+            possible_year = str(possible.year)
             if year_text != possible_year:
                 raise AssertionError(
                     f'{possible} was in {possible_year}, but entry had {year_text}'
                 )
         return possible
 
-    @classmethod
-    def infer_date(cls, text: str, previous: date | None = None):
+    @staticmethod
+    @lru_cache(maxsize=DATE_CACHE_SIZE)
+    def infer_date(text: str, previous: date | None = None) -> tuple[date, date | None]:
+        """
+        The start and any end of the period an entry in the listing is for, given the
+        date of the period after it. Results are cached, as the same entries are seen
+        each time the listing is read, and ``Client.infer_date.cache_clear()`` empties
+        the cache.
+        """
         text = text.strip()
-        try:
-            inferred = datetime.strptime(text, DATE_FORMAT).date()
-        except ValueError:
-            match = DAY_RANGE_PATTERN.match(text)
-            if not match:
-                if text in calendar.day_name and previous is not None:
-                    for i in range(1, 5):
-                        possible = previous - timedelta(days=i)
-                        if possible.strftime('%A') == text:
-                            return possible, None
-                raise ValueError(f'Bad format: {text!r}')
-            name, day, month, year, end_name, end_day, end_month, end_year = match.groups()
-            if end_day and previous is not None:
-                end = cls.lookback(
-                    previous, text, end_name, end_day, end_month, end_year, max_days=5
-                )
-                if day and month and year:
-                    start = datetime.strptime(f'{day} {month} {year}', '%d %b %Y').date()
+        if text.startswith('('):
+            canonical = CANONICAL_DATE.fullmatch(text)
+            if canonical:
+                year, month, day, name = canonical.groups()
+                try:
+                    inferred = date(int(year), int(month), int(day))
+                except ValueError:
+                    pass
                 else:
-                    start = cls.lookback(end, text, name, day, month, year, max_days=25)
-                return start, end
+                    if DAY_NAMES[inferred.weekday()][0] == name:
+                        return inferred, None
+            # anything else in brackets isn't quite DATE_FORMAT, so parse it to say why:
+            try:
+                inferred = datetime.strptime(text, DATE_FORMAT).date()
+            except ValueError:
+                raise ValueError(f'Bad format: {text!r}') from None
+            raise AssertionError(f'{inferred:%d %b %y} was a {inferred:%A}, got: {text}')
+        match = DAY_RANGE_PATTERN.match(text)
+        if not match:
+            if text in WEEKDAYS and previous is not None:
+                offset = (previous.weekday() - WEEKDAYS[text]) % 7
+                if 1 <= offset <= 4:
+                    return previous - timedelta(days=offset), None
+            raise ValueError(f'Bad format: {text!r}')
+        name, day, month, year, end_name, end_day, end_month, end_year = match.groups()
+        if end_day and previous is not None:
+            end = Client.lookback(
+                previous, text, end_name, end_day, end_month, end_year, max_days=5
+            )
+            if day and month and year:
+                start = datetime.strptime(f'{day} {month} {year}', '%d %b %Y').date()
             else:
-                if previous is None:
-                    raise ValueError(f'Need previous date for: {text!r}')
-                inferred = cls.lookback(previous, text, name, day, month, year, max_days=5)
-        else:
-            formatted = inferred.strftime(DATE_FORMAT)
-            assert formatted == text, f'{inferred:%d %b %y} was a {inferred:%A}, got: {text}'
-        return inferred, None
+                start = Client.lookback(end, text, name, day, month, year, max_days=25)
+            return start, end
+        if previous is None:
+            raise ValueError(f'Need previous date for: {text!r}')
+        return Client.lookback(previous, text, name, day, month, year, max_days=5), None
 
     def list(
         self,
@@ -156,41 +333,195 @@ class Client:
         handle_error: Callable[[Exception, str, date], bool] = lambda e, url, dt: False,
         next_url: str = '',
         seen: date = date.max,
-    ) -> Iterable[Period]:
-        while earliest < seen:
-            soup = self.get_soup(next_url)
-            start_date = seen
-            for tag in soup.find_all('a', attrs={'name': True}):
-                date_tag = tag.find_next('strong')
-                read_url = date_tag.find_next('a', attrs={'class': 'read'})['href']
-                zope_id = read_url.rsplit('/', 1)[-1]
-                modified = datetime.strptime(tag['name'], '%Y-%m-%dT%H:%M:%SZ')
-                try:
-                    start, end = self.infer_date(date_tag.text, seen)
-                except Exception as e:
-                    if handle_error(e, read_url, modified):
-                        continue
-                    else:
-                        raise
-                seen = start
-                if start < earliest:
-                    break
-                yield Period(
-                    start,
-                    end=end,
-                    zope_id=zope_id,
-                    start_url=next_url,
-                    start_date=start_date,
-                    modified=modified.date(),
-                )
+        prefetch: int = 0,
+        latest: date = date.max,
+    ) -> Generator[Period, None, None]:
+        """
+        Yield the periods in the listing, newest first, until one before ``earliest``
+        is seen, leaving out any after ``latest``. With ``prefetch``, up to that many
+        pages after the current one are fetched in the background.
+        """
+        if latest < seen and not next_url:
+            next_url, seen = self.seek(latest)
+        if earliest >= seen:
+            return
+        with closing(self.listings(next_url, prefetch)) as pages:
+            for url, page in pages:
+                seen, _ = yield from self.listing(page, earliest, handle_error, url, seen, latest)
+                if earliest >= seen:
+                    return
+
+    def seek(self, latest: date) -> tuple[str, date]:
+        """
+        Find the first page of the listing that may have periods on or before
+        ``latest``, returning its url and the date of the last period before it.
+        The pages are found by galloping and then binary searching over the batch
+        offsets in the listing's next links. Without those, this is the first page.
+        """
+        first = self.get_listing('')
+        next_url = first.next_url
+        match = BATCH_START.search(next_url or '')
+        if next_url is None or match is None:
+            return '', date.max
+        step = int(match.group(1))
+
+        def url(number: int) -> str:
+            return f'{next_url[: match.start(1)]}{number * step}{next_url[match.end(1) :]}'
+
+        last: dict[int, date | None] = {0: self.last_date(first)}
 
-            next_link = soup.html.find_next('a', attrs={'class': 'next'}) if soup.html else None
-            if next_link is None:
+        def newer(number: int) -> bool:
+            # whether every period on the page is after latest:
+            if number not in last:
+                last[number] = self.last_date(self.get_listing(url(number)))
+            seen = last[number]
+            return seen is not None and seen > latest
+
+        if not newer(0):
+            return '', date.max
+        low, high = 0, 1
+        while newer(high):
+            low, high = high, high * 2
+        while high - low > 1:
+            middle = (low + high) // 2
+            if newer(middle):
+                low = middle
+            else:
+                high = middle
+        seen = last[low]
+        assert seen is not None
+        return url(high), seen
+
+    @classmethod
+    def last_date(cls, page: Listing) -> date | None:
+        """
+        The date of the last period on a listing page, if it can be inferred from the
+        first with a full date. Empty pages, such as those past the end, have none,
+        and neither do pages whose last entry can't be placed, as the page may go back
+        further than the entries before it show.
+        """
+        seen = last = None
+        for entry in page.entries:
+            last = None
+            if entry.date is None:
+                continue
+            try:
+                seen, _ = cls.infer_date(entry.date, seen)
+            except Exception:
+                continue
+            last = seen
+        return last
+
+    def listings(
+        self, next_url: str, prefetch: int = 0
+    ) -> Generator[tuple[str, Listing], None, None]:
+        """
+        Yield the url and contents of each page of the listing in turn, starting at
+        ``next_url``, keeping up to ``prefetch`` pages fetched ahead of the one yielded.
+        """
+        if not prefetch:
+            while True:
+                page = self.get_listing(next_url)
+                yield next_url, page
+                if page.next_url is None:
+                    return
+                next_url = page.next_url
+        pages: Queue[tuple[str, Listing] | Exception] = Queue()
+        # one for the page yielded and one for each page fetched ahead of it:
+        slots = threading.Semaphore(prefetch + 1)
+        stop = threading.Event()
+        # a daemon thread, with its own copy of the client, so a listing that's never
+        # closed, such as one kept alive by an error's traceback, can't stop the process
+        # from exiting:
+        fetcher = threading.Thread(
+            target=replace(self).fetch_listings,
+            args=(next_url, pages, slots, stop),
+            name='zope-listings',
+            daemon=True,
+        )
+        fetcher.start()
+        try:
+            while True:
+                fetched = pages.get()
+                if isinstance(fetched, Exception):
+                    raise fetched
+                yield fetched
+                if fetched[1].next_url is None:
+                    return
+                slots.release()
+        finally:
+            stop.set()
+            slots.release()
+            fetcher.join()
+
+    def fetch_listings(
+        self,
+        next_url: str,
+        pages: 'Queue[tuple[str, Listing] | Exception]',
+        slots: threading.Semaphore,
+        stop: threading.Event,
+    ) -> None:
+        """
+        Put each page of the listing on ``pages``, fetching each once there's a free
+        slot, until the last page has been fetched, one fails or ``stop`` is set.
+        """
+        while True:
+            slots.acquire()
+            if stop.is_set():
                 return
-            href = next_link.get('href') if hasattr(next_link, 'get') else None
-            if href is None:
+            try:
+                page = self.get_listing(next_url)
+            except Exception as e:
+                pages.put(e)
                 return
-            next_url = str(href)
+            pages.put((next_url, page))
+            if page.next_url is None:
+                return
+            next_url = page.next_url
+
+    @classmethod
+    def listing(
+        cls,
+        page: Listing,
+        earliest: date,
+        handle_error: Callable[[Exception, str, date], bool],
+        next_url: str,
+        seen: date,
+        latest: date = date.max,
+    ) -> Generator[Period, None, tuple[date, str | None]]:
+        """
+        Yield the periods on one page of the listing, leaving out any after ``latest``,
+        returning the earliest date seen and the url of the next page, if there is one.
+        """
+        start_date = seen
+        for entry in page.entries:
+            read_url = entry.read_url
+            if entry.date is None or read_url is None:
+                raise ValueError(f'No date and read link after anchor {entry.modified!r}')
+            zope_id = read_url.rsplit('/', 1)[-1]
+            modified = datetime.strptime(entry.modified, '%Y-%m-%dT%H:%M:%SZ')
+            try:
+                start, end = cls.infer_date(entry.date, seen)
+            except Exception as e:
+                if handle_error(e, read_url, modified):
+                    continue
+                else:
+                    raise
+            seen = start
+            if start < earliest:
+                break
+            if start > latest:
+                continue
+            yield Period(
+                start,
+                end=end,
+                zope_id=zope_id,
+                start_url=next_url,
+                start_date=start_date,
+                modified=modified.date(),
+            )
+
+        return seen, page.next_url
 
     @staticmethod
     def add_stuff(period: Period, summary: str, body: str, modified: date | None = None) -> Period:
@@ -237,3 +568,50 @@ class Client:
             before = '\n'.join(source.split('\n')[:line])
             pointer = ' ' * (getattr(e, 'column', 1) - 1) + '^'
             raise ValueError(f'\n{e}\n\n{before}\n{pointer}') from None
+
+
+@dataclass
+class ClientPool:
+    """
+    A pool of ``size`` threads, each with its own copy of ``prototype``, as sessions
+    aren't thread safe.
+    """
+
+    prototype: Client
+    size: int = 8
+
+    @property
+    def url(self) -> str:
+        return self.prototype.url
+
+    @cached_property
+    def executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(self.size, thread_name_prefix='zope')
+
+    @cached_property
+    def local(self) -> threading.local:
+        return threading.local()
+
+    def client(self) -> Client:
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = replace(self.prototype)
+        return client
+
+    def submit(self, function: Callable[..., T], *args) -> 'Future[T]':
+        """
+        Call ``function`` in the pool, passing the thread's :class:`Client` followed
+        by ``args``.
+        """
+        return self.executor.submit(lambda: function(self.client(), *args))
+
+    def close(self) -> None:
+        if 'executor' in self.__dict__:
+            self.executor.shutdown(cancel_futures=True)
+            del self.executor
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from threading import current_thread, main_thread
+from typing import Callable, Generator
+
+from requests import Response
+
+from diary.extract import Form
+from diary.objects import Period
+from diary.zope import Client
+
+
+@dataclass
+class StubClient(Client):
+    """
+    A client for a server whose listing has the given periods, newest first, followed
+    by any ``error``, whose manage pages have the form for each ``zope_id`` and where
+    posts for the ``failing`` dates fail. The copies made for a pool share the listing
+    and what's been fetched and posted.
+    """
+
+    url: str = 'http://zope'
+    username: str = 'user'
+    password: str = 'pass'
+    periods: list[Period] = field(default_factory=list)
+    forms: dict[str, Form] = field(default_factory=dict)
+    error: Exception | None = None
+    failing: set[date] = field(default_factory=set)
+    now: datetime | None = None
+    # how many periods have been taken from the listing:
+    taken: int = 0
+    # the url of each manage page fetched and whether that was on the main thread:
+    fetched: list[tuple[str, bool]] = field(default_factory=list)
+    # the uri and title of each post and whether that was on the main thread:
+    posted: list[tuple[str, str, bool]] = field(default_factory=list)
+    # set once the listing has been closed:
+    closed: list[bool] = field(default_factory=list)
+
+    def get(self, uri: str, absolute: bool = False, modified: date | None = None) -> Response:
+        assert uri == '/vm_now', uri
+        response = Response()
+        response._content = f'{self.now or datetime.now():%Y-%m-%dT%H:%M:%S}\n'.encode()
+        response.encoding = 'ascii'
+        return response
+
+    def list(
+        self,
+        earliest: date,
+        handle_error: Callable[[Exception, str, date], bool] = lambda e, url, dt: False,
+        next_url: str = '',
+        seen: date = date.max,
+        prefetch: int = 0,
+        latest: date = date.max,
+    ) -> Generator[Period, None, None]:
+        try:
+            for period in self.periods:
+                if period.start < earliest:
+                    return
+                self.taken += 1
+                yield replace(period, stuff=[])
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.closed.append(True)
+
+    def get_form(self, uri: str, absolute: bool = False, modified: date | None = None) -> Form:
+        self.fetched.append((uri, current_thread() is main_thread()))
+        return self.forms[uri.split('/')[-2]]
+
+    def post(self, uri: str, data: dict[str, str]) -> Response:
+        title = data['title']
+        self.posted.append((uri, title, current_thread() is main_thread()))
+        day, _ = Client.infer_date(title)
+        if day in self.failing:
+            raise ValueError('server error')
+        if not uri:
+            # new postings go at the top of the listing:
+            self.periods.insert(0, Period(day, zope_id=f'new-{day:%d}', modified=date.today()))
+        return Response()
+
+
+def listed(day: int, modified: int | None = None) -> Period:
+    """
+    The period for a day in January 2023 as found in the listing, posted on that day
+    unless ``modified`` since.
+    """
+    return Period(
+        date(2023, 1, day),
+        zope_id=str(day),
+        modified=date(2023, 1, modified or day),
+        start_url=f'?b_start={31 - day}',
+        start_date=date(2023, 1, day + 1),
+    )
@@ -0,0 +1,109 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+from testfixtures import compare, TempDirectory
+
+from diary.archive import day_files, load_archive, load_day
+from diary.objects import Period, Stuff, Type
+
+
+@pytest.fixture
+def archive():
+    with TempDirectory() as td:
+        td.write('2021/11/02.txt', str(Period(date(2021, 11, 2), [Stuff(Type.did, 'thing 1')])))
+        td.write('2021/11/03.txt', str(Period(date(2021, 11, 3), end=date(2021, 11, 5))))
+        td.write('2020/12/31.txt', str(Period(date(2020, 12, 31))))
+        td.write('2021/01/01.txt', str(Period(date(2021, 1, 1), [Stuff(Type.did, 'party')])))
+        td.write('2021/11/notes.txt', 'not a day')
+        yield td
+
+
+class TestDayFiles:
+    def test_all(self, archive):
+        compare(
+            day_files(archive.as_path()),
+            expected=[
+                archive.as_path('2020/12/31.txt'),
+                archive.as_path('2021/01/01.txt'),
+                archive.as_path('2021/11/02.txt'),
+                archive.as_path('2021/11/03.txt'),
+            ],
+        )
+
+    def test_range(self, archive):
+        compare(
+            day_files(archive.as_path(), start=date(2021, 1, 1), end=date(2021, 11, 2)),
+            expected=[
+                archive.as_path('2021/01/01.txt'),
+                archive.as_path('2021/11/02.txt'),
+            ],
+        )
+
+    def test_bad_date(self, archive):
+        archive.write('2021/02/30.txt', '')
+        errors = []
+        day_files(archive.as_path(), handle_error=lambda path, e: errors.append((path, e)))
+        compare(
+            errors,
+            expected=[
+                (archive.as_path('2021/02/30.txt'), 'ValueError: day is out of range for month')
+            ],
+        )
+
+
+def test_load_day(archive):
+    compare(
+        load_day(archive.as_path('2021/11/02.txt')),
+        expected=[Period(date(2021, 11, 2), [Stuff(Type.did, 'thing 1')])],
+    )
+
+
+def test_load_day_error(archive):
+    error = load_day(archive.as_path('2021/11/notes.txt'))
+    assert isinstance(error, str)
+    compare(
+        error.split('\n')[0],
+        expected="UnexpectedToken: Unexpected token Token('WORD', 'not') at line 1, column 1.",
+    )
+
+
+class TestLoadArchive:
+    expected = [
+        Period(date(2020, 12, 31)),
+        Period(date(2021, 1, 1), [Stuff(Type.did, 'party')]),
+        Period(date(2021, 11, 2), [Stuff(Type.did, 'thing 1')]),
+        Period(date(2021, 11, 3), end=date(2021, 11, 5)),
+    ]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_all(self, archive, workers):
+        compare(list(load_archive(archive.as_path(), workers=workers)), expected=self.expected)
+
+    def test_default_workers(self, archive):
+        compare(list(load_archive(archive.as_path())), expected=self.expected)
+
+    def test_range(self, archive):
+        compare(
+            list(load_archive(archive.as_path(), start=date(2021, 11, 1), workers=2)),
+            expected=self.expected[2:],
+        )
+
+    def test_single_file(self, archive):
+        compare(
+            list(load_archive(archive.as_path(), end=date(2020, 12, 31), workers=2)),
+            expected=self.expected[:1],
+        )
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_errors_reported(self, archive, workers, capsys):
+        archive.write('2021/01/02.txt', '(2021-01-02) Friday\n===\n')
+        compare(list(load_archive(archive.as_path(), workers=workers)), expected=self.expected)
+        compare(
+            capsys.readouterr().out,
+            expected=(
+                f'{Path(archive.path) / "2021/01/02.txt"}: VisitError: '
+                'Error trying to process rule "date_pair":\n\n'
+                'line 1: 2021-01-02 is a Saturday, but day given as Friday\n'
+            ),
+        )
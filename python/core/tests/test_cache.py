@@ -0,0 +1,173 @@
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from requests import Response
+from testfixtures import compare, replace_in_environ, TempDirectory
+
+from diary.cache import Entry, ResponseCache, cache_root
+
+
+def response(content: bytes, **headers: str) -> Response:
+    result = Response()
+    result.status_code = 200
+    result._content = content
+    result.headers.update(headers)
+    return result
+
+
+def content(cache: ResponseCache, url: str) -> bytes:
+    entry = cache.get(url)
+    assert entry is not None
+    return entry.content
+
+
+def age(cache: ResponseCache, url: str, mtime: float) -> None:
+    os.utime(cache.file(url), (mtime, mtime))
+
+
+class TestEntry:
+    def test_validators(self):
+        entry = Entry('u', '"abc"', 'Sun, 15 Jan 2023 10:00:00 GMT', datetime.now(), b'')
+        compare(
+            entry.validators(),
+            expected={
+                'If-None-Match': '"abc"',
+                'If-Modified-Since': 'Sun, 15 Jan 2023 10:00:00 GMT',
+            },
+        )
+
+    def test_no_validators(self):
+        compare(Entry('u', None, None, datetime.now(), b'').validators(), expected={})
+
+    def test_response(self):
+        result = Entry('http://x/y', None, None, datetime.now(), b'content').response()
+        compare(result.status_code, expected=200)
+        compare(result.url, expected='http://x/y')
+        compare(result.content, expected=b'content')
+
+
+class TestResponseCache:
+    def test_miss(self):
+        with TempDirectory() as td:
+            compare(ResponseCache(td.as_path(), 1000).get('http://x/'), expected=None)
+
+    def test_round_trip(self):
+        with TempDirectory() as td:
+            cache = ResponseCache(td.as_path() / 'cache', 1000)
+            before = datetime.now(timezone.utc)
+            put = cache.put('http://x/', response(b'one\ntwo', ETag='"abc"'))
+            got = cache.get('http://x/')
+            assert got is not None
+            compare(got, expected=put)
+            compare(got.content, expected=b'one\ntwo')
+            compare(got.etag, expected='"abc"')
+            compare(got.last_modified, expected=None)
+            assert got.fetched >= before
+
+    def test_replace(self):
+        with TempDirectory() as td:
+            cache = ResponseCache(td.as_path(), 1000)
+            cache.put('http://x/', response(b'old'))
+            cache.put('http://x/', response(b'new'))
+            compare(content(cache, 'http://x/'), expected=b'new')
+            compare(len(list(td.as_path().iterdir())), expected=1)
+
+    def test_evicts_least_recently_used(self):
+        with TempDirectory() as td:
+            cache = ResponseCache(td.as_path(), 2000)
+            for i in range(3):
+                cache.put(f'http://x/{i}', response(b'x' * 200))
+                age(cache, f'http://x/{i}', 1000 + i)
+            # reading the oldest makes it the most recently used:
+            cache.get('http://x/0')
+            cache.put('http://x/3', response(b'x' * 1000))
+            compare(
+                [cache.get(f'http://x/{i}') is not None for i in range(4)],
+                expected=[True, False, False, True],
+            )
+            compare(cache.size, expected=sum(p.stat().st_size for p in td.as_path().iterdir()))
+
+    def test_size_found_on_first_put(self):
+        with TempDirectory() as td:
+            ResponseCache(td.as_path(), 1000).put('http://x/0', response(b'x' * 400))
+            cache = ResponseCache(td.as_path(), 1000)
+            cache.put('http://x/1', response(b'x' * 400))
+            compare(cache.size, expected=sum(p.stat().st_size for p in td.as_path().iterdir()))
+            cache.put('http://x/2', response(b'x' * 400))
+            compare(cache.get('http://x/0'), expected=None)
+
+    def test_evict_skips_vanished_files(self):
+        with TempDirectory() as td:
+            cache = ResponseCache(td.as_path(), 1000)
+            cache.put('http://x/0', response(b'x'))
+            (td.as_path() / 'broken.response').symlink_to(td.as_path() / 'missing')
+            cache.evict()
+            compare(content(cache, 'http://x/0'), expected=b'x')
+
+    def test_clear(self):
+        with TempDirectory() as td:
+            cache = ResponseCache(td.as_path() / 'cache', 1000)
+            cache.clear()
+            cache.put('http://x/', response(b'x'))
+            cache.clear()
+            compare(cache.get('http://x/'), expected=None)
+            compare(cache.size, expected=0)
+
+    def test_only_entries_evicted(self):
+        with TempDirectory() as td:
+            td.write('grammar-lark-1.0.cache', 'x' * 2000)
+            td.makedir('blocks')
+            td.makedir('odd.response')
+            cache = ResponseCache(td.as_path(), 1500)
+            cache.put('http://x/0', response(b'x' * 400))
+            age(cache, 'http://x/0', 1000)
+            cache.put('http://x/1', response(b'x' * 400))
+            compare(
+                [cache.get(f'http://x/{i}') is not None for i in range(2)], expected=[True, True]
+            )
+            cache.put('http://x/2', response(b'x' * 400))
+            compare(cache.get('http://x/0'), expected=None)
+            cache.clear()
+            compare(
+                sorted(path.name for path in td.as_path().iterdir()),
+                expected=['blocks', 'grammar-lark-1.0.cache', 'odd.response'],
+            )
+
+    def test_corrupt_entry(self):
+        with TempDirectory() as td:
+            cache = ResponseCache(td.as_path(), 1000)
+            for i, data in enumerate([b'truncated', b'{"url": \n', b'[]\n', b'{}\n', b'\xff\n']):
+                cache.put(f'http://x/{i}', response(b'x'))
+                cache.file(f'http://x/{i}').write_bytes(data)
+                compare(cache.get(f'http://x/{i}'), expected=None)
+                compare(cache.size, expected=None)
+            compare(list(td.as_path().iterdir()), expected=[])
+            cache.put('http://x/0', response(b'x'))
+            compare(content(cache, 'http://x/0'), expected=b'x')
+
+    def test_iterate(self):
+        with TempDirectory() as td:
+            cache = ResponseCache(td.as_path(), 1000)
+            compare(list(cache), expected=[])
+            cache.put('http://x/0', response(b'zero'))
+            cache.put('http://x/1', response(b'one'))
+            cache.put('http://x/2', response(b'two'))
+            age(cache, 'http://x/0', 1000)
+            cache.file('http://x/2').write_bytes(b'truncated')
+            compare(
+                sorted((entry.url, entry.content) for entry in cache),
+                expected=[('http://x/0', b'zero'), ('http://x/1', b'one')],
+            )
+            # looking through the entries doesn't count as using them:
+            compare(cache.file('http://x/0').stat().st_mtime, expected=1000)
+
+
+class TestCacheRoot:
+    def test_xdg(self):
+        with replace_in_environ('XDG_CACHE_HOME', '/some/cache'):
+            compare(cache_root(), expected=Path('/some/cache/diary'))
+
+    def test_default(self):
+        with replace_in_environ('XDG_CACHE_HOME', ''):
+            compare(cache_root(), expected=Path('~/.cache/diary').expanduser())
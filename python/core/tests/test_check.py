@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from testfixtures import compare
+
+from diary.check import Problem, check
+from diary.parse import split_lines
+
+SRC = Path(__file__).parent.parent / 'src'
+
+GOOD = '''\
+(2024-01-01) Monday
+=
+DID thing
+
+(2024-01-02) Tuesday to (2024-01-03) Wednesday
+=
+EVENT stuff:
+--
+(not a day)
+--
+'''
+
+
+def problems(text: str) -> list[str]:
+    return [str(problem) for problem in check(split_lines(text))]
+
+
+def test_clean():
+    compare(problems(GOOD), expected=[])
+
+
+def test_empty():
+    compare(problems(''), expected=[])
+
+
+def test_all_problems_in_one_pass():
+    text = '''\
+(2024-01-01) Monday
+=
+DID thing
+NOPE bad
+DID:x tagged
+garbage line
+RIGHT:
+--
+body
+--
+
+(2024-01-02) Monday
+=
+
+(2024-01-05) Friday to (2024-01-03) Wednesday
+=
+DID other
+
+(2024-13-01) Sunday
+=
+DID more
+
+(2024-01-07) Sunday
+=
+'''
+    compare(
+        problems(text),
+        expected=[
+            "line 4: 'NOPE' is not a valid Type",
+            'line 6: unexpected input at column 1, expected one of: ACTION, LF, LPAR',
+            'line 7: unexpected input at column 7, expected WS_INLINE',
+            'line 12: 2024-01-02 is a Tuesday, but day given as Monday',
+            'line 15: 2024-01-05 > 2024-01-03',
+            'line 15: Tue 02 Jan to Fri 05 Jan was 3 days, not 1!',
+            "line 19: time data '2024-13-01' does not match format '%Y-%m-%d'",
+            'line 23: Fri 05 Jan to Sun 07 Jan was 2 days, not 1!',
+        ],
+    )
+
+
+def test_bad_header():
+    compare(
+        problems('(2024-01-01) Monday\nDID thing\n'),
+        expected=['line 2: unexpected input at column 1, expected EQUAL'],
+    )
+
+
+def test_unterminated_body():
+    text = '(2024-01-01) Monday\n=\nDID thing:\n--\nbody\n\n'
+    compare(
+        problems(text), expected=['line 5: unexpected end of day, expected one of: END_BODY, LINE']
+    )
+
+
+def test_no_newline_at_end():
+    compare(
+        problems('(2024-01-01) Monday\n=\nDID thing:\n--\nbody\n--'),
+        expected=['line 6: no newline at end of file'],
+    )
+
+
+def test_problem_str():
+    compare(str(Problem(3, 'bad')), expected='line 3: bad')
+
+
+def test_command(tmp_path: Path):
+    # run the real command line, in the same way as test_startup:
+    path = tmp_path / 'diary.txt'
+    path.write_text('(2024-01-01) Sunday\n=\n')
+    result = subprocess.run(
+        [sys.executable, '-c', 'from diary.cli import main; main()', 'check', str(path)],
+        env=dict(os.environ, PYTHONPATH=str(SRC)),
+        capture_output=True,
+        text=True,
+    )
+    compare(result.stdout, expected='line 1: 2024-01-01 is a Monday, but day given as Sunday\n\n')
+    compare(result.returncode, expected=1)
@@ -2,9 +2,12 @@ from pathlib import Path
 import tempfile
 import os
 
-from testfixtures import compare, TempDirectory
+from testfixtures import compare, replace_in_environ, TempDirectory
+
+import diary.objects
 
 from diary.config import read_config
+from diary.zope import Client
 
 
 def test_read_config_basic():
@@ -48,3 +51,94 @@ diary_path: ~/diary
         expected_path = Path("~/diary").expanduser()
         compare(config.diary_path, expected=expected_path)
         assert config.get('zope') is None
+
+
+def test_read_config_typo_confidence():
+    with TempDirectory() as td:
+        config_path = td.write('config.yaml', 'diary_path: ~/diary\ntypo_confidence: 0.7\n')
+        resolver = diary.objects.type_resolver
+        config = read_config(config_path)
+    compare(config.type_resolver.confidence, expected=0.7)
+    compare(config.type_resolver('NOPE'), expected=diary.objects.Type.note)
+    # only installed when a command is run:
+    assert diary.objects.type_resolver is resolver
+
+
+def test_read_config_typo_confidence_default():
+    with TempDirectory() as td:
+        config = read_config(td.write('config.yaml', 'diary_path: ~/diary\n'))
+    compare(config.type_resolver.confidence, expected=0.8)
+
+
+def test_read_config_zope_connection_settings():
+    with TempDirectory() as td:
+        config_path = td.write(
+            'config.yaml',
+            'diary_path: ~/diary\n'
+            'zope:\n'
+            '  url: http://example.com\n'
+            '  username: testuser\n'
+            '  password: testpass\n'
+            '  pool_size: 4\n'
+            '  read_timeout: 120\n'
+            '  deadline: 300\n'
+            '  retries: 5\n',
+        )
+        with replace_in_environ('XDG_CACHE_HOME', '/some/cache'):
+            config = read_config(config_path)
+        compare(
+            config.zope,
+            expected=Client(
+                'http://example.com',
+                'testuser',
+                'testpass',
+                pool_size=4,
+                read_timeout=120,
+                deadline=300,
+                retries=5,
+                cache_path='/some/cache/diary/responses',
+            ),
+        )
+
+
+def test_read_config_zope_cache_disabled():
+    with TempDirectory() as td:
+        config_path = td.write(
+            'config.yaml',
+            'diary_path: ~/diary\n'
+            'zope:\n'
+            '  url: http://example.com\n'
+            '  username: testuser\n'
+            '  password: testpass\n'
+            '  cache_path: null\n',
+        )
+        compare(read_config(config_path).zope.cache, expected=None)
+
+
+def test_read_config_sync_index():
+    with TempDirectory() as td:
+        config_path = td.write('config.yaml', 'diary_path: ~/diary\n')
+        compare(read_config(config_path).sync_index, expected=td.as_path('sync.sqlite'))
+
+
+def test_read_config_sync_index_elsewhere():
+    with TempDirectory() as td:
+        config_path = td.write('config.yaml', 'diary_path: ~/diary\nsync_index: ~/sync.db\n')
+        compare(read_config(config_path).sync_index, expected=Path('~/sync.db').expanduser())
+
+
+def test_read_config_upload_manifest():
+    with TempDirectory() as td:
+        config_path = td.write('config.yaml', 'diary_path: ~/diary\n')
+        compare(read_config(config_path).upload_manifest, expected=td.as_path('uploads.json'))
+
+
+def test_read_config_upload_manifest_elsewhere():
+    with TempDirectory() as td:
+        config_path = td.write(
+            'config.yaml', 'diary_path: ~/diary\nupload_manifest: ~/uploads.json\n'
+        )
+        compare(
+            read_config(config_path).upload_manifest,
+            expected=Path('~/uploads.json').expanduser(),
+        )
@@ -0,0 +1,27 @@
+from datetime import date
+
+from testfixtures import Replace, ShouldRaise, compare, mock_date
+
+from diary.dates import parse_date, previous_sunday
+
+
+class TestPreviousSunday:
+    def test_midweek(self):
+        with Replace('diary.dates.date', mock_date(2023, 1, 5)):
+            compare(previous_sunday(), expected=date(2023, 1, 1))
+
+    def test_on_sunday(self):
+        with Replace('diary.dates.date', mock_date(2023, 1, 8)):
+            compare(previous_sunday(), expected=date(2023, 1, 1))
+
+
+class TestParseDate:
+    def test_text(self):
+        compare(parse_date('2023-01-05'), expected=date(2023, 1, 5))
+
+    def test_date(self):
+        compare(parse_date(date(2023, 1, 5)), expected=date(2023, 1, 5))
+
+    def test_invalid(self):
+        with ShouldRaise(ValueError):
+            parse_date('05/01/2023')
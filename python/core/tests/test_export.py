@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+from configurator import Config
+from testfixtures import Replace, ShouldRaise, TempDirectory, compare
+
+from diary.export import export, handle_error
+from diary.extract import Form
+from diary.parse import block_cache, parse_block
+from diary.zope import LookBackFailed
+
+from tests.stubs import StubClient, listed
+
+
+def stub(*days: int, error: Exception | None = None) -> StubClient:
+    return StubClient(
+        periods=[listed(day) for day in days],
+        forms={str(day): Form(f'DID thing {day}', '') for day in days},
+        error=error,
+    )
+
+
+def dumped(dump: TempDirectory) -> dict[str, str]:
+    return {
+        str(path.relative_to(dump.as_path())): path.read_text()
+        for path in sorted(dump.as_path().rglob('*.txt'))
+    }
+
+
+def day_text(day: int) -> str:
+    header = f'(2023-01-{day:02}) {date(2023, 1, day):%A}'
+    return f'{header}\n{"=" * len(header)}\nDID thing {day}\n'
+
+
+@pytest.fixture()
+def dump():
+    with TempDirectory() as dump:
+        yield dump
+
+
+class TestExport:
+    def test_sequential(self, dump, capsys):
+        client = stub(5, 4, 3)
+        export(Config({'zope': client}), dump_path=dump.as_path(), quiet=True)
+        compare(
+            dumped(dump),
+            expected={
+                '2023/01/03.txt': day_text(3),
+                '2023/01/04.txt': day_text(4),
+                '2023/01/05.txt': day_text(5),
+            },
+        )
+        compare(
+            client.fetched,
+            expected=[
+                ('http://zope/5/manage', True),
+                ('http://zope/4/manage', True),
+                ('http://zope/3/manage', True),
+            ],
+        )
+        compare(
+            capsys.readouterr().out.splitlines(),
+            expected=[f'   ADD: {dump.as_path()}/2023/01/0{day}.txt' for day in (5, 4, 3)],
+        )
+
+    def test_pooled(self, dump):
+        client = stub(5, 4, 3)
+        export(Config({'zope': client}), dump_path=dump.as_path(), quiet=True, prefetch=2)
+        compare(
+            dumped(dump),
+            expected={
+                '2023/01/03.txt': day_text(3),
+                '2023/01/04.txt': day_text(4),
+                '2023/01/05.txt': day_text(5),
+            },
+        )
+        compare(
+            sorted(client.fetched),
+            expected=[
+                ('http://zope/3/manage', False),
+                ('http://zope/4/manage', False),
+                ('http://zope/5/manage', False),
+            ],
+        )
+
+    @pytest.mark.parametrize('prefetch', [0, 2])
+    def test_normalised_once(self, dump, prefetch):
+        # normalising parses each period, through the shared block cache:
+        with Replace('diary.parse.block_cache.periods', OrderedDict()):
+            with Replace('diary.parse.parse_block', Mock(side_effect=parse_block)) as parsed:
+                for _ in range(2):
+                    export(
+                        Config({'zope': stub(5, 4, 3)}),
+                        dump_path=dump.as_path(),
+                        quiet=True,
+                        prefetch=prefetch,
+                    )
+            compare(parsed.call_count, expected=3)
+            compare(len(block_cache.periods), expected=3)
+        compare(sorted(dumped(dump)), expected=[f'2023/01/0{day}.txt' for day in (3, 4, 5)])
+
+    def test_not_quiet(self, capsys):
+        export(Config({'zope': stub(5)}))
+        compare(
+            capsys.readouterr().out,
+            expected=(
+                'Thu 05 Jan 2023  prev: None days pub: 0 days '
+                'python export.py --start-url ?b_start=26 --start-date 2023-01-06\n'
+                'http://zope/5/manage\n'
+                '\n' + day_text(5) + '\n'
+            ),
+        )
+
+    def test_dry_run(self, dump, capsys):
+        export(Config({'zope': stub(5)}), dump_path=dump.as_path(), dry_run=True, quiet=True)
+        compare(dumped(dump), expected={})
+        compare(capsys.readouterr().out, expected=f'   ADD: {dump.as_path()}/2023/01/05.txt\n')
+
+    def test_already_dumped(self, dump, capsys):
+        dump.write('2023/01/05.txt', day_text(5))
+        dump.write('2023/01/04.txt', 'something else\n')
+        export(Config({'zope': stub(5, 4)}), dump_path=dump.as_path(), quiet=True)
+        compare(
+            dumped(dump), expected={'2023/01/04.txt': day_text(4), '2023/01/05.txt': day_text(5)}
+        )
+        compare(
+            capsys.readouterr().out,
+            expected=(
+                f'EXISTS: {dump.as_path()}/2023/01/05.txt\n'
+                f'UPDATE: {dump.as_path()}/2023/01/04.txt\n'
+                '--- existing\n'
+                '+++ new\n'
+                '@@ -1,2 +1,4 @@\n'
+                '-something else\n'
+                '+(2023-01-04) Wednesday\n'
+                '+======================\n'
+                '+DID thing 4\n'
+                ' \n'
+            ),
+        )
+
+    @pytest.mark.parametrize('prefetch', [0, 2])
+    def test_gap_to_previous(self, dump, capsys, prefetch):
+        client = stub(9, 8, 2, 1)
+        export(Config({'zope': client}), dump_path=dump.as_path(), quiet=True, prefetch=prefetch)
+        compare(sorted(dumped(dump)), expected=['2023/01/08.txt', '2023/01/09.txt'])
+        output = capsys.readouterr().out
+        assert 'http://zope/2 at Mon 02 Jan 23: str 6 days to previous!\n' in output, output
+        if not prefetch:
+            # the manage page of a period that fails its checks isn't fetched:
+            compare(
+                client.fetched,
+                expected=[('http://zope/9/manage', True), ('http://zope/8/manage', True)],
+            )
+
+    def test_gap_to_modified(self, dump, capsys):
+        client = stub(5)
+        client.periods[0].modified = date(2022, 12, 1)
+        export(Config({'zope': client}), dump_path=dump.as_path(), quiet=True)
+        compare(dumped(dump), expected={})
+        compare(
+            capsys.readouterr().out,
+            expected='\nhttp://zope/5 at Thu 01 Dec 22: str -35 days to modified, gap too big!\n\n',
+        )
+        compare(client.fetched, expected=[])
+
+    @pytest.mark.parametrize('prefetch', [0, 2])
+    def test_listing_error(self, dump, prefetch):
+        client = stub(5, 4, error=ValueError('bad listing'))
+        with ShouldRaise(ValueError('bad listing')):
+            export(
+                Config({'zope': client}), dump_path=dump.as_path(), quiet=True, prefetch=prefetch
+            )
+        # the periods listed before the error are still exported:
+        compare(sorted(dumped(dump)), expected=['2023/01/04.txt', '2023/01/05.txt'])
+
+    def test_fetch_error(self, dump):
+        client = stub(5, 4, 3)
+        del client.forms['4']
+        with ShouldRaise(KeyError('4')):
+            export(Config({'zope': client}), dump_path=dump.as_path(), quiet=True, prefetch=2)
+        compare(sorted(dumped(dump)), expected=['2023/01/05.txt'])
+        # the listing is closed even though the error still refers to it:
+        compare(client.closed, expected=[True])
+
+
+class TestHandleError:
+    def test_carry_on(self, capsys):
+        compare(handle_error(ValueError('bad'), 'http://zope/5', date(2023, 1, 5)), expected=True)
+        compare(
+            capsys.readouterr().out, expected='\nhttp://zope/5 at Thu 05 Jan 23: ValueError bad\n\n'
+        )
+
+    def test_look_back_failed(self, capsys):
+        error = LookBackFailed(date(2023, 1, 1), 'Mon 9th')
+        compare(handle_error(error, 'http://zope/5', date(2023, 1, 5)), expected=False)
+        compare(
+            capsys.readouterr().out,
+            expected=(
+                '\nhttp://zope/5 at Thu 05 Jan 23: '
+                "LookBackFailed Looked back to 2023-01-01, couldn't match Mon 9th\n\n"
+            ),
+        )
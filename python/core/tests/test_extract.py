@@ -0,0 +1,173 @@
+import pytest
+from testfixtures import compare, ShouldRaise
+
+from diary.extract import (
+    EXTRACTORS,
+    Form,
+    Listing,
+    ListingEntry,
+    SoupExtractor,
+    StreamExtractor,
+    TreeParser,
+)
+
+LISTING = '''\
+<html><head><title>Diary</title></head><body>
+<a name="2023-01-15T10:00:00Z"></a>
+<p><strong>(2023-01-15) Sunday</strong><br>
+Walked the dog &amp; read a book<br>
+<a class="read" href="https://example.com/diary/123">Read more</a></p>
+<a name="2023-01-14T09:30:00Z"></a>
+<p><strong>Saturday <b>14th</b></strong><br>
+<a class="more read" href="https://example.com/diary/456">Read more</a></p>
+<a class="next" href="?start=20">Next &gt;</a>
+<a class="next" href="?start=40">Later</a>
+</body></html>
+'''
+
+FORM = '''\
+<html><body><form action="edit" method="post">
+<input type="text" name="title" value="Entry">
+<textarea name="summary">EVENT Something &lt;here&gt; &amp;amp; there
+  NOTE indented</textarea>
+<textarea name="body">-</textarea>
+<input type="submit" name="edit:method" value="Change">
+</form></body></html>
+'''
+
+EXPECTED_LISTING = Listing(
+    [
+        ListingEntry(
+            '2023-01-15T10:00:00Z', '(2023-01-15) Sunday', 'https://example.com/diary/123'
+        ),
+        ListingEntry('2023-01-14T09:30:00Z', 'Saturday 14th', 'https://example.com/diary/456'),
+    ],
+    '?start=20',
+)
+
+
+@pytest.fixture(params=sorted(EXTRACTORS))
+def extractor(request):
+    return EXTRACTORS[request.param]()
+
+
+class TestAllExtractors:
+    def test_listing(self, extractor):
+        compare(extractor.listing(LISTING), expected=EXPECTED_LISTING)
+
+    def test_listing_last_page(self, extractor):
+        compare(
+            extractor.listing(LISTING.replace('class="next"', 'class="previous"')).next_url,
+            expected=None,
+        )
+
+    def test_listing_next_without_href(self, extractor):
+        compare(
+            extractor.listing('<html><a class="next">Next</a><a class="next" href="x"></a></html>'),
+            expected=Listing([], None),
+        )
+
+    def test_listing_incomplete_entries(self, extractor):
+        compare(
+            extractor.listing(
+                '<html><a name="1"></a><a name="2"></a><strong>Monday</strong></html>'
+            ),
+            expected=Listing(
+                [ListingEntry('1', 'Monday', None), ListingEntry('2', 'Monday', None)], None
+            ),
+        )
+
+    def test_listing_no_date(self, extractor):
+        compare(
+            extractor.listing('<html><a name="1"></a></html>'),
+            expected=Listing([ListingEntry('1', None, None)], None),
+        )
+
+    def test_form(self, extractor):
+        compare(
+            extractor.form(FORM),
+            expected=Form('EVENT Something <here> &amp; there\n  NOTE indented', '-'),
+        )
+
+    def test_form_empty_body(self, extractor):
+        compare(
+            extractor.form(
+                FORM.replace(
+                    '<textarea name="body">-</textarea>', '<textarea name="body"></textarea>'
+                )
+            ),
+            expected=Form('EVENT Something <here> &amp; there\n  NOTE indented', ''),
+        )
+
+    def test_form_missing_textarea(self, extractor):
+        with ShouldRaise(ValueError('Expected one body textarea, found 0')):
+            extractor.form(FORM.replace('name="body"', 'name="other"'))
+
+    def test_form_extra_textarea(self, extractor):
+        with ShouldRaise(ValueError('Expected one summary textarea, found 2')):
+            extractor.form(FORM.replace('</form>', '<textarea name="summary"></textarea></form>'))
+
+
+class TestStreamMatchesSoup:
+    """
+    Markup that bs4's html.parser tree builder treats in unusual ways, which the
+    stream extractor has to copy.
+    """
+
+    @pytest.mark.parametrize(
+        'html',
+        [
+            # no <html> tag, so no next link:
+            '<a class="next" href="x"></a>',
+            # only links after the <html> tag count:
+            '<a class="next" href="x"></a><html><a class="next" href="y"></a>',
+            # whitespace-only text is collapsed:
+            '<a name="1"><strong>  <b>Monday</b>\n\n <i>1st</i>\t</strong><a class="read" href="r">',
+            # an unclosed <strong> is closed by the end of its parent:
+            '<p><a name="1"><strong>Mon<p>day</a> 1st</strong> <a class=read href="r"></a>',
+            # void elements are closed immediately and their end tags ignored:
+            '<br><a name="1"><strong>Mon</br>day</strong><a class="x read" href="r">',
+            # a self-closed strong has no text:
+            '<a name="1"><strong/>Monday<a class="read" href="r"></a>',
+            # text in scripts, templates and the like is left out, but CDATA isn't:
+            '<a name="1"><strong>M<script>x</script>o<template>y<![CDATA[n]]></template></strong>'
+            '<rt>z</rt><a class="read" href="r">',
+            # comments and declarations split the text:
+            '<!DOCTYPE html><a name="1"><strong> <!-- c --> <![if x]>day<?pi?></strong>'
+            '<a class=read href=r>',
+            # references are decoded as bs4 does:
+            '<a name="1"><strong>&amp;&foo;&ampx&#150;&#129;&#x41;&#12a;&#xZZ;&#x110000;</strong>'
+            '<a class=read href="&lt;r&gt;">',
+            # the first a.read after the strong, even inside it:
+            '<a name="1"><strong>Mon<a class="read" href="inner"></a></strong>'
+            '<a class="read" href="outer">',
+            # an anchor can be a read link for an earlier entry:
+            '<a name="1"><strong>Mon</strong><a name="2" class="read" href="r">'
+            '<strong>Tue</strong>',
+            # attribute names and values:
+            '<A NAME="1" CLASS=read><STRONG>Mon</STRONG><a name class="read" href=a href=b>',
+        ],
+    )
+    def test_listing(self, html):
+        compare(StreamExtractor().listing(html), expected=SoupExtractor().listing(html))
+
+    @pytest.mark.parametrize(
+        'html',
+        [
+            '<textarea name="summary">a <b>b</b>\n <br> c</textarea><textarea name="body">'
+            '  </textarea>',
+            '<textarea name="summary"/><textarea name="body"><pre> </pre> <i> </i></textarea>',
+            '<textarea name="summary"><style>s</style>x</textarea><textarea name="body">'
+            '<p>unclosed</textarea><textarea name="other">x</textarea>',
+            '<textarea name="summary">&#0;&#;&</textarea><textarea name="body">&nbsp;</textarea>',
+        ],
+    )
+    def test_form(self, html):
+        compare(StreamExtractor().form(html), expected=SoupExtractor().form(html))
+
+
+class TestTreeParser:
+    def test_nothing_collected(self):
+        parser = TreeParser()
+        parser.parse('<p>text</p>')
+        compare(parser.open, expected=[])
@@ -0,0 +1,47 @@
+import pytest
+from testfixtures import compare
+
+from diary.fuzzy import BKTree, distance
+
+
+@pytest.mark.parametrize(
+    'a, b, expected',
+    [
+        ('', '', 0),
+        ('', 'abc', 3),
+        ('abc', 'abc', 0),
+        ('DID', 'DDI', 2),
+        ('EVNT', 'EVENT', 1),
+        ('CANCELLED', 'CANCELED', 1),
+        ('kitten', 'sitting', 3),
+    ],
+)
+def test_distance(a, b, expected):
+    compare(distance(a, b), expected=expected)
+    compare(distance(b, a), expected=expected)
+
+
+class TestBKTree:
+    words = ['DID', "DIDN'T", 'DIDNT', 'EVENT', 'EVEN', 'NOTE', 'RIGHT', 'WRONG']
+
+    def test_empty(self):
+        compare(BKTree([]).search('DID', 5), expected=[])
+
+    def test_exact(self):
+        compare(BKTree(self.words).search('NOTE', 0), expected=[(0, 'NOTE')])
+
+    def test_duplicates(self):
+        compare(BKTree(self.words + self.words).search('NOTE', 0), expected=[(0, 'NOTE')])
+
+    def test_closest_first(self):
+        compare(
+            BKTree(self.words).search('DIDN', 2),
+            expected=[(1, 'DID'), (1, 'DIDNT'), (2, "DIDN'T")],
+        )
+
+    def test_matches_brute_force(self):
+        tree = BKTree(self.words)
+        for word in ['EVNT', 'WRIGHT', 'XYZ', 'DONE', 'NOT']:
+            for radius in range(4):
+                expected = sorted((d, w) for w in self.words if (d := distance(word, w)) <= radius)
+                compare(tree.search(word, radius), expected=expected)
@@ -0,0 +1,186 @@
+from datetime import date
+
+from testfixtures import compare, TempDirectory
+
+from diary.index import SyncIndex
+from diary.objects import Period
+
+from tests.stubs import StubClient
+
+
+def listing(*periods: Period) -> StubClient:
+    return StubClient(periods=list(periods))
+
+
+def period(day: int, zope_id: str, modified: int) -> Period:
+    return Period(
+        date(2023, 1, day),
+        zope_id=zope_id,
+        start_url=f'?b_start={30 - day}',
+        modified=date(2023, 1, modified),
+    )
+
+
+def rows(index: SyncIndex) -> list[tuple]:
+    return index.connection.execute('SELECT * FROM days ORDER BY date').fetchall()
+
+
+class TestSyncIndex:
+    def test_empty(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sub/sync.sqlite'))
+            compare(index.ids(), expected={})
+            compare(index.watermark, expected=None)
+            compare(index.earliest, expected=None)
+            index.close()
+
+    def test_reconcile_from_scratch(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sync.sqlite'))
+            client = listing(period(15, '15', 16), period(14, '14', 20), period(13, '13', 13))
+            compare(index.reconcile(client, date(2023, 1, 14)), expected=2)
+            compare(index.ids(), expected={date(2023, 1, 15): '15', date(2023, 1, 14): '14'})
+            compare(index.watermark, expected=date(2023, 1, 20))
+            compare(
+                rows(index),
+                expected=[
+                    ('2023-01-14', '14', '2023-01-20', '?b_start=16'),
+                    ('2023-01-15', '15', '2023-01-16', '?b_start=15'),
+                ],
+            )
+            index.close()
+
+    def test_reconcile_stops_at_watermark(self):
+        with TempDirectory() as td:
+            path = td.as_path('sync.sqlite')
+            index = SyncIndex(path)
+            index.reconcile(listing(period(14, '14', 14), period(13, '13', 13)), date.min)
+            index.close()
+
+            index = SyncIndex(path)
+            client = listing(
+                period(16, '16', 16),
+                period(15, '15', 14),
+                period(14, '14', 14),
+                period(13, '13', 13),
+                period(12, '12', 12),
+            )
+            compare(index.reconcile(client, date.min), expected=3)
+            compare(client.taken, expected=4)
+            compare(index.watermark, expected=date(2023, 1, 16))
+            compare(
+                index.ids(),
+                expected={
+                    date(2023, 1, 16): '16',
+                    date(2023, 1, 15): '15',
+                    date(2023, 1, 14): '14',
+                    date(2023, 1, 13): '13',
+                },
+            )
+            index.close()
+
+    def test_reconcile_further_back(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sync.sqlite'))
+            client = listing(
+                period(16, '16', 16),
+                period(15, '15', 15),
+                period(14, '14', 14),
+                period(13, '13', 13),
+                period(12, '12', 12),
+            )
+            compare(index.reconcile(client, date(2023, 1, 14)), expected=3)
+            compare(index.earliest, expected=date(2023, 1, 14))
+            # nothing that old has been read, so the watermark doesn't stop the walk:
+            compare(index.reconcile(client, date(2023, 1, 12)), expected=5)
+            compare(index.earliest, expected=date(2023, 1, 12))
+            compare(sorted(index.ids()), expected=[date(2023, 1, day) for day in range(12, 17)])
+            # now it has:
+            client.taken = 0
+            compare(index.reconcile(client, date(2023, 1, 13)), expected=1)
+            compare(client.taken, expected=2)
+            compare(index.earliest, expected=date(2023, 1, 12))
+            index.close()
+
+    def test_reconcile_removes_unlisted(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sync.sqlite'))
+            index.reconcile(
+                listing(period(15, '15', 15), period(14, '14', 14), period(13, '13', 13)),
+                date(2023, 1, 13),
+            )
+            index.record(date(2023, 1, 10), '10', date(2023, 1, 10))
+            index.reconcile(listing(period(15, '15', 15), period(13, '13', 13)), date(2023, 1, 12))
+            # days before those read aren't known to be gone:
+            compare(
+                index.ids(),
+                expected={
+                    date(2023, 1, 15): '15',
+                    date(2023, 1, 13): '13',
+                    date(2023, 1, 10): '10',
+                },
+            )
+            index.close()
+
+    def test_reconcile_removes_unlisted_before_watermark(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sync.sqlite'))
+            index.reconcile(
+                listing(period(15, '15', 15), period(14, '14', 14), period(13, '13', 13)),
+                date(2023, 1, 13),
+            )
+            client = listing(period(16, '16', 16), period(14, '14', 14), period(13, '13', 13))
+            compare(index.reconcile(client, date(2023, 1, 13)), expected=1)
+            compare(client.taken, expected=2)
+            # the walk stopped at the 14th, so the 13th is left alone:
+            compare(
+                index.ids(),
+                expected={
+                    date(2023, 1, 16): '16',
+                    date(2023, 1, 14): '14',
+                    date(2023, 1, 13): '13',
+                },
+            )
+            index.close()
+
+    def test_reconcile_nothing_listed(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sync.sqlite'))
+            compare(index.reconcile(listing(), date.min), expected=0)
+            compare(index.watermark, expected=None)
+            index.close()
+
+    def test_record_sent(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sync.sqlite'))
+            index.reconcile(listing(period(14, '14', 14)), date.min)
+            # updated, so the id is known:
+            index.record(date(2023, 1, 14), '14', date(2023, 1, 20))
+            # added, so it isn't:
+            index.record(date(2023, 1, 15), None, date(2023, 1, 20))
+            compare(
+                rows(index),
+                expected=[
+                    ('2023-01-14', '14', '2023-01-20', '?b_start=16'),
+                    ('2023-01-15', None, '2023-01-20', None),
+                ],
+            )
+            # the listing has the rest:
+            index.reconcile(listing(period(15, '15', 20), period(14, '14', 20)), date.min)
+            compare(
+                rows(index),
+                expected=[
+                    ('2023-01-14', '14', '2023-01-20', '?b_start=16'),
+                    ('2023-01-15', '15', '2023-01-20', '?b_start=15'),
+                ],
+            )
+            index.close()
+
+    def test_clear(self):
+        with TempDirectory() as td:
+            index = SyncIndex(td.as_path('sync.sqlite'))
+            index.reconcile(listing(period(14, '14', 14)), date.min)
+            index.clear()
+            compare(index.ids(), expected={})
+            compare(index.watermark, expected=None)
+            index.close()
@@ -0,0 +1,360 @@
+from collections import OrderedDict
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from configurator import Config
+from testfixtures import Replace, ShouldRaise, TempDirectory, compare
+
+from diary.index import SyncIndex
+from diary.ingest import AddSkipped, ingest
+from diary.extract import Listing, ListingEntry
+from diary.manifest import UploadManifest
+from diary.objects import Period, Stuff, Type
+from diary.parse import block_cache, parse_block
+from diary.zope import Client
+
+from tests.stubs import StubClient, listed
+
+
+@dataclass
+class PagedClient(StubClient):
+    """
+    A client whose listing is read in pages of two periods each, recording the urls of
+    those fetched.
+    """
+
+    pages: list[str] = field(default_factory=list)
+
+    list = Client.list
+
+    def get_listing(self, uri: str) -> Listing:
+        self.pages.append(uri)
+        start = int(uri.removeprefix('?b_start=') or 0)
+        entries = [
+            ListingEntry(
+                f'{period.modified:%Y-%m-%dT%H:%M:%SZ}', period.title_date(), f'r/{period.zope_id}'
+            )
+            for period in self.periods[start : start + 2]
+        ]
+        more = start + 2 < len(self.periods)
+        return Listing(entries, f'?b_start={start + 2}' if more else None)
+
+
+def diary_day(day: int, *stuff: str) -> Period:
+    return Period(date(2023, 1, day), [Stuff(Type.did, text) for text in stuff])
+
+
+def title(day: int) -> str:
+    return Period(date(2023, 1, day)).title_date()
+
+
+class Workspace(TempDirectory):
+    def config(self, client: StubClient, **extra) -> Config:
+        return Config(
+            {
+                'zope': client,
+                'diary_path': self.as_path('diary.txt'),
+                'dump': str(self.as_path('dump')),
+                'sync_index': self.as_path('sync.sqlite'),
+                'upload_manifest': self.as_path('uploads.json'),
+                **extra,
+            }
+        )
+
+    def write_diary(self, *days: Period) -> None:
+        self.as_path('diary.txt').write_text('\n'.join(str(day) for day in days))
+
+
+@pytest.fixture()
+def workspace():
+    with Workspace() as workspace:
+        yield workspace
+
+
+def run(workspace: Workspace, client: StubClient, **options) -> Config:
+    config = workspace.config(client)
+    options.setdefault('trim', False)
+    options.setdefault('target', date(2023, 1, 4))
+    ingest(config, **options)
+    return config
+
+
+def updates_and_adds(client: StubClient) -> tuple[list, list]:
+    return (
+        sorted(post for post in client.posted if post[0]),
+        [post for post in client.posted if not post[0]],
+    )
+
+
+class TestIngest:
+    @pytest.mark.parametrize('options', [{}, {'uploads': 1}, {'uploads': 2}])
+    def test_adds_and_updates(self, workspace, capsys, options):
+        # postings from before the diary aren't touched:
+        old = Period(date(2022, 12, 1), zope_id='old', modified=date(2022, 12, 1))
+        client = StubClient(periods=[listed(2), listed(1), old])
+        workspace.write_diary(
+            diary_day(1, 'one'), diary_day(2, 'two'), diary_day(3, 'three'), diary_day(4, 'four')
+        )
+        run(workspace, client, **options)
+        compare(
+            updates_and_adds(client),
+            expected=(
+                [('/1', title(1), False), ('/2', title(2), False)],
+                [('', title(3), True), ('', title(4), True)],
+            ),
+        )
+        dump = workspace.as_path('dump/2023/01')
+        compare(
+            capsys.readouterr().out.splitlines(),
+            expected=[
+                f'   ADD: {dump}/01.txt',
+                f'   ADD: {dump}/02.txt',
+                f'   ADD: {dump}/03.txt',
+                f'   ADD: {dump}/04.txt',
+                'Updated Sun 01 Jan',
+                'Updated Mon 02 Jan',
+                'Added Tue 03 Jan',
+                'Added Wed 04 Jan',
+            ],
+        )
+        compare(
+            sorted(UploadManifest(workspace.as_path('uploads.json')).uploads),
+            expected=[date(2023, 1, day) for day in (1, 2, 3, 4)],
+        )
+
+    def test_failures(self, workspace, capsys):
+        client = StubClient(
+            periods=[listed(2), listed(1)], failing={date(2023, 1, 2), date(2023, 1, 3)}
+        )
+        workspace.write_diary(
+            diary_day(1, 'one'), diary_day(2, 'two'), diary_day(3, 'three'), diary_day(4, 'four')
+        )
+        with ShouldRaise(RuntimeError('3 of 4 days failed to upload')):
+            run(workspace, client)
+        # once an add fails, later days aren't added so the listing stays in order:
+        compare(
+            updates_and_adds(client),
+            expected=(
+                [('/1', title(1), False), ('/2', title(2), False)],
+                [('', title(3), True)],
+            ),
+        )
+        compare(
+            capsys.readouterr().out.splitlines()[4:],
+            expected=[
+                'Updated Sun 01 Jan',
+                'Failed to update Mon 02 Jan: server error',
+                'Failed to add Tue 03 Jan: server error',
+                'Failed to add Wed 04 Jan: not added as adding Tue 03 Jan failed',
+            ],
+        )
+        # only what was sent is recorded, and the diary is left as it was:
+        compare(
+            list(UploadManifest(workspace.as_path('uploads.json')).uploads),
+            expected=[date(2023, 1, 1)],
+        )
+        compare(workspace.as_path('diary.txt').read_text().count('(2023-01-'), expected=4)
+
+    def test_unsendable(self, workspace, capsys):
+        client = StubClient(periods=[listed(1)])
+        workspace.write_diary(
+            diary_day(1, 'caf\N{LATIN SMALL LETTER E WITH ACUTE}'), diary_day(2, '\N{EURO SIGN}5')
+        )
+        with ShouldRaise(RuntimeError('1 of 2 days failed to upload')):
+            run(workspace, client, target=date(2023, 1, 2))
+        output = capsys.readouterr().out.splitlines()
+        compare(output[2], expected='Updated Sun 01 Jan')
+        assert output[3].startswith("Failed to add Mon 02 Jan: 'latin-1' codec"), output[3]
+        compare(client.posted, expected=[('/1', title(1), False)])
+
+    def test_skip_empty(self, workspace, capsys):
+        client = StubClient()
+        workspace.write_diary(diary_day(1), diary_day(2, 'two'))
+        run(workspace, client, target=date(2023, 1, 2))
+        compare(client.posted, expected=[('', title(2), True)])
+        compare(
+            capsys.readouterr().out.splitlines()[1::2],
+            expected=['Skipping Sun 01 Jan as empty', 'Added Mon 02 Jan'],
+        )
+
+    def test_skip_unchanged(self, workspace, capsys):
+        client = StubClient(periods=[listed(1)])
+        workspace.write_diary(diary_day(1, 'one'))
+        run(workspace, client, target=date(2023, 1, 1))
+        run(workspace, client, target=date(2023, 1, 1))
+        compare(client.posted, expected=[('/1', title(1), False)])
+        compare(
+            capsys.readouterr().out.splitlines()[-1], expected='Skipping Sun 01 Jan as unchanged'
+        )
+
+    def test_force(self, workspace):
+        client = StubClient(periods=[listed(1)])
+        workspace.write_diary(diary_day(1, 'one'))
+        run(workspace, client, target=date(2023, 1, 1))
+        run(workspace, client, target=date(2023, 1, 1), force=True)
+        compare(client.posted, expected=[('/1', title(1), False), ('/1', title(1), False)])
+
+    @pytest.mark.parametrize('force', [False, True])
+    def test_rendered_once(self, workspace, force):
+        client = StubClient(periods=[listed(1)])
+        workspace.write_diary(diary_day(1, 'one'), diary_day(2, 'two'))
+        rendered = []
+        original = Client.post_data
+
+        def post_data(client: Client, day: Period) -> dict[str, str]:
+            rendered.append(day.date)
+            return original(client, day)
+
+        with Replace('diary.zope.Client.post_data', post_data):
+            run(workspace, client, target=date(2023, 1, 2), force=force)
+        compare(sorted(rendered), expected=[date(2023, 1, 1), date(2023, 1, 2)])
+
+    def test_resync(self, workspace):
+        client = StubClient(periods=[listed(1)])
+        with closing(SyncIndex(workspace.as_path('sync.sqlite'))) as index:
+            index.record(date(2023, 1, 1), 'stale', date(2023, 1, 1))
+            index.record(date(2023, 1, 2), 'gone', date(2023, 1, 2))
+        workspace.write_diary(diary_day(1, 'one'))
+        run(workspace, client, target=date(2023, 1, 1), resync=True)
+        compare(client.posted, expected=[('/1', title(1), False)])
+
+    def test_extend_and_trim(self, workspace):
+        client = StubClient(periods=[listed(2), listed(1)])
+        workspace.write_diary(diary_day(1, 'one'), diary_day(2, 'two'))
+        with Replace('diary.ingest.previous_sunday', lambda: date(2023, 1, 1)):
+            run(workspace, client, trim=True, target=date(2023, 1, 4))
+        compare(
+            workspace.as_path('diary.txt').read_text(),
+            expected='\n'.join(
+                str(day) for day in (diary_day(2, 'two'), diary_day(3), diary_day(4))
+            ),
+        )
+
+    def test_not_consecutive(self, workspace):
+        workspace.write_diary(diary_day(1, 'one'), diary_day(3, 'three'))
+        with ShouldRaise(AssertionError('Sun 01 Jan to Tue 03 Jan was 2 days, not 1!')):
+            run(workspace, StubClient())
+
+    def test_vm_time_wrong(self, workspace):
+        client = StubClient(now=datetime.now() - timedelta(minutes=1))
+        workspace.write_diary(diary_day(1, 'one'))
+        with ShouldRaise(RuntimeError):
+            run(workspace, client)
+        compare(client.posted, expected=[])
+
+
+class TestManifest:
+    def test_added_then_listed(self, workspace, capsys):
+        client = StubClient()
+        workspace.write_diary(diary_day(1, 'one'))
+        run(workspace, client, target=date(2023, 1, 1))
+        run(workspace, client, target=date(2023, 1, 1))
+        compare(client.posted, expected=[('', title(1), True)])
+        compare(
+            capsys.readouterr().out.splitlines()[-1], expected='Skipping Sun 01 Jan as unchanged'
+        )
+
+    def test_added_but_not_listed(self, workspace):
+        client = StubClient()
+        workspace.write_diary(diary_day(1, 'one'))
+        run(workspace, client, target=date(2023, 1, 1))
+        client.periods.clear()
+        run(workspace, client, target=date(2023, 1, 1))
+        compare(client.posted, expected=[('', title(1), True), ('', title(1), True)])
+
+    def test_posted_again(self, workspace):
+        client = StubClient(periods=[listed(1)])
+        workspace.write_diary(diary_day(1, 'one'))
+        run(workspace, client, target=date(2023, 1, 1))
+        client.periods[:] = [Period(date(2023, 1, 1), zope_id='9', modified=date(2023, 1, 5))]
+        run(workspace, client, target=date(2023, 1, 1))
+        compare(client.posted, expected=[('/1', title(1), False), ('/9', title(1), False)])
+
+    def test_unreadable(self, workspace):
+        client = StubClient(periods=[listed(1)])
+        workspace.write_diary(diary_day(1, 'one'))
+        run(workspace, client, target=date(2023, 1, 1))
+        manifest = workspace.as_path('uploads.json')
+        manifest.write_text(manifest.read_text()[:20])
+        run(workspace, client, target=date(2023, 1, 1))
+        compare(client.posted, expected=[('/1', title(1), False), ('/1', title(1), False)])
+        compare(list(UploadManifest(manifest).uploads), expected=[date(2023, 1, 1)])
+
+
+class TestSyncIndex:
+    def test_diary_goes_back_further(self, workspace):
+        client = StubClient(periods=[listed(day) for day in (6, 5, 4, 3, 2, 1)])
+        workspace.write_diary(diary_day(5, 'thing 5'), diary_day(6, 'thing 6'))
+        run(workspace, client, target=date(2023, 1, 6))
+        workspace.write_diary(*(diary_day(day, f'thing {day}') for day in range(1, 7)))
+        run(workspace, client, target=date(2023, 1, 6))
+        # the 1st was never read into the index, but it's still found rather than
+        # being added again:
+        compare(
+            updates_and_adds(client),
+            expected=([(f'/{day}', title(day), False) for day in (1, 2, 3, 4, 5, 6)], []),
+        )
+
+    def test_removed_from_server(self, workspace):
+        client = StubClient(periods=[listed(2), listed(1)])
+        workspace.write_diary(diary_day(1, 'one'), diary_day(2, 'two'))
+        run(workspace, client, target=date(2023, 1, 2))
+        del client.periods[0]
+        run(workspace, client, target=date(2023, 1, 2))
+        compare(
+            updates_and_adds(client),
+            expected=([('/1', title(1), False), ('/2', title(2), False)], [('', title(2), True)]),
+        )
+        compare(client.periods[0].zope_id, expected='new-02')
+
+    def test_incremental_reads_first_page(self, workspace):
+        client = PagedClient(periods=[listed(4), listed(3), listed(2), listed(1)])
+        workspace.write_diary(*(diary_day(day, 'thing') for day in range(1, 5)))
+        run(workspace, client)
+        compare(client.pages, expected=['', '?b_start=2'])
+        client.pages.clear()
+        run(workspace, client)
+        compare(client.pages, expected=[''])
+
+
+@pytest.fixture()
+def parsed():
+    # an empty in-memory cache, recording which blocks are actually parsed:
+    with Replace('diary.parse.block_cache.periods', OrderedDict()):
+        with Replace('diary.parse.parse_block', Mock(side_effect=parse_block)) as parse:
+            yield parse
+
+
+def parsed_days(parse: Mock) -> list[str]:
+    return [text.splitlines()[0] for _, text in (call.args for call in parse.call_args_list)]
+
+
+class TestParseCache:
+    def test_in_memory(self, workspace, parsed):
+        workspace.write_diary(diary_day(1, 'one'), diary_day(2, 'two'))
+        run(workspace, StubClient(), target=date(2023, 1, 2))
+        workspace.write_diary(diary_day(1, 'one'), diary_day(2, 'two', 'more'))
+        run(workspace, StubClient(), target=date(2023, 1, 2))
+        compare(parsed_days(parsed), expected=[title(1), title(2), title(2)])
+        compare(len(block_cache.periods), expected=3)
+
+    def test_on_disk(self, workspace, parsed):
+        workspace.write_diary(diary_day(1, 'one'), diary_day(2, 'two'))
+        config = workspace.config(StubClient(), parse_cache=str(workspace.as_path('blocks')))
+        ingest(config, trim=False, target=date(2023, 1, 2))
+        compare(len(list(workspace.as_path('blocks').iterdir())), expected=2)
+        # as if in a new process, with only the blocks on disk to go on:
+        block_cache.periods.clear()
+        workspace.write_diary(diary_day(1, 'one'), diary_day(2, 'two', 'more'))
+        ingest(config, trim=False, target=date(2023, 1, 2))
+        compare(parsed_days(parsed), expected=[title(1), title(2), title(2)])
+        compare(len(list(workspace.as_path('blocks').iterdir())), expected=3)
+        # the global cache is only used when there's no parse_cache:
+        compare(block_cache.periods, expected={})
+
+
+def test_add_skipped():
+    compare(str(AddSkipped(diary_day(3))), expected='not added as adding Tue 03 Jan failed')
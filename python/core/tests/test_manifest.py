@@ -0,0 +1,77 @@
+from datetime import date, timezone
+
+import pytest
+from testfixtures import compare, TempDirectory
+
+from diary.manifest import UploadManifest
+
+
+class TestUploadManifest:
+    def test_missing(self):
+        with TempDirectory() as td:
+            manifest = UploadManifest(td.as_path('uploads.json'))
+            compare(manifest.uploads, expected={})
+            compare(manifest.unchanged(date(2023, 1, 15), '123', 'abc'), expected=False)
+
+    def test_round_trip(self):
+        with TempDirectory() as td:
+            path = td.as_path('sub/uploads.json')
+            manifest = UploadManifest(path)
+            manifest.record(date(2023, 1, 15), '123', 'abc')
+            manifest.record(date(2023, 1, 14), None, 'def')
+            manifest.save()
+            compare(UploadManifest(path).uploads, expected=manifest.uploads)
+            compare(manifest.uploads[date(2023, 1, 14)].zope_id, expected=None)
+            compare(manifest.uploads[date(2023, 1, 15)].payload, expected='abc')
+            assert manifest.uploads[date(2023, 1, 15)].uploaded.tzinfo is timezone.utc
+            compare(td.as_path('sub').iterdir(), expected=[path])
+
+    def test_unchanged(self):
+        with TempDirectory() as td:
+            manifest = UploadManifest(td.as_path('uploads.json'))
+            manifest.record(date(2023, 1, 15), '123', 'abc')
+            compare(manifest.unchanged(date(2023, 1, 15), '123', 'abc'), expected=True)
+            compare(manifest.unchanged(date(2023, 1, 15), '123', 'xyz'), expected=False)
+            compare(manifest.unchanged(date(2023, 1, 14), '123', 'abc'), expected=False)
+
+    def test_added_but_not_listed(self):
+        # a day that was added but isn't on the server any more needs adding again:
+        with TempDirectory() as td:
+            manifest = UploadManifest(td.as_path('uploads.json'))
+            manifest.record(date(2023, 1, 15), None, 'abc')
+            compare(manifest.unchanged(date(2023, 1, 15), None, 'abc'), expected=False)
+
+    def test_id_changed(self):
+        # the day was posted again, so what was sent before isn't what's there now:
+        with TempDirectory() as td:
+            manifest = UploadManifest(td.as_path('uploads.json'))
+            manifest.record(date(2023, 1, 15), '123', 'abc')
+            compare(manifest.unchanged(date(2023, 1, 15), '456', 'abc'), expected=False)
+
+    def test_added_and_now_listed(self):
+        with TempDirectory() as td:
+            manifest = UploadManifest(td.as_path('uploads.json'))
+            manifest.record(date(2023, 1, 15), None, 'abc')
+            compare(manifest.unchanged(date(2023, 1, 15), '123', 'abc'), expected=True)
+            compare(manifest.unchanged(date(2023, 1, 15), '123', 'xyz'), expected=False)
+
+    @pytest.mark.parametrize(
+        'content',
+        [
+            '{"2023-01-15": {"zope_id": "123", "pay',
+            '',
+            '[]',
+            '{"2023-01-15": {"zope_id": "123"}}',
+            '{"2023-01-15": "abc"}',
+            '{"15/01/2023": {"zope_id": "123", "payload": "abc", "uploaded": "2023-01-15"}}',
+            '{"2023-01-15": {"zope_id": "123", "payload": "abc", "uploaded": "yesterday"}}',
+        ],
+    )
+    def test_unreadable(self, content):
+        with TempDirectory() as td:
+            td.write('uploads.json', content)
+            manifest = UploadManifest(td.as_path('uploads.json'))
+            compare(manifest.uploads, expected={})
+            manifest.record(date(2023, 1, 15), '123', 'abc')
+            manifest.save()
+            compare(UploadManifest(td.as_path('uploads.json')).uploads, expected=manifest.uploads)
@@ -1,8 +1,19 @@
+import pickle
+from dataclasses import FrozenInstanceError
 from datetime import date
 
-from testfixtures import compare, ShouldRaise
+from testfixtures import LogCapture, Replace, compare, ShouldRaise
 
-from diary.objects import Stuff, Type, Period, text_to_type
+import diary.objects
+from diary.objects import (
+    Stuff,
+    Type,
+    TypeResolver,
+    Period,
+    format_dates,
+    text_to_type,
+    use_type_resolver,
+)
 
 
 def test_only_start():
@@ -138,5 +149,135 @@ def test_text_to_type_synonym():
 
 
 def test_text_to_type_invalid():
-    with ShouldRaise(ValueError):
+    with ShouldRaise(ValueError("'INVALID_TYPE' is not a valid Type")):
         text_to_type('INVALID_TYPE')
+
+
+def test_use_type_resolver():
+    resolver = TypeResolver(confidence=0.75)
+    with Replace('diary.objects.type_resolver', diary.objects.type_resolver):
+        use_type_resolver(resolver)
+        compare(text_to_type('NOPE'), expected=Type.note)
+    with ShouldRaise(ValueError("'NOPE' is not a valid Type")):
+        text_to_type('NOPE')
+
+
+class TestTypeResolver:
+    def test_typo(self):
+        resolver = TypeResolver()
+        with LogCapture() as log:
+            compare(resolver('POSTPONDED'), expected=Type.postponed)
+        log.check(
+            ('diary.objects', 'WARNING', "'POSTPONDED' resolved to POSTPONED with confidence 0.90")
+        )
+
+    def test_typo_of_synonym(self):
+        compare(TypeResolver()('ABANDONDDED'), expected=Type.cancelled)
+
+    def test_not_close_enough(self):
+        with ShouldRaise(ValueError("'NOPE' is not a valid Type")):
+            TypeResolver()('NOPE')
+
+    def test_lower_confidence(self):
+        compare(TypeResolver(confidence=0.75)('NOPE'), expected=Type.note)
+
+    def test_ambiguous(self):
+        resolver = TypeResolver(confidence=0.6)
+        with LogCapture() as log:
+            with ShouldRaise(ValueError("'DIDHO' is not a valid Type")):
+                resolver('DIDHO')
+        log.check(('diary.objects', 'WARNING', "'DIDHO' is equally close to DID, DIDN'T"))
+
+    def test_memoised(self):
+        resolver = TypeResolver()
+        with LogCapture() as log:
+            for _ in range(3):
+                compare(resolver('EVNT'), expected=Type.event)
+                with ShouldRaise(ValueError):
+                    resolver('XYZ')
+        compare(resolver.resolved, expected={'EVNT': Type.event, 'XYZ': None})
+        compare(len(log.records), expected=1)
+
+
+def test_stuff_tags_shared():
+    stuff = Stuff(Type.did, 'a thing', tags=['work', ''.join(['ho', 'me'])])
+    other = Stuff(Type.did, ''.join(['a ', 'thing']), tags=('home',))
+    compare(stuff.tags, expected=('work', 'home'))
+    assert stuff.tags is not None and other.tags is not None
+    assert stuff.tags[1] is other.tags[0]
+    assert stuff.title is other.title
+
+
+def test_stuff_equal_with_list_tags():
+    compare(Stuff(Type.did, 'thing', tags=['a']), expected=Stuff(Type.did, 'thing', tags=('a',)))
+
+
+def test_stuff_frozen():
+    stuff = Stuff(Type.did, 'thing')
+    with ShouldRaise(FrozenInstanceError):
+        stuff.title = 'other'  # type: ignore[misc]
+
+
+def test_no_instance_dict():
+    assert not hasattr(Stuff(Type.did, 'thing'), '__dict__')
+    assert not hasattr(Period(date(2020, 2, 1)), '__dict__')
+
+
+def test_pickle():
+    day = Period(date(2020, 2, 1), [Stuff(Type.did, 'thing', 'body', ['work'])], zope_id='x')
+    compare(pickle.loads(pickle.dumps(day)), expected=day)
+
+
+class TestRendering:
+    def test_stuff(self):
+        compare(str(Stuff(Type.did, 'thing', 'body')), expected='DID thing:\n--\nbody\n--')
+
+    def test_text_not_kept(self):
+        # only the shared date headers are cached, so a loaded archive doesn't hold
+        # a second copy of its text:
+        compare(
+            [slot for slot in Period.__slots__ + Stuff.__slots__ if slot[0] == '_'], expected=[]
+        )
+
+    def test_stuff_changed_in_place(self):
+        day = Period(date(2020, 2, 1), [Stuff(Type.did, 'thing')])
+        str(day)
+        day.stuff.append(Stuff(Type.note, 'more'))
+        compare(day.summary(), expected='DID thing\nNOTE more')
+        compare(
+            str(day),
+            expected='(2020-02-01) Saturday\n=====================\nDID thing\nNOTE more\n',
+        )
+
+    def test_stuff_replaced(self):
+        day = Period(date(2020, 2, 1), [Stuff(Type.did, 'thing')])
+        str(day)
+        day.stuff = []
+        compare(day.summary(), expected='')
+        compare(str(day), expected='(2020-02-01) Saturday\n=====================\n')
+
+    def test_dates_changed(self):
+        day = Period(date(2020, 2, 1))
+        str(day)
+        day.end = date(2020, 2, 2)
+        compare(
+            str(day),
+            expected=(
+                '(2020-02-01) Saturday to (2020-02-02) Sunday\n'
+                '============================================\n'
+            ),
+        )
+        day.start = date(2020, 1, 31)
+        compare(day.human_date(), expected='Fri 31 Jan to Sun 02 Feb')
+
+    def test_not_compared(self):
+        day = Period(date(2020, 2, 1), [Stuff(Type.did, 'thing')])
+        str(day)
+        compare(day, expected=Period(date(2020, 2, 1), [Stuff(Type.did, 'thing')]))
+
+    def test_headers_shared(self):
+        format_dates.cache_clear()
+        Period(date(2020, 2, 1)).title_date()
+        Period(date(2020, 2, 1), [Stuff(Type.did, 'thing')]).title_date()
+        compare(format_dates.cache_info().misses, expected=1)
+        compare(format_dates.cache_info().hits, expected=1)
@@ -1,9 +1,38 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
-from testfixtures import compare, ShouldRaise
-
-from diary.objects import Period, Stuff, Type
-from diary.parse import parse
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from lark.exceptions import UnexpectedInput, VisitError
+from testfixtures import (
+    compare,
+    LogCapture,
+    Replace,
+    ShouldRaise,
+    TempDirectory,
+    replace_in_environ,
+    replace_in_module,
+)
+
+import diary.parse
+
+from diary.objects import Period, Stuff, Type, TypeResolver
+from diary.parse import (
+    BlockCache,
+    Diary,
+    cache_path,
+    iter_parse,
+    make_parser,
+    parse,
+    parse_block,
+    parser,
+    scan,
+)
 from diary.zope import Client, LookBackFailed
 
 
@@ -341,6 +370,10 @@ def test_body_dashy_table():
 
 
 class TestInferDates:
+    @pytest.fixture(autouse=True)
+    def inferred_dates(self):
+        Client.infer_date.cache_clear()
+
     def test_standard(self):
         compare(Client.infer_date('(2021-11-08) Monday'), expected=(date(2021, 11, 8), None))
 
@@ -759,3 +792,392 @@ def test_date_day_mismatch():
 
     with ShouldRaise(VisitError):
         parse("(2021-11-03) Tuesday\n======================\n")
+
+
+class TestParserCache:
+    def test_cache_path(self):
+        with replace_in_environ('XDG_CACHE_HOME', '/some/cache'):
+            path = cache_path()
+        compare(path.parent, expected=Path('/some/cache/diary'))
+        assert path.name.startswith('grammar-lark-')
+
+    def test_cache_path_default(self):
+        with replace_in_environ('XDG_CACHE_HOME', ''):
+            path = cache_path()
+        compare(path.parent, expected=Path('~/.cache/diary').expanduser())
+
+    def test_no_cache(self):
+        parser = make_parser()
+        assert parser.parse("(2021-11-02) Tuesday\n=====\n")
+
+    def test_cold_then_warm(self):
+        with TempDirectory() as td:
+            path = td.as_path('nested/parser.cache')
+            make_parser(path)
+            assert path.exists()
+            content = path.read_bytes()
+            parser = make_parser(path)
+            compare(path.read_bytes(), expected=content)
+            assert parser.parse("(2021-11-02) Tuesday\n=====\n")
+
+    def test_stale_cache_rebuilt(self):
+        with TempDirectory() as td:
+            path = td.as_path('parser.cache')
+            path.write_bytes(b'stale\n')
+            parser = make_parser(path)
+            assert path.read_bytes() != b'stale\n'
+            assert parser.parse("(2021-11-02) Tuesday\n=====\n")
+
+    def test_cache_dir_not_creatable(self):
+        with TempDirectory() as td:
+            blocker = td.write('blocker', '')
+            parser = make_parser(Path(blocker) / 'parser.cache')
+            assert parser.parse("(2021-11-02) Tuesday\n=====\n")
+
+
+class TestScan:
+    @pytest.mark.parametrize(
+        'text',
+        [
+            "(2021-11-02) Tuesday\n==================\nEVENT woke far too early :-(\n",
+            "(2021-11-02) Tuesday\n==================\nDIDN'T do anything\n",
+            "(2021-11-02) Tuesday\n=\nDID thing 1\n\n\n\n(2021-11-03) Wednesday\n=\n",
+            "(2021-11-02)\tTuesday  to (2021-11-04) Thursday\n=\nDID stuff  \n",
+            "(2021-11-03) Wednesday\n=\n\n(2021-11-04) Thursday\n=\n",
+            "(2021-11-03) Wednesday\n=\nEVENT: something happened\n",
+            "(2021-11-03) Wednesday\n=\nCANCEL everything\n(2021-11-04) Thursday\n=\n",
+            "(2021-11-03) Wednesday\n=\nDID:tag1:tag2 some thing:\n--\nThe body\n--\n",
+            "(2021-11-03) Wednesday\n=\nDID:tag1:tag2: some thing:\n--\nThe body\n--\n",
+            "(2021-11-03) Wednesday\n=\nDID thing:\n--\npart 1\n\npart 2\n--\n",
+            "(2021-11-03) Wednesday\n=\nDID thing\n--\nThe body\n--\nDID more\n",
+            "(2021-11-03) Wednesday\n=\nDID thing:\n---\nThe body\n---\n",
+            "(2021-11-03) Wednesday\n=\nDID thing:\n--\n--\n--\n",
+            "(2021-11-03) Wednesday\n=\nDID thing:\n--\n sum | ?\n----+---\n(1 row)\n--\n",
+        ],
+    )
+    def test_matches_lark(self, text):
+        compare(scan(text), expected=parser.parse(text))
+
+    @pytest.mark.parametrize(
+        'text, exception',
+        [
+            ("", UnexpectedInput),
+            ("\n", UnexpectedInput),
+            ("(2021-11-03) Wednesday\n=====", UnexpectedInput),
+            ("(2021-11-03) Wednesday\n", UnexpectedInput),
+            ("(2021-11-03) Wednesday\nDID thing\n", UnexpectedInput),
+            ("(2021-11-03) Tuesday\n=\n", VisitError),
+            ("(2021-11-03) Wednesday to (2021-11-02) Tuesday\n=\n", VisitError),
+            ("(2021-02-30) Tuesday\n=\n", VisitError),
+            ("(2021-11-03) Wednesday\n=\nNOPE thing\n", VisitError),
+            ("(2021-11-03) Wednesday\n=\nDID x\n", UnexpectedInput),
+            ("(2021-11-03) Wednesday\n=\nDID thing:\nmore\n", UnexpectedInput),
+            ("(2021-11-03) Wednesday\n=\nDID thing::\n--\nbody\n--\n", UnexpectedInput),
+            ("(2021-11-03) Wednesday\n=\nDID thing:\n--\nbody\n", UnexpectedInput),
+            ("(2021-11-03) Wednesday\n=\nDID thing\n\nDID more\n", UnexpectedInput),
+            ("(2021-11-03) Wednesday\n=\nDID thing\n----\n", UnexpectedInput),
+        ],
+    )
+    def test_falls_back(self, text, exception):
+        compare(scan(text), expected=None)
+        with pytest.raises(exception):
+            parse(text)
+
+
+class TestIterParse:
+    text = (
+        "(2021-11-02) Tuesday\n"
+        "====================\n"
+        "DID thing 1\n"
+        "\n"
+        "(2021-11-03) Wednesday\n"
+        "======================\n"
+        "DID run some sql:\n"
+        "--\n"
+        "(1 row)\n"
+        "--\n"
+        "(2021-11-04) Thursday\n"
+        "=====================\n"
+        "DID thing:\n"
+        "--\n"
+        "--\n"
+        "(not a day)\n"
+        "--\n"
+    )
+
+    def test_same_as_parse(self):
+        compare(list(iter_parse(StringIO(self.text))), expected=parse(self.text))
+
+    def test_yields_each_day_when_complete(self):
+        read = []
+
+        def lines():
+            for line in self.text.splitlines(keepends=True):
+                read.append(line)
+                yield line
+
+        periods = iter_parse(lines())
+        compare(next(periods).start, expected=date(2021, 11, 2))
+        compare(read[-1], expected="(2021-11-03) Wednesday\n")
+        compare(next(periods).start, expected=date(2021, 11, 3))
+        compare(read[-1], expected="(2021-11-04) Thursday\n")
+        compare(next(periods).start, expected=date(2021, 11, 4))
+        compare(list(periods), expected=[])
+
+    def test_empty(self):
+        compare(list(iter_parse(StringIO(''))), expected=[])
+
+    def test_fallback_day_mismatch(self):
+        text = self.text + "(2021-11-04) Friday\n=\n"
+        with ShouldRaise(VisitError) as s:
+            list(iter_parse(StringIO(text)))
+        compare(
+            str(s.raised.orig_exc),
+            expected='line 18: 2021-11-04 is a Thursday, but day given as Friday',
+        )
+
+    def test_fallback_same_error_as_parse(self):
+        text = self.text + "(2021-11-05) Friday\n=\nDID x\n"
+        with pytest.raises(UnexpectedInput) as expected:
+            parse(text)
+        with pytest.raises(UnexpectedInput) as actual:
+            list(iter_parse(StringIO(text)))
+        compare(actual.value.line, expected=20)
+        compare(str(actual.value), expected=str(expected.value))
+
+    def test_fallback_first_day(self):
+        text = "(2021-11-02) Tuesday\n=\nDID x\n" + self.text
+        with pytest.raises(UnexpectedInput) as actual:
+            list(iter_parse(StringIO(text)))
+        compare(actual.value.line, expected=3)
+
+    @pytest.mark.parametrize('before', ['', '(2021-10-31) Sunday\n=\n'])
+    def test_error_needs_next_day(self, before):
+        # the first day has no underline, which only shows once the next day is read:
+        text = before + "(2021-11-01) Monday\n(2021-11-02) Tuesday\n=====\n"
+        with pytest.raises(UnexpectedInput) as expected:
+            parser.parse(text)
+        compare(expected.value.line, expected=text.count('\n') - 1)
+        with pytest.raises(UnexpectedInput) as streamed:
+            list(iter_parse(StringIO(text)))
+        compare(str(streamed.value), expected=str(expected.value))
+        with pytest.raises(UnexpectedInput) as actual:
+            parse(text)
+        compare(str(actual.value), expected=str(expected.value))
+
+    def test_fallback_valid(self):
+        with replace_in_module(scan, lambda text: None, module=diary.parse):
+            actual = list(iter_parse(StringIO(self.text), cache=None))
+        compare(actual, expected=parse(self.text))
+
+
+class TestInlineTransform:
+    def test_same_as_tree(self):
+        text = TestIterParse.text
+        tree = make_parser().parse(text)
+        compare(parser.parse(text), expected=Diary().transform(tree))
+
+    def test_error_same_as_tree(self):
+        with ShouldRaise(VisitError) as s:
+            parser.parse("(2021-11-03) Tuesday\n======================\n")
+        compare(
+            str(s.raised),
+            expected=(
+                'Error trying to process rule "date_pair":\n\n'
+                'line 1: 2021-11-03 is a Wednesday, but day given as Tuesday'
+            ),
+        )
+
+    def test_error_from_tree(self):
+        tree = make_parser().parse("(2021-11-03) Tuesday\n======================\n")
+        with ShouldRaise(VisitError) as s:
+            Diary().transform(tree)
+        compare(
+            str(s.raised),
+            expected=(
+                'Error trying to process rule "date_pair":\n\n'
+                'line 1: 2021-11-03 is a Wednesday, but day given as Tuesday'
+            ),
+        )
+        compare(
+            s.raised.orig_exc,
+            expected=AssertionError('line 1: 2021-11-03 is a Wednesday, but day given as Tuesday'),
+        )
+
+    def test_error_from_parse(self):
+        with ShouldRaise(VisitError) as s:
+            parse("(2021-11-03) Wednesday\n=\n\n(2021-11-05) Thursday\n=\n")
+        compare(
+            str(s.raised),
+            expected=(
+                'Error trying to process rule "date_pair":\n\n'
+                'line 4: 2021-11-05 is a Friday, but day given as Thursday'
+            ),
+        )
+        compare(
+            s.raised.orig_exc,
+            expected=AssertionError('line 4: 2021-11-05 is a Friday, but day given as Thursday'),
+        )
+
+
+class TestBlockCache:
+    text = TestIterParse.text
+
+    @pytest.fixture()
+    def parsed(self):
+        parsed = []
+
+        def recording_parse_block(offset, text):
+            parsed.append(text.split('\n')[0])
+            return parse_block(offset, text)
+
+        with replace_in_module(parse_block, recording_parse_block, module=diary.parse):
+            yield parsed
+
+    def test_only_changed_blocks_parsed(self, parsed):
+        cache = BlockCache()
+        expected = parse(self.text, cache=None)
+        parsed.clear()
+        compare(parse(self.text, cache), expected=expected)
+        compare(len(parsed), expected=3)
+        changed = self.text.replace('DID thing 1', 'DID thing 2')
+        actual = parse(changed, cache)
+        compare(parsed[3:], expected=['(2021-11-02) Tuesday'])
+        compare(actual[0].stuff, expected=[Stuff(Type.did, 'thing 2')])
+        compare(actual[1:], expected=expected[1:])
+
+    def test_results_are_copies(self, parsed):
+        cache = BlockCache()
+        first = parse(self.text, cache)
+        first[0].zope_id = 'foo'
+        first[1].stuff.append(Stuff(Type.did, 'changed'))
+        first[2].stuff.clear()
+        compare(parse(self.text, cache), expected=parse(TestIterParse.text, cache=None))
+        compare(len(parsed), expected=6)
+
+    def test_threads(self):
+        # a small LRU so blocks are evicted while other threads are looking them up:
+        cache = BlockCache(size=2)
+        expected = parse(self.text, cache=None)
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: parse(self.text, cache), range(200)))
+        compare(results, expected=[expected] * 200)
+        compare(len(cache.periods), expected=2)
+
+    def test_lru_only_used_under_lock(self):
+        cache = BlockCache(size=2)
+
+        class Checked(OrderedDict):
+            def __getattribute__(self, name):
+                assert cache.lock.locked(), name
+                return super().__getattribute__(name)
+
+            def __setitem__(self, key, value):
+                assert cache.lock.locked()
+                super().__setitem__(key, value)
+
+        cache.periods = Checked()
+        parse(self.text, cache)
+        parse(self.text, cache)
+        compare(len(cache.periods), expected=2)
+
+    def test_lru(self, parsed):
+        cache = BlockCache(size=2)
+        parse(self.text, cache)
+        compare(len(cache.periods), expected=2)
+        parse(self.text, cache)
+        compare(len(parsed), expected=6)
+
+    def test_lru_hit(self, parsed):
+        cache = BlockCache(size=2)
+        text = "(2021-11-02) Tuesday\n=\n(2021-11-03) Wednesday\n=\n"
+        parse(text, cache)
+        parse(text, cache)
+        compare(len(parsed), expected=2)
+
+    def test_on_disk(self, parsed):
+        with TempDirectory() as td:
+            expected = parse(self.text, BlockCache(path=td.as_path()))
+            compare(len(parsed), expected=3)
+            compare(len(list(td.as_path().iterdir())), expected=3)
+            compare(parse(self.text, BlockCache(path=td.as_path())), expected=expected)
+            compare(len(parsed), expected=3)
+
+    def test_on_disk_corrupt(self, parsed):
+        with TempDirectory() as td:
+            expected = parse(self.text, BlockCache(path=td.as_path()))
+            for path in td.as_path().iterdir():
+                path.write_bytes(b'')
+            compare(parse(self.text, BlockCache(path=td.as_path())), expected=expected)
+            compare(len(parsed), expected=6)
+
+    def test_on_disk_not_writable(self, parsed):
+        with TempDirectory() as td:
+            blocker = td.write('blocker', '')
+            cache = BlockCache(path=Path(blocker) / 'cache')
+            compare(parse(self.text, cache), expected=parse(self.text, cache=None))
+
+    def test_on_disk_pruned(self, parsed):
+        days = [
+            Period(date(2021, 11, day), [Stuff(Type.did, f'thing {day}')]) for day in range(1, 8)
+        ]
+        with TempDirectory() as td:
+            cache = BlockCache(size=5, path=td.as_path())
+            parse(''.join(str(day) for day in days[:5]), cache)
+            for path in td.as_path().iterdir():
+                os.utime(path, (0, 0))
+            # the first day is used again, so isn't one of those removed:
+            parse(str(days[0]), BlockCache(path=td.as_path()))
+            parse(str(days[5]), cache)
+            compare(len(list(td.as_path().iterdir())), expected=4)
+            parse(str(days[6]), cache)
+            compare(len(list(td.as_path().iterdir())), expected=5)
+            parsed.clear()
+            parse(str(days[0]) + str(days[5]) + str(days[6]), BlockCache(path=td.as_path()))
+            compare(parsed, expected=[])
+
+    def test_prune_skips_vanished_files(self):
+        with TempDirectory() as td:
+            (td.as_path() / 'broken.pickle').symlink_to(td.as_path() / 'missing')
+            cache = BlockCache(size=1, path=td.as_path())
+            parse(self.text, cache)
+            compare(cache.stored, expected=1)
+
+    def test_on_disk_not_touchable(self, parsed):
+        with TempDirectory() as td:
+            expected = parse(self.text, BlockCache(path=td.as_path()))
+            with Replace('diary.parse.os.utime', Mock(side_effect=PermissionError)):
+                compare(parse(self.text, BlockCache(path=td.as_path())), expected=expected)
+            compare(len(parsed), expected=3)
+
+    def test_errors_same_as_without_cache(self):
+        text = self.text + "(2021-11-05) Friday\n=\nDID x\n"
+        with pytest.raises(UnexpectedInput) as expected:
+            parse(text, cache=None)
+        with pytest.raises(UnexpectedInput) as actual:
+            parse(text, BlockCache())
+        compare(str(actual.value), expected=str(expected.value))
+
+    def test_no_trailing_newline(self):
+        with pytest.raises(UnexpectedInput) as actual:
+            parse("(2021-11-02) Tuesday\n====", BlockCache())
+        compare(actual.value.line, expected=2)
+
+    def test_fuzzy_resolution_not_kept(self, parsed):
+        text = "(2021-11-02) Tuesday\n=\nNOPE thing\n(2021-11-03) Wednesday\n=\nDID thing 1\n"
+        with TempDirectory() as td:
+            for _ in range(2):
+                with Replace('diary.objects.type_resolver', TypeResolver(confidence=0.75)):
+                    with LogCapture() as log:
+                        actual = parse(text, BlockCache(path=td.as_path()))
+                compare(actual[0].stuff, expected=[Stuff(Type.note, 'thing')])
+                log.check(
+                    ('diary.objects', 'WARNING', "'NOPE' resolved to NOTE with confidence 0.75")
+                )
+            compare(len(list(td.as_path().iterdir())), expected=1)
+            compare(
+                parsed,
+                expected=['(2021-11-02) Tuesday', '(2021-11-03) Wednesday', '(2021-11-02) Tuesday'],
+            )
+            with ShouldRaise(VisitError):
+                parse(text, BlockCache(path=td.as_path()))
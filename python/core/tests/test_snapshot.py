@@ -0,0 +1,150 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+from testfixtures import ShouldRaise, compare
+
+from diary.objects import Period, Stuff, Type
+from diary.parse import parse
+from diary.snapshot import HEADER, Snapshot, SnapshotError, load, read_varints, save, write_varint
+
+TEXT = '''\
+(2021-11-02) Tuesday
+====================
+DID thing 1
+NOTE:home:work thing 2
+EVENT 🎉 unicode
+
+(2021-11-03) Wednesday to (2021-11-05) Friday
+=============================================
+DID run some sql:
+--
+(1 row)
+--
+DID thing 1
+
+(2021-11-06) Saturday
+=====================
+'''
+
+
+@pytest.fixture()
+def periods() -> list[Period]:
+    periods = parse(TEXT)
+    periods[0].zope_id = 'the-id'
+    periods[0].start_url = 'http://example.com/?b_start=10'
+    periods[0].start_date = date(2021, 11, 10)
+    periods[0].modified = date(2021, 11, 12)
+    return periods
+
+
+@pytest.fixture()
+def path(tmp_path: Path, periods: list[Period]) -> Path:
+    path = tmp_path / 'diary.snapshot'
+    save(periods, path)
+    return path
+
+
+def test_round_trip(path: Path, periods: list[Period]):
+    compare(load(path), expected=periods)
+
+
+def test_round_trip_parsed(tmp_path: Path):
+    path = tmp_path / 'diary.snapshot'
+    save(parse(TEXT), path)
+    compare(load(path), expected=parse(TEXT))
+
+
+def test_round_trip_empty(tmp_path: Path):
+    path = tmp_path / 'diary.snapshot'
+    save([], path)
+    compare(load(path), expected=[])
+    with Snapshot(path) as snapshot:
+        compare(snapshot.find(date(2021, 11, 2)), expected=None)
+
+
+def test_smaller_than_text(path: Path):
+    assert path.stat().st_size < len(TEXT.encode()) + HEADER.size
+
+
+class TestSnapshot:
+    def test_len(self, path: Path):
+        with Snapshot(path) as snapshot:
+            compare(len(snapshot), expected=3)
+
+    def test_getitem(self, path: Path, periods: list[Period]):
+        with Snapshot(path) as snapshot:
+            compare(snapshot[1], expected=periods[1])
+            compare(snapshot[-1], expected=periods[2])
+            compare(snapshot[0], expected=periods[0])
+
+    def test_getitem_out_of_range(self, path: Path):
+        with Snapshot(path) as snapshot:
+            with ShouldRaise(IndexError(3)):
+                snapshot[3]
+            with ShouldRaise(IndexError(-4)):
+                snapshot[-4]
+
+    def test_strings_decoded_once(self, path: Path):
+        with Snapshot(path) as snapshot:
+            first = snapshot[0].stuff[0].title
+            second = snapshot[1].stuff[1].title
+            assert first is second
+
+    def test_iter(self, path: Path, periods: list[Period]):
+        with Snapshot(path) as snapshot:
+            compare(list(snapshot), expected=periods)
+
+    def test_find(self, path: Path, periods: list[Period]):
+        with Snapshot(path) as snapshot:
+            compare(snapshot.find(date(2021, 11, 1)), expected=None)
+            compare(snapshot.find(date(2021, 11, 2)), expected=periods[0])
+            compare(snapshot.find(date(2021, 11, 3)), expected=periods[1])
+            compare(snapshot.find(date(2021, 11, 5)), expected=periods[1])
+            compare(snapshot.find(date(2021, 11, 6)), expected=periods[2])
+            compare(snapshot.find(date(2021, 11, 7)), expected=None)
+
+
+class TestErrors:
+    def test_empty(self, tmp_path: Path):
+        path = tmp_path / 'diary.snapshot'
+        path.write_bytes(b'')
+        with ShouldRaise(SnapshotError(f'{path} is empty')):
+            Snapshot(path)
+
+    def test_too_short(self, tmp_path: Path):
+        path = tmp_path / 'diary.snapshot'
+        path.write_bytes(b'DIARYSNP')
+        with ShouldRaise(SnapshotError(f'{path} is too short to be a snapshot')):
+            Snapshot(path)
+
+    def test_wrong_version(self, path: Path):
+        data = bytearray(path.read_bytes())
+        data[8] = 99
+        path.write_bytes(data)
+        with ShouldRaise(SnapshotError(f'{path} is not a version 1 snapshot')):
+            Snapshot(path)
+
+    def test_not_a_snapshot(self, tmp_path: Path):
+        path = tmp_path / 'diary.txt'
+        path.write_text(TEXT)
+        with ShouldRaise(SnapshotError(f'{path} is not a version 1 snapshot')):
+            Snapshot(path)
+
+
+@pytest.mark.parametrize('value', [0, 1, 127, 128, 300, 16383, 16384, 2**40])
+def test_varint(value: int):
+    out = bytearray()
+    write_varint(out, value)
+    write_varint(out, 5)
+    compare(read_varints(bytes(out)), expected=[value, 5])
+
+
+def test_large_values(tmp_path: Path):
+    path = tmp_path / 'diary.snapshot'
+    stuff = [Stuff(Type.did, f'thing {i}') for i in range(200)]
+    periods = [Period(date(9999, 12, 30), stuff, end=date(9999, 12, 31), modified=date.max)]
+    save(periods, path)
+    compare(load(path), expected=periods)
+    with Snapshot(path) as snapshot:
+        compare(snapshot[0], expected=periods[0])
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).parent.parent / 'src'
+
+# cumulative microseconds allowed for importing diary.cli:
+STARTUP_BUDGET = 150_000
+
+HEAVY = {'bs4', 'lark', 'requests', 'testfixtures'}
+
+
+def import_times(code: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        env=dict(os.environ, PYTHONPATH=str(SRC)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and 'cumulative' not in line:
+            _, cumulative, name = line.split('|')
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    'code',
+    [
+        'from diary.cli import main; main(["--help"])',
+        'from diary.cli import main; main(["ingest", "--help"])',
+        'from diary.dates import parse_date; parse_date("2020-02-01")',
+    ],
+)
+def test_heavy_dependencies_not_imported(code):
+    imported = {name.split('.')[0] for name in import_times(code)}
+    assert not imported & HEAVY, sorted(imported & HEAVY)
+
+
+def test_startup_budget():
+    cumulative = import_times('import diary.cli')['diary.cli']
+    assert cumulative < STARTUP_BUDGET, f'{cumulative}us > {STARTUP_BUDGET}us'
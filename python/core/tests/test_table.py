@@ -0,0 +1,131 @@
+from datetime import date
+
+import numpy as np
+from testfixtures import compare
+
+from diary.objects import Period, Stuff, Type
+from diary.table import PeriodTable
+
+PERIODS = [
+    Period(
+        date(2020, 1, 31),
+        [
+            Stuff(Type.did, 'thing', tags=['work']),
+            Stuff(Type.didnt, 'other', 'a\nbody', tags=['home', 'work']),
+        ],
+        zope_id='2020-01-31',
+        start_url='http://example.com/1',
+        start_date=date(2020, 1, 30),
+        modified=date(2020, 2, 1),
+    ),
+    Period(date(2020, 2, 1), end=date(2020, 2, 3)),
+    Period(date(2021, 2, 4), [Stuff(Type.did, 'more', tags=['home']), Stuff(Type.event, 'fun')]),
+]
+
+
+def test_round_trip():
+    compare(PeriodTable.from_periods(PERIODS).to_periods(), expected=PERIODS)
+
+
+def test_empty():
+    table = PeriodTable.from_periods([])
+    compare(table.to_periods(), expected=[])
+    keys, counts = table.tag_counts()
+    compare(keys.tolist(), expected=[])
+    compare(counts.shape, expected=(0, 0))
+
+
+def test_columns():
+    table = PeriodTable.from_periods(PERIODS)
+    compare(table.start.tolist(), expected=[737455, 737456, 737825])
+    compare(table.end.tolist(), expected=[0, 737458, 0])
+    compare(table.stuff_offsets.tolist(), expected=[0, 2, 2, 4])
+    compare(table.period.tolist(), expected=[0, 0, 2, 2])
+    compare(table.type.tolist(), expected=[1, 2, 1, 0])
+    compare(table.body.tolist(), expected=[None, 'a\nbody', None, None])
+    compare(table.tags.tolist(), expected=['home', 'work'])
+    compare(table.tag_offsets.tolist(), expected=[0, 1, 3, 4, 4])
+    compare(table.tag_ids.tolist(), expected=[1, 0, 1, 0])
+
+
+def test_day():
+    table = PeriodTable.from_periods(PERIODS)
+    compare(
+        table.day().tolist(),
+        expected=[date(2020, 1, 31), date(2020, 1, 31), date(2021, 2, 4), date(2021, 2, 4)],
+    )
+
+
+class TestWhere:
+    table = PeriodTable.from_periods(PERIODS)
+
+    def test_everything(self):
+        compare(self.table.where().tolist(), expected=[True, True, True, True])
+
+    def test_types(self):
+        compare(
+            self.table.where(types=[Type.did, Type.event]).tolist(),
+            expected=[True, False, True, True],
+        )
+
+    def test_tag(self):
+        compare(self.table.where(tag='home').tolist(), expected=[False, True, True, False])
+
+    def test_unknown_tag(self):
+        compare(self.table.where(tag='zzz').tolist(), expected=[False, False, False, False])
+        compare(self.table.where(tag='aaa').tolist(), expected=[False, False, False, False])
+
+    def test_dates(self):
+        compare(
+            self.table.where(start=date(2020, 2, 1), end=date(2021, 2, 4)).tolist(),
+            expected=[False, False, True, True],
+        )
+        compare(
+            self.table.where(end=date(2021, 2, 3)).tolist(), expected=[True, True, False, False]
+        )
+
+
+def test_select():
+    table = PeriodTable.from_periods(PERIODS)
+    selected = table.select(table.where(tag='home'))
+    compare(
+        selected.to_periods(),
+        expected=[
+            Period(
+                date(2020, 1, 31),
+                [Stuff(Type.didnt, 'other', 'a\nbody', tags=['home', 'work'])],
+                zope_id='2020-01-31',
+                start_url='http://example.com/1',
+                start_date=date(2020, 1, 30),
+                modified=date(2020, 2, 1),
+            ),
+            Period(date(2020, 2, 1), end=date(2020, 2, 3)),
+            Period(date(2021, 2, 4), [Stuff(Type.did, 'more', tags=['home'])]),
+        ],
+    )
+
+
+def test_type_counts_per_month():
+    table = PeriodTable.from_periods(PERIODS)
+    keys, counts = table.type_counts('M', table.where(types=[Type.did, Type.didnt]))
+    compare(keys, expected=np.array(['2020-01', '2021-02'], dtype='datetime64[M]'))
+    compare(counts.tolist(), expected=[[0, 1, 1, 0, 0, 0, 0, 0], [0, 1, 0, 0, 0, 0, 0, 0]])
+
+
+def test_type_counts_per_year():
+    keys, counts = PeriodTable.from_periods(PERIODS).type_counts('Y')
+    compare(keys.astype(str).tolist(), expected=['2020', '2021'])
+    compare(counts.tolist(), expected=[[0, 1, 1, 0, 0, 0, 0, 0], [1, 1, 0, 0, 0, 0, 0, 0]])
+
+
+def test_tag_counts():
+    keys, counts = PeriodTable.from_periods(PERIODS).tag_counts('Y')
+    compare(keys.astype(str).tolist(), expected=['2020', '2021'])
+    compare(counts.tolist(), expected=[[1, 2], [1, 0]])
+
+
+def test_tag_counts_masked():
+    table = PeriodTable.from_periods(PERIODS)
+    keys, counts = table.tag_counts('M', table.where(types=[Type.did]))
+    compare(keys.astype(str).tolist(), expected=['2020-01', '2021-02'])
+    compare(counts.tolist(), expected=[[0, 1], [1, 0]])
@@ -1,15 +1,22 @@
-from datetime import date
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, call
+from urllib.parse import parse_qs
 
 import pytest
 import responses
 from bs4 import BeautifulSoup
-from requests import HTTPError
-from testfixtures import compare, ShouldRaise, replace_in_module
+from requests import ConnectionError, HTTPError, ReadTimeout, Timeout
+from requests.adapters import HTTPAdapter
+from testfixtures import compare, LogCapture, Replace, ShouldRaise, TempDirectory, replace_in_module
 
 import diary.parse as parse
 import diary.zope as zope
+from diary.extract import Form, Listing, ListingEntry
 from diary.objects import Period, Stuff, Type
-from diary.zope import Client, LookBackFailed
+from diary.zope import Client, ClientPool, LookBackFailed, days_back, retryable
 
 
 @pytest.fixture
@@ -17,6 +24,12 @@ def client():
     return Client(url="https://example.com", username="testuser", password="testpass")
 
 
+@pytest.fixture(autouse=True)
+def inferred_dates():
+    # so no test depends on what earlier ones inferred:
+    Client.infer_date.cache_clear()
+
+
 @pytest.fixture
 def mocked_responses():
     with responses.RequestsMock() as rsps:
@@ -89,6 +102,23 @@ class TestClient:
         assert h1_tag is not None
         assert h1_tag.text == "Test"
 
+    def test_payload_hash(self, client):
+        day = Period(date(2023, 1, 15), stuff=[Stuff(Type.event, 'Something')])
+        before = Client.payload_hash(client.post_data(day))
+        compare(Client.payload_hash(client.post_data(day)), expected=before)
+        day.stuff.append(Stuff(Type.note, 'More'))
+        assert Client.payload_hash(client.post_data(day)) != before
+
+    def test_get_form(self, client, mocked_responses):
+        mocked_responses.add(
+            responses.GET,
+            "https://example.com/entry/manage",
+            body='<textarea name="summary">EVENT caf\xe9</textarea>'
+            '<textarea name="body">-</textarea>'.encode('latin-1'),
+            status=200,
+        )
+        compare(client.get_form("/entry/manage"), expected=Form('EVENT caf\xe9', '-'))
+
     def test_get_soup_absolute(self, client, mocked_responses):
         html_content = '<html><body><h1>Test</h1></body></html>'
         mocked_responses.add(
@@ -114,7 +144,7 @@ class TestClient:
         period = Period(start=date(2023, 1, 15))
         period.stuff = [Stuff(Type.event, "Test event")]
 
-        data = client._post_data(period)
+        data = client.post_data(period)
 
         compare(
             data,
@@ -134,7 +164,7 @@ class TestClient:
         period.stuff = [stuff]
 
         with ShouldRaise(Exception):  # The exact error message varies by emoji representation
-            client._post_data(period)
+            client.post_data(period)
 
     def test_add(self, client, mocked_responses):
         mocked_responses.add(responses.POST, "https://example.com", body="success", status=200)
@@ -161,6 +191,23 @@ class TestClient:
         assert request.url == "https://example.com/123"
         assert "edit%3Amethod=Change" in request.body
 
+    def test_update_with_post_data(self, client, mocked_responses):
+        mocked_responses.add(responses.POST, "https://example.com/123", body="success", status=200)
+        period = Period(start=date(2023, 1, 15), zope_id="123")
+        data = client.post_data(period)
+        period.stuff = [Stuff(Type.event, "Not rendered again")]
+
+        client.update(period, data)
+
+        compare(
+            mocked_responses.calls[0].request.body,
+            expected=(
+                'title=%282023-01-15%29+Sunday&author=-&summary=&encoding=Plain'
+                '&addPosting%3Amethod=+Add+&edit%3Amethod=Change'
+            ),
+        )
+        compare(data, expected=client.post_data(Period(start=date(2023, 1, 15))))
+
     def test_update_without_zope_id(self, client):
         period = Period(start=date(2023, 1, 15))
 
@@ -168,6 +215,197 @@ class TestClient:
             client.update(period)
 
 
+@pytest.fixture
+def waits():
+    # no jitter, so the backoff is predictable:
+    sleep = Mock()
+    with Replace('diary.zope.uniform', lambda low, high: high), Replace('diary.zope.sleep', sleep):
+        yield sleep
+
+
+class TestClientRetries:
+    url = 'https://example.com/test'
+
+    def test_pool_size(self):
+        client = Client('https://example.com', 'user', 'pass', pool_size=3)
+        adapter = client.session.get_adapter(self.url)
+        assert isinstance(adapter, HTTPAdapter)
+        compare(adapter.poolmanager.connection_pool_kw['maxsize'], expected=3)
+
+    def test_timeouts(self, mocked_responses):
+        mocked_responses.add(responses.GET, self.url)
+        Client('https://example.com', 'user', 'pass', connect_timeout=2, read_timeout=5).get(
+            '/test'
+        )
+        compare(mocked_responses.calls[0].request.req_kwargs['timeout'], expected=(2, 5))
+
+    def test_deadline_limits_timeouts(self, mocked_responses):
+        mocked_responses.add(responses.GET, self.url)
+        client = Client('https://example.com', 'user', 'pass', deadline=30)
+        with Replace('diary.zope.monotonic', lambda: 100.0):
+            client.get('/test')
+        compare(mocked_responses.calls[0].request.req_kwargs['timeout'], expected=(10, 30))
+
+    def test_get_retries_server_error(self, client, mocked_responses, waits):
+        mocked_responses.add(responses.GET, self.url, status=503)
+        mocked_responses.add(responses.GET, self.url, status=500)
+        mocked_responses.add(responses.GET, self.url, body='success')
+        with LogCapture() as log:
+            compare(client.get('/test').text, expected='success')
+        compare(waits.call_args_list, expected=[call(0.5), call(1.0)])
+        log.check(
+            (
+                'diary.zope',
+                'WARNING',
+                'Retrying GET https://example.com/test in 0.5s after 503 Server Error: '
+                'Service Unavailable for url: https://example.com/test',
+            ),
+            (
+                'diary.zope',
+                'WARNING',
+                'Retrying GET https://example.com/test in 1.0s after 500 Server Error: '
+                'Internal Server Error for url: https://example.com/test',
+            ),
+        )
+
+    def test_get_retries_too_many_requests(self, client, mocked_responses, waits):
+        mocked_responses.add(responses.GET, self.url, status=429)
+        mocked_responses.add(responses.GET, self.url, body='success')
+        compare(client.get('/test').text, expected='success')
+        compare(waits.call_args_list, expected=[call(0.5)])
+
+    def test_get_retries_connection_error(self, client, mocked_responses, waits):
+        mocked_responses.add(responses.GET, self.url, body=ConnectionError('refused'))
+        mocked_responses.add(responses.GET, self.url, body=ReadTimeout('slow'))
+        mocked_responses.add(responses.GET, self.url, body='success')
+        compare(client.get('/test').text, expected='success')
+        compare(len(mocked_responses.calls), expected=3)
+
+    def test_get_retries_exhausted(self, client, mocked_responses, waits):
+        for _ in range(4):
+            mocked_responses.add(responses.GET, self.url, status=502)
+        with ShouldRaise(HTTPError):
+            client.get('/test')
+        compare(len(mocked_responses.calls), expected=4)
+        compare(waits.call_args_list, expected=[call(0.5), call(1.0), call(2.0)])
+
+    def test_max_backoff(self, mocked_responses, waits):
+        for _ in range(3):
+            mocked_responses.add(responses.GET, self.url, status=503)
+        mocked_responses.add(responses.GET, self.url)
+        client = Client('https://example.com', 'user', 'pass', backoff=10, max_backoff=15)
+        client.get('/test')
+        compare(waits.call_args_list, expected=[call(10), call(15), call(15)])
+
+    def test_get_client_error_not_retried(self, client, mocked_responses, waits):
+        mocked_responses.add(responses.GET, self.url, status=404)
+        with ShouldRaise(HTTPError):
+            client.get('/test')
+        compare(waits.call_args_list, expected=[])
+
+    def test_post_not_retried(self, client, mocked_responses, waits):
+        mocked_responses.add(responses.POST, 'https://example.com', body=ReadTimeout('slow'))
+        with ShouldRaise(ReadTimeout):
+            client.add(Period(date(2023, 1, 15), [Stuff(Type.event, 'Something')]))
+        compare(len(mocked_responses.calls), expected=1)
+        compare(waits.call_args_list, expected=[])
+
+    def test_deadline_stops_retries(self, mocked_responses, waits):
+        mocked_responses.add(responses.GET, self.url, status=503)
+        client = Client('https://example.com', 'user', 'pass', deadline=0.4)
+        with Replace('diary.zope.monotonic', lambda: 100.0):
+            with ShouldRaise(HTTPError):
+                client.get('/test')
+        compare(waits.call_args_list, expected=[])
+
+    def test_deadline_passed_while_waiting(self, mocked_responses, waits):
+        mocked_responses.add(responses.GET, self.url, status=503)
+        client = Client('https://example.com', 'user', 'pass', deadline=2)
+        # the wait to retry overran, as sleeps can:
+        times = iter([100.0, 100.0, 100.5, 102.1])
+        with Replace('diary.zope.monotonic', lambda: next(times)):
+            with ShouldRaise(Timeout('GET https://example.com/test not done within 2s')) as s:
+                client.get('/test')
+        assert isinstance(s.raised.__cause__, HTTPError)
+        compare(len(mocked_responses.calls), expected=1)
+        compare(waits.call_args_list, expected=[call(0.5)])
+
+    def test_deadline_left_for_retry(self, mocked_responses, waits):
+        mocked_responses.add(responses.GET, self.url, status=503)
+        mocked_responses.add(responses.GET, self.url)
+        client = Client('https://example.com', 'user', 'pass', deadline=2)
+        times = iter([100.0, 100.0, 100.5, 101.5])
+        with Replace('diary.zope.monotonic', lambda: next(times)):
+            client.get('/test')
+        compare(mocked_responses.calls[1].request.req_kwargs['timeout'], expected=(0.5, 0.5))
+
+    def test_http_error_without_response_not_retryable(self):
+        compare(retryable(HTTPError('no response')), expected=False)
+
+
+@pytest.fixture
+def cached():
+    with TempDirectory() as td:
+        yield Client('https://example.com', 'user', 'pass', cache_path=td.path)
+
+
+class TestClientCache:
+    url = 'https://example.com/test'
+
+    def test_miss_then_not_modified(self, cached, mocked_responses):
+        mocked_responses.add(responses.GET, self.url, body='content', headers={'ETag': '"v1"'})
+        mocked_responses.add(responses.GET, self.url, status=304)
+        compare(cached.get('/test').text, expected='content')
+        compare(cached.get('/test').text, expected='content')
+        compare(
+            [call.request.headers.get('If-None-Match') for call in mocked_responses.calls],
+            expected=[None, '"v1"'],
+        )
+
+    def test_changed(self, cached, mocked_responses):
+        mocked_responses.add(
+            responses.GET,
+            self.url,
+            body='old',
+            headers={'Last-Modified': 'Sun, 15 Jan 2023 10:00:00 GMT'},
+        )
+        mocked_responses.add(responses.GET, self.url, body='new')
+        mocked_responses.add(responses.GET, self.url, status=304)
+        compare(cached.get(self.url, absolute=True).text, expected='old')
+        compare(cached.get(self.url, absolute=True).text, expected='new')
+        compare(cached.get(self.url, absolute=True).text, expected='new')
+        compare(
+            [call.request.headers.get('If-Modified-Since') for call in mocked_responses.calls],
+            expected=[None, 'Sun, 15 Jan 2023 10:00:00 GMT', None],
+        )
+
+    def test_trust_modified(self, cached, mocked_responses):
+        cached.trust_modified = True
+        mocked_responses.add(responses.GET, self.url, body='content')
+        cached.get('/test')
+        compare(
+            cached.get_soup('/test', modified=date.today() - timedelta(days=1)).text,
+            expected='content',
+        )
+        compare(len(mocked_responses.calls), expected=1)
+
+    def test_trust_modified_changed_since_cached(self, cached, mocked_responses):
+        cached.trust_modified = True
+        mocked_responses.add(responses.GET, self.url, body='old')
+        mocked_responses.add(responses.GET, self.url, body='new')
+        cached.get('/test')
+        compare(cached.get('/test', modified=date.today()).text, expected='new')
+
+    def test_modified_ignored_without_trust(self, cached, mocked_responses):
+        mocked_responses.add(responses.GET, self.url, body='old')
+        mocked_responses.add(responses.GET, self.url, body='new')
+        cached.get('/test')
+        compare(cached.get('/test', modified=date(2000, 1, 1)).text, expected='new')
+
+    def test_no_cache(self, client):
+        compare(client.cache, expected=None)
+
+
 class TestClientInferDate:
     def test_infer_date_with_date_format(self):
         result, end = Client.infer_date("(2023-01-15) Sunday")
@@ -178,6 +416,35 @@ class TestClientInferDate:
         with ShouldRaise(AssertionError("15 Jan 23 was a Sunday, got: (2023-01-15) Monday")):
             Client.infer_date("(2023-01-15) Monday")
 
+    def test_infer_date_not_zero_padded(self):
+        with ShouldRaise(AssertionError("15 Jan 23 was a Sunday, got: (2023-1-15) Sunday")):
+            Client.infer_date("(2023-1-15) Sunday")
+
+    def test_infer_date_not_a_date(self):
+        with ShouldRaise(ValueError("Bad format: '(2023-02-30) Thursday'")):
+            Client.infer_date("(2023-02-30) Thursday")
+
+    def test_infer_date_cached(self):
+        compare(Client.infer_date("Tuesday", date(2023, 1, 20)), expected=(date(2023, 1, 17), None))
+        compare(Client.infer_date("Tuesday", date(2023, 1, 20)), expected=(date(2023, 1, 17), None))
+        compare(Client.infer_date("Tuesday", date(2023, 1, 21)), expected=(date(2023, 1, 17), None))
+        info = Client.infer_date.cache_info()
+        compare((info.hits, info.misses), expected=(1, 2))
+        Client.infer_date.cache_clear()
+        compare(Client.infer_date.cache_info().currsize, expected=0)
+
+    def test_infer_date_cache_shared(self):
+        # the cache isn't keyed on the class it's called on:
+        Client.infer_date('(2023-01-15) Sunday')
+        Client('https://example.com', 'user', 'pass').infer_date('(2023-01-15) Sunday')
+        info = Client.infer_date.cache_info()
+        compare((info.hits, info.misses), expected=(1, 1))
+
+    def test_infer_date_day_name_only_too_far_back(self):
+        previous = date(2023, 1, 20)  # Friday
+        with pytest.raises(ValueError, match="Bad format"):
+            Client.infer_date("Friday", previous)
+
     def test_infer_date_day_name_only_with_previous(self):
         previous = date(2023, 1, 20)  # Friday
         result, end = Client.infer_date("Tuesday", previous)
@@ -298,6 +565,43 @@ class TestClientLookback:
         assert exc_info.value.possible == date(2023, 1, 16)
         assert str(exc_info.value) == "Looked back to 2023-01-16, couldn't match 1"
 
+    def test_lookback_previous_month(self):
+        start = date(2023, 3, 2)
+        result = Client.lookback(start, "Tue 28 Feb", "Tue", "28", "Feb", None, max_days=5)
+        assert result == date(2023, 2, 28)
+
+    def test_lookback_past_short_month(self):
+        start = date(2023, 3, 2)
+        with pytest.raises(LookBackFailed) as exc_info:
+            Client.lookback(start, "31", "", "31", None, None, max_days=25)
+        assert exc_info.value.possible == date(2023, 2, 6)
+
+    def test_lookback_no_such_day(self):
+        start = date(2023, 1, 20)
+        with pytest.raises(LookBackFailed):
+            Client.lookback(start, "32", "", "32", None, None, max_days=5)
+
+
+class TestDaysBack:
+    def test_same_month(self):
+        compare(days_back(date(2023, 1, 20), 15), expected=5)
+
+    def test_same_day(self):
+        compare(days_back(date(2023, 1, 20), 20), expected=0)
+
+    def test_previous_month(self):
+        compare(days_back(date(2023, 3, 2), 28), expected=2)
+
+    def test_past_short_month(self):
+        compare(days_back(date(2023, 3, 2), 31), expected=30)
+
+    def test_past_year_end(self):
+        compare(days_back(date(2023, 1, 1), 31), expected=1)
+
+    def test_out_of_range(self):
+        compare(days_back(date(2023, 1, 20), 0), expected=None)
+        compare(days_back(date(2023, 1, 20), 32), expected=None)
+
 
 class TestClientList:
     def test_list_basic(self, mocked_responses):
@@ -422,6 +726,17 @@ class TestClientList:
         assert len(periods) == 1
         assert periods[0].zope_id == "456"
 
+    def test_list_missing_read_link(self, mocked_responses):
+        mocked_responses.add(
+            responses.GET,
+            "https://example.com",
+            body=b'<html><a name="2023-01-15T10:00:00Z"><strong>Sunday</strong></a></html>',
+            status=200,
+        )
+        client = Client("https://example.com", "user", "pass")
+        with ShouldRaise(ValueError("No date and read link after anchor '2023-01-15T10:00:00Z'")):
+            list(client.list(date(2023, 1, 10)))
+
     def test_list_error_not_handled(self, mocked_responses):
         html_content = '''
         <html>
@@ -679,3 +994,360 @@ class TestLookBackFailed:
         exc = LookBackFailed(date(2023, 1, 15), "test text")
         assert exc.possible == date(2023, 1, 15)
         assert exc.text == "test text"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """
+    Serves pages from the server's ``pages`` dict, recording every request made.
+    """
+
+    server: 'StandInServer'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        content = server.pages.get(self.path)
+        with server.lock:
+            server.in_flight -= 1
+        if content is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandIn)
+        self.url = f'http://127.0.0.1:{self.server_port}'
+        self.lock = threading.Lock()
+        self.requests: list[str] = []
+        self.pages: dict[str, bytes] = {}
+        self.delay = 0.0
+        self.in_flight = self.max_in_flight = 0
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def listing(*entries: tuple[str, str, str], next_href: str | None = None) -> bytes:
+    html = ['<html>']
+    for modified, text, zope_id in entries:
+        html.append(
+            f'<a name="{modified}T10:00:00Z"><strong>{text}</strong>'
+            f'<a class="read" href="/entry/{zope_id}">Read</a></a>'
+        )
+    if next_href:
+        html.append(f'<a class="next" href="{next_href}">Next</a>')
+    html.append('</html>')
+    return ''.join(html).encode('latin-1')
+
+
+class TestClientPool:
+    def test_client_per_thread(self):
+        prototype = Client('http://example.com', 'user', 'pass', read_timeout=5)
+        pool = ClientPool(prototype)
+        compare(pool.url, expected='http://example.com')
+        mine = pool.client()
+        compare(mine, expected=prototype)
+        assert mine is not prototype
+        compare(pool.client(), expected=mine, strict=True)
+        compare(mine.session.auth, expected=('user', 'pass'))
+        with pool:
+            theirs = pool.submit(lambda client: client).result()
+        assert theirs is not mine
+        compare(theirs.url, expected='http://example.com')
+
+    def test_submit(self, server):
+        server.pages['/test'] = b'success'
+        with ClientPool(Client(server.url, 'user', 'pass'), size=2) as pool:
+            futures = [pool.submit(Client.get, '/test') for _ in range(4)]
+            compare([future.result().text for future in futures], expected=['success'] * 4)
+        compare(server.max_in_flight <= 2, expected=True)
+
+    def test_close_cancels_pending(self, server):
+        server.delay = 0.05
+        server.pages['/test'] = b'success'
+        pool = ClientPool(Client(server.url, 'user', 'pass'), size=1)
+        futures = [pool.submit(Client.get, '/test') for _ in range(3)]
+        while not server.requests:
+            time.sleep(0.001)
+        pool.close()
+        compare(futures[0].result().text, expected='success')
+        compare([future.cancelled() for future in futures[1:]], expected=[True, True])
+
+    def test_close_without_executor(self):
+        ClientPool(Client('http://example.com', 'user', 'pass')).close()
+
+    def test_close_twice(self):
+        pool = ClientPool(Client('http://example.com', 'user', 'pass'))
+        pool.executor
+        pool.close()
+        pool.close()
+        assert 'executor' not in pool.__dict__
+
+
+def pages(server: StandInServer, count: int) -> None:
+    """
+    Serve ``count`` listing pages of two days each, counting back from 2023-01-31.
+    """
+    day = date(2023, 1, 31)
+    for number in range(1, count + 1):
+        entries = []
+        for _ in range(2):
+            entries.append((day.isoformat(), day.strftime('(%Y-%m-%d) %A'), day.strftime('%d')))
+            day -= timedelta(days=1)
+        next_href = f'/page{number + 1}' if number < count else None
+        server.pages[f'/page{number}'] = listing(*entries, next_href=next_href)
+
+
+def wait_for_requests(server: StandInServer, count: int) -> None:
+    deadline = time.monotonic() + 5
+    while len(server.requests) < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+    # give any request that shouldn't be made the chance to be:
+    time.sleep(0.05)
+
+
+def zope_threads() -> list[threading.Thread]:
+    return [thread for thread in threading.enumerate() if thread.name.startswith('zope')]
+
+
+class TestClientListPrefetch:
+    def test_in_order(self, server):
+        pages(server, 4)
+        client = Client(server.url, 'user', 'pass')
+        expected = list(client.list(date.min, next_url='/page1'))
+        compare(len(expected), expected=8)
+        server.requests.clear()
+        compare(list(client.list(date.min, next_url='/page1', prefetch=2)), expected=expected)
+        compare(server.requests, expected=[f'/page{number}' for number in range(1, 5)])
+        compare(zope_threads(), expected=[])
+
+    def test_depth(self, server):
+        pages(server, 6)
+        periods = Client(server.url, 'user', 'pass').list(date.min, next_url='/page1', prefetch=2)
+        compare(next(periods).zope_id, expected='31')
+        wait_for_requests(server, 3)
+        compare(server.requests, expected=['/page1', '/page2', '/page3'])
+        # moving on to the next page frees up a slot:
+        compare([next(periods).zope_id for _ in range(2)], expected=['30', '29'])
+        wait_for_requests(server, 4)
+        compare(len(server.requests), expected=4)
+        periods.close()
+        compare(zope_threads(), expected=[])
+
+    def test_earliest_stops_prefetching(self, server):
+        pages(server, 6)
+        client = Client(server.url, 'user', 'pass')
+        compare(
+            [
+                period.zope_id
+                for period in client.list(date(2023, 1, 28), next_url='/page1', prefetch=1)
+            ],
+            expected=['31', '30', '29', '28'],
+        )
+        compare(zope_threads(), expected=[])
+        wait_for_requests(server, 3)
+        compare(server.requests, expected=['/page1', '/page2', '/page3'])
+
+    def test_nothing_to_list(self, server):
+        client = Client(server.url, 'user', 'pass')
+        compare(
+            list(client.list(date(2023, 1, 10), seen=date(2023, 1, 10), prefetch=2)), expected=[]
+        )
+        compare(server.requests, expected=[])
+
+    def test_consumer_raises(self, server):
+        pages(server, 6)
+        periods = Client(server.url, 'user', 'pass').list(date.min, next_url='/page1', prefetch=2)
+        with ShouldRaise(ZeroDivisionError):
+            for _ in periods:
+                1 / 0
+        # still open, as the traceback holds the listing, but can't stop the process exiting:
+        compare([thread.daemon for thread in zope_threads()], expected=[True])
+        periods.close()
+        compare(zope_threads(), expected=[])
+
+    def test_error_after_earlier_pages(self, server):
+        pages(server, 2)
+        server.pages['/page2'] = listing(
+            ('2023-01-29', '(2023-01-29) Sunday', '29'), next_href='/missing'
+        )
+        periods = Client(server.url, 'user', 'pass').list(date.min, next_url='/page1', prefetch=3)
+        compare([next(periods).zope_id for _ in range(3)], expected=['31', '30', '29'])
+        with ShouldRaise(HTTPError):
+            next(periods)
+        compare(zope_threads(), expected=[])
+
+
+def batches(server: StandInServer, count: int, per_page: int = 3) -> None:
+    """
+    Serve ``count`` listing pages of ``per_page`` days each, counting back from
+    2023-01-31, batched by offset as Zope does, and empty pages past the end. The first
+    day on each page after the first only has the day name and number.
+    """
+    day = date(2023, 1, 31)
+    for number in range(count * 2):
+        entries = []
+        for index in range(per_page if number < count else 0):
+            if number and not index:
+                text = f'{day:%A} {day.day}'
+            else:
+                text = day.strftime('(%Y-%m-%d) %A')
+            entries.append((day.isoformat(), text, day.strftime('%d')))
+            day -= timedelta(days=1)
+        offset = number * per_page
+        path = f'/?b_start={offset}' if number else '/'
+        next_href = f'?b_start={offset + per_page}' if number < count - 1 else None
+        server.pages[path] = listing(*entries, next_href=next_href)
+
+
+class TestClientSeek:
+    def test_matches_walk(self, server):
+        batches(server, 10)
+        client = Client(server.url, 'user', 'pass')
+        walked = [
+            period for period in client.list(date(2023, 1, 10)) if period.start <= date(2023, 1, 15)
+        ]
+        compare(walked[0].start, expected=date(2023, 1, 15))
+        compare(walked[-1].start, expected=date(2023, 1, 10))
+        server.requests.clear()
+        compare(list(client.list(date(2023, 1, 10), latest=date(2023, 1, 15))), expected=walked)
+        compare(
+            server.requests,
+            expected=[
+                # galloping:
+                '/',
+                '/?b_start=3',
+                '/?b_start=6',
+                '/?b_start=12',
+                '/?b_start=24',
+                # binary search:
+                '/?b_start=18',
+                '/?b_start=15',
+                # listing:
+                '/?b_start=15',
+                '/?b_start=18',
+                '/?b_start=21',
+            ],
+        )
+
+    def test_on_first_page(self, server):
+        batches(server, 10)
+        client = Client(server.url, 'user', 'pass')
+        compare(client.seek(date(2023, 1, 30)), expected=('', date.max))
+        compare(
+            [period.zope_id for period in client.list(date(2023, 1, 29), latest=date(2023, 1, 30))],
+            expected=['30', '29'],
+        )
+
+    def test_on_second_page(self, server):
+        batches(server, 10)
+        client = Client(server.url, 'user', 'pass')
+        compare(client.seek(date(2023, 1, 28)), expected=('?b_start=3', date(2023, 1, 29)))
+
+    def test_binary_search(self, server):
+        batches(server, 10)
+        client = Client(server.url, 'user', 'pass')
+        compare(client.seek(date(2023, 1, 12)), expected=('?b_start=18', date(2023, 1, 14)))
+
+    def test_last_entry_unknown(self, server):
+        batches(server, 10)
+        # the page can't be known to be after latest, so the listing is read from it:
+        server.pages['/?b_start=6'] = listing(
+            ('2023-01-25', 'Wednesday 25', '25'),
+            ('2023-01-24', '(2023-01-24) Tuesday', '24'),
+            ('2023-01-23', 'Nonsense', '23'),
+            next_href='?b_start=9',
+        )
+        client = Client(server.url, 'user', 'pass')
+        compare(client.seek(date(2023, 1, 12)), expected=('?b_start=6', date(2023, 1, 26)))
+
+    def test_past_end(self, server):
+        batches(server, 5)
+        client = Client(server.url, 'user', 'pass')
+        compare(client.seek(date(2022, 1, 1)), expected=('?b_start=15', date(2023, 1, 17)))
+        compare(list(client.list(date.min, latest=date(2022, 1, 1))), expected=[])
+
+    def test_no_batch_offset(self, server):
+        server.pages['/'] = listing(
+            ('2023-01-15', '(2023-01-15) Sunday', '123'), next_href='/page2'
+        )
+        compare(Client(server.url, 'user', 'pass').seek(date(2023, 1, 1)), expected=('', date.max))
+
+    def test_single_page(self, server):
+        server.pages['/'] = listing(('2023-01-15', '(2023-01-15) Sunday', '123'))
+        compare(Client(server.url, 'user', 'pass').seek(date(2023, 1, 1)), expected=('', date.max))
+
+    def test_start_url_not_sought(self, server):
+        batches(server, 10)
+        client = Client(server.url, 'user', 'pass')
+        compare(
+            [
+                period.zope_id
+                for period in client.list(
+                    date(2023, 1, 27),
+                    next_url='?b_start=3',
+                    seen=date(2023, 1, 29),
+                    latest=date(2023, 1, 27),
+                )
+            ],
+            expected=['27'],
+        )
+        compare(server.requests, expected=['/?b_start=3'])
+
+    def test_last_date(self):
+        compare(
+            Client.last_date(
+                Listing(
+                    [
+                        ListingEntry('1', 'Monday 16', 'r'),
+                        ListingEntry('2', '(2023-01-15) Sunday', 'r'),
+                        ListingEntry('3', None, None),
+                        ListingEntry('4', 'Nonsense', 'r'),
+                        ListingEntry('5', 'Saturday 14', 'r'),
+                    ],
+                    None,
+                )
+            ),
+            expected=date(2023, 1, 14),
+        )
+
+    @pytest.mark.parametrize(
+        'entry', [ListingEntry('6', 'Nonsense', 'r'), ListingEntry('6', None, None)]
+    )
+    def test_last_date_last_entry_unknown(self, entry):
+        page = Listing(
+            [
+                ListingEntry('1', '(2023-01-15) Sunday', 'r'),
+                ListingEntry('2', 'Saturday 14', 'r'),
+                entry,
+            ],
+            None,
+        )
+        compare(Client.last_date(page), expected=None)
+
+    def test_last_date_empty(self):
+        compare(Client.last_date(Listing([], None)), expected=None)
+
+    def test_last_date_unknown(self):
+        compare(
+            Client.last_date(Listing([ListingEntry('1', 'Monday 16', 'r')], None)), expected=None
+        )